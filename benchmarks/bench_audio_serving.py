@@ -0,0 +1,191 @@
+"""
+Load test for the /audio route: requests/sec and latency percentiles for
+the previous handler (INFO logging of every request's headers, existence
+checks, no-store caching) against the audio blueprint, for full downloads,
+byte-range requests and ETag revalidation.
+
+The server runs under gunicorn when it is installed (sendfile through the
+WSGI file wrapper), otherwise under werkzeug's threaded server.
+
+    python benchmarks/bench_audio_serving.py [--seconds 10] [--clients 4]
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import requests  # noqa: E402
+from flask import Flask, Response, request, send_file  # noqa: E402
+
+from Backend.FlaskAPI.audio_routes import audio_bp  # noqa: E402
+
+AUDIO_BYTES = 200 * 1024
+LEGACY_NAME = 'response_+237600000001_1a2b3c4d.mp3'
+
+
+def create_app(kind, static_folder):
+    app = Flask(__name__)
+    app.config['STATIC_FOLDER'] = static_folder
+    if kind == 'blueprint':
+        app.register_blueprint(audio_bp)
+        return app
+
+    logger = logging.getLogger('legacy')
+
+    @app.route('/audio/<filename>')
+    def serve_audio(filename):
+        # The handler as it was before the audio blueprint
+        try:
+            logger.info(f"🎵 Audio request received for: {filename}")
+            logger.info(f"📡 Request from: {request.remote_addr}")
+            logger.info(f"🔗 Full URL: {request.url}")
+            logger.info(f"📋 Request headers: {dict(request.headers)}")
+            safe_filename = os.path.basename(filename)
+            audio_path = os.path.join(app.config['STATIC_FOLDER'], 'audio', safe_filename)
+            logger.info(f"📁 Looking for audio file at: {audio_path}")
+            if os.path.exists(audio_path):
+                file_size = os.path.getsize(audio_path)
+                logger.info(f"✅ Audio file found, size: {file_size} bytes")
+                response = send_file(audio_path, mimetype='audio/mpeg', as_attachment=False,
+                                     download_name=safe_filename)
+                response.headers['Access-Control-Allow-Origin'] = '*'
+                response.headers['Access-Control-Allow-Methods'] = 'GET, OPTIONS'
+                response.headers['Access-Control-Allow-Headers'] = 'Content-Type'
+                response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
+                response.headers['Pragma'] = 'no-cache'
+                response.headers['Expires'] = '0'
+                response.headers['Content-Length'] = str(file_size)
+                logger.info(f"✅ Successfully serving audio file: {safe_filename}")
+                logger.info(f"📊 Response headers: {dict(response.headers)}")
+                return response
+            return Response("Audio file not found", status=404, mimetype='text/plain')
+        except Exception as e:
+            return Response(f"Error serving audio: {str(e)}", status=500, mimetype='text/plain')
+
+    return app
+
+
+def serve(kind, static_folder, port, workers):
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    app = create_app(kind, static_folder)
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        from werkzeug.serving import make_server
+        make_server('127.0.0.1', port, app, threaded=True).serve_forever()
+        return
+
+    class Server(BaseApplication):
+        def load_config(self):
+            self.cfg.set('bind', f"127.0.0.1:{port}")
+            self.cfg.set('workers', workers)
+            self.cfg.set('threads', 4)
+            self.cfg.set('loglevel', 'warning')
+
+        def load(self):
+            return app
+
+    Server().run()
+
+
+def client(args):
+    url, headers, seconds = args
+    session = requests.Session()
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            response = session.get(url, headers=headers)
+            response.content
+            ok = response.status_code in (200, 206, 304)
+        except requests.RequestException:
+            # e.g. a Content-Length that does not match the body sent
+            ok = False
+            session = requests.Session()
+        if ok:
+            latencies.append(time.perf_counter() - start)
+        else:
+            errors += 1
+    return latencies, errors
+
+
+def wait_for(port):
+    for _ in range(100):
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("Server did not start")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--clients', type=int, default=4)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--serve', nargs=3, metavar=('KIND', 'STATIC_FOLDER', 'PORT'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        serve(args.serve[0], args.serve[1], int(args.serve[2]), args.workers)
+        return
+
+    with tempfile.TemporaryDirectory() as static_folder:
+        os.makedirs(os.path.join(static_folder, 'audio'))
+        payload = os.urandom(AUDIO_BYTES)
+        import hashlib
+        content_name = f"{hashlib.sha256(payload).hexdigest()}.mp3"
+        for name in (LEGACY_NAME, content_name):
+            with open(os.path.join(static_folder, 'audio', name), 'wb') as f:
+                f.write(payload)
+
+        print(f"{'handler':<10} {'scenario':<11} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+        for kind, name in (('legacy', LEGACY_NAME), ('blueprint', content_name)):
+            port = free_port()
+            server = subprocess.Popen(
+                [sys.executable, __file__, '--workers', str(args.workers), '--serve', kind, static_folder, str(port)],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+            try:
+                wait_for(port)
+                url = f"http://127.0.0.1:{port}/audio/{requests.utils.quote(name)}"
+                etag = requests.get(url).headers.get('ETag', '')
+                scenarios = (
+                    ('full', {}),
+                    ('range 64K', {'Range': 'bytes=0-65535'}),
+                    ('revalidate', {'If-None-Match': etag}),
+                )
+                for label, headers in scenarios:
+                    with multiprocessing.Pool(args.clients) as pool:
+                        results = pool.map(client, [(url, headers, args.seconds)] * args.clients)
+                    latencies = sorted(sample for samples, _ in results for sample in samples)
+                    errors = sum(count for _, count in results)
+                    if not latencies:
+                        print(f"{kind:<10} {label:<11} {'-':>8} {'-':>8} {'-':>8} {errors:>7}")
+                        continue
+                    p99 = latencies[max(int(len(latencies) * 0.99) - 1, 0)]
+                    print(f"{kind:<10} {label:<11} {len(latencies) / args.seconds:>8.0f} "
+                          f"{statistics.median(latencies) * 1000:>8.2f} {p99 * 1000:>8.2f} {errors:>7}")
+            finally:
+                server.terminate()
+                server.wait()
+
+
+if __name__ == '__main__':
+    main()
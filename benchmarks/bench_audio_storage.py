@@ -0,0 +1,74 @@
+"""
+Publish latency of the S3 audio backend (upload plus pre-signing) for
+typical voice-note sizes and one large multipart upload, and a check that
+the pre-signed URL downloads the same bytes.
+
+Runs against moto's in-process S3 server when moto is installed, or against
+any S3-compatible endpoint such as a local MinIO:
+
+    python benchmarks/bench_audio_storage.py
+    python benchmarks/bench_audio_storage.py --endpoint-url http://localhost:9000 --bucket audio
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import requests  # noqa: E402
+
+from AIV.audio_storage import MB, S3AudioStorage  # noqa: E402
+
+SIZES = (('voice note 60 KB', 60 * 1024, 20), ('long reply 600 KB', 600 * 1024, 10), ('multipart 40 MB', 40 * MB, 2))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--endpoint-url')
+    parser.add_argument('--bucket', default='nursetalk-audio-bench')
+    parser.add_argument('--region', default='us-east-1')
+    args = parser.parse_args()
+
+    server = None
+    if not args.endpoint_url:
+        from moto.server import ThreadedMotoServer
+        server = ThreadedMotoServer(port=0)
+        server.start()
+        host, port = server.get_host_and_port()
+        args.endpoint_url = f"http://{host}:{port}"
+        os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+        os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+
+    storage = S3AudioStorage(args.bucket, endpoint_url=args.endpoint_url, region=args.region)
+    try:
+        storage.client.create_bucket(Bucket=args.bucket)
+    except storage.client.exceptions.BucketAlreadyOwnedByYou:
+        pass
+
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            for label, size, repeat in SIZES:
+                payload = os.urandom(size)
+                samples = []
+                for i in range(repeat):
+                    path = os.path.join(tmp, f"bench_{i}.mp3")
+                    with open(path, 'wb') as f:
+                        f.write(payload)
+                    start = time.perf_counter()
+                    url = storage.publish(path, f"bench_{size}_{i}.mp3")
+                    samples.append(time.perf_counter() - start)
+                fetched = requests.get(url, timeout=60)
+                ok = fetched.status_code == 200 and fetched.content == payload
+                print(f"{label:<18} publish p50 {statistics.median(samples) * 1000:8.1f} ms  "
+                      f"max {max(samples) * 1000:8.1f} ms  pre-signed GET {'ok' if ok else 'FAILED'}")
+        print(storage.stats())
+    finally:
+        if server:
+            server.stop()
+
+
+if __name__ == '__main__':
+    main()
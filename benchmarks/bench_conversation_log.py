@@ -0,0 +1,61 @@
+"""
+Rows per second written to the conversation table: one commit per row
+through save_conversation, against the batched background writer.
+
+    python benchmarks/bench_conversation_log.py [--rows 5000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from flask import Flask  # noqa: E402
+
+from Backend.database.data import Conversation, db, init_database, save_conversation  # noqa: E402
+from Backend.database.writer import ConversationLogWriter  # noqa: E402
+
+
+def make_app(path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{path}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    init_database(app)
+    return app
+
+
+def per_row(app, rows):
+    with app.app_context():
+        start = time.perf_counter()
+        for i in range(rows):
+            save_conversation(f"whatsapp:+2376{i % 500:08d}", "fever and cough", "*Diagnosis*: common cold", 1.5)
+        return time.perf_counter() - start, 0.0
+
+
+def batched(app, rows):
+    writer = ConversationLogWriter(app, max_pending=rows)
+    start = time.perf_counter()
+    for i in range(rows):
+        writer.log(f"whatsapp:+2376{i % 500:08d}", "fever and cough", "*Diagnosis*: common cold", 1.5)
+    enqueue_seconds = time.perf_counter() - start
+    writer.close()
+    return time.perf_counter() - start, enqueue_seconds
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=5000)
+    args = parser.parse_args()
+
+    print(f"{'path':<22}{'rows/s':>12}{'request-thread us/row':>24}")
+    for name, run in [('per-row commit', per_row), ('batched writer', batched)]:
+        with tempfile.TemporaryDirectory() as directory:
+            app = make_app(os.path.join(directory, 'bench.db'))
+            total, enqueue = run(app, args.rows)
+            with app.app_context():
+                assert Conversation.query.count() == args.rows
+                db.engine.dispose()
+            request_thread = (enqueue or total) / args.rows * 1e6
+            print(f"{name:<22}{args.rows / total:>12,.0f}{request_thread:>24.1f}")
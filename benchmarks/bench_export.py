@@ -0,0 +1,85 @@
+"""
+Throughput and peak memory of the streaming conversation export on a large
+table, for each output format with and without gzip. Every export runs in a
+fresh process so its peak RSS is not hidden by the seeding step.
+
+    python benchmarks/bench_export.py [--rows 2000000]
+"""
+import argparse
+from datetime import datetime, timedelta
+import multiprocessing
+import os
+import resource
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from flask import Flask  # noqa: E402
+from sqlalchemy import create_engine  # noqa: E402
+
+from Backend.database.data import init_database  # noqa: E402
+from Backend.database.export import export_conversations  # noqa: E402
+
+
+def seed(path, rows):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{path}"
+    init_database(app)
+    base = datetime(2025, 1, 1)
+    connection = sqlite3.connect(path)
+    batch = 50_000
+    for offset in range(0, rows, batch):
+        connection.executemany(
+            "INSERT INTO conversation (phone_number, timestamp, user_input, bot_response, response_time, status) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            ((f"whatsapp:+2376{i % 5000:08d}", (base + timedelta(seconds=i * 5)).isoformat(sep=' '),
+              "I have had a fever and a headache since yesterday",
+              "*Diagnosis*: likely malaria. *Recommendations*: visit the nearest clinic for a rapid test.",
+              1.5 + (i % 7) / 10, 'sent') for i in range(offset, min(offset + batch, rows)))
+        )
+        connection.commit()
+    connection.close()
+
+
+def run_export(path, fmt, compress, results):
+    engine = create_engine(f"sqlite:///{path}")
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    written = 0
+    start = time.perf_counter()
+    with engine.connect() as connection:
+        for chunk in export_conversations(connection, fmt, compress):
+            written += len(chunk)
+    elapsed = time.perf_counter() - start
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results.put((elapsed, written, (rss_after - rss_before) / 1024))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'export.db')
+        start = time.perf_counter()
+        seed(path, args.rows)
+        print(f"seeded {args.rows} rows in {time.perf_counter() - start:.1f}s "
+              f"({os.path.getsize(path) / 2**20:.0f} MB)")
+
+        print(f"{'format':<12} {'seconds':>8} {'rows/s':>10} {'output MB':>10} {'peak RSS +MB':>13}")
+        context = multiprocessing.get_context('spawn')
+        for fmt, compress in (('ndjson', False), ('csv', False), ('ndjson', True), ('csv', True)):
+            results = context.Queue()
+            process = context.Process(target=run_export, args=(path, fmt, compress, results))
+            process.start()
+            elapsed, written, rss_mb = results.get()
+            process.join()
+            label = fmt + ('.gz' if compress else '')
+            print(f"{label:<12} {elapsed:>8.2f} {args.rows / elapsed:>10.0f} {written / 2**20:>10.1f} {rss_mb:>13.1f}")
+
+
+if __name__ == '__main__':
+    main()
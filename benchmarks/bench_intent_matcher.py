@@ -0,0 +1,65 @@
+"""
+Checks UserIntent against the regression corpus, then times the compiled
+matcher against the old per-word loops.
+
+    python benchmarks/bench_intent_matcher.py
+"""
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from Backend.Model.conversation_patterns import UserIntent  # noqa: E402
+from intent_corpus import CORPUS  # noqa: E402
+
+
+def legacy_is_negative(message):
+    msg = re.sub(r'[^a-z\s]', '', message.lower().strip())
+    return any(word in msg for word in UserIntent.NEGATIVE_WORDS)
+
+
+def legacy_is_greeting(message):
+    msg = message.lower().strip()
+    return any(re.search(rf'\b{re.escape(greet)}\b', msg) for greet in UserIntent.GREETING_WORDS)
+
+
+def legacy_detect(message):
+    return legacy_is_greeting(message), legacy_is_negative(message)
+
+
+def compiled_detect(message):
+    return UserIntent.detect(message)
+
+
+def check_corpus():
+    failures = []
+    for message, expected in CORPUS:
+        got = {intent.value for intent in UserIntent.detect(message)}
+        if got != expected:
+            failures.append((message, expected, got))
+    legacy_false_negatives = [m for m, expected in CORPUS if 'negative' not in expected and legacy_is_negative(m)]
+    return failures, legacy_false_negatives
+
+
+def bench(fn, messages, repeat=5, number=200):
+    best = min(timeit.repeat(lambda: [fn(m) for m in messages], repeat=repeat, number=number))
+    return best / (number * len(messages)) * 1e6
+
+
+if __name__ == '__main__':
+    failures, legacy_wrong = check_corpus()
+    print(f"Corpus: {len(CORPUS)} phrases, {len(failures)} failures")
+    for message, expected, got in failures:
+        print(f"  FAIL {message!r}: expected {sorted(expected)}, got {sorted(got)}")
+    print(f"Old is_negative wrongly fired on {len(legacy_wrong)} symptom phrases, e.g. {legacy_wrong[:3]}")
+
+    messages = [m for m, _ in CORPUS]
+    # A long description with no intent in it: the old loops cannot exit early
+    long_message = " ".join(m for m, expected in CORPUS if not expected) * 8
+    print(f"{'case':<28}{'old us/msg':>12}{'new us/msg':>12}")
+    for label, sample in [('corpus (short messages)', messages), ('long message (~6 KB)', [long_message])]:
+        print(f"{label:<28}{bench(legacy_detect, sample):>12.2f}{bench(compiled_detect, sample):>12.2f}")
+
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,67 @@
+"""
+Cost of one cleanup pass over a large audio directory: the old
+listdir + getctime-per-file loop against the janitor's single scandir pass,
+then a pass that has to evict down to a byte budget. On Linux both scans
+pay one stat() per file (scandir only saves the call on Windows), so expect
+similar numbers there; the difference is that the janitor also gets sizes
+for the budget from the same pass.
+
+    python benchmarks/bench_janitor.py [--files 100000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from Backend.Pipeline.janitor import Janitor  # noqa: E402
+
+
+def old_cleanup(audio_dir):
+    """The loop from the removed cleanup_old_audio_files(), minus the deletes."""
+    current_time = time.time()
+    expired = 0
+    for filename in os.listdir(audio_dir):
+        file_path = os.path.join(audio_dir, filename)
+        if os.path.getctime(file_path) < (current_time - 3600):
+            expired += 1
+    return expired
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--files', type=int, default=100_000)
+    parser.add_argument('--size', type=int, default=4096)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as audio_dir:
+        now = time.time()
+        payload = b'\0' * args.size
+        for i in range(args.files):
+            path = os.path.join(audio_dir, f"{i:064x}.mp3")
+            with open(path, 'wb') as f:
+                f.write(payload)
+            # Spread modification times over the last 50 minutes
+            mtime = now - 3000 + i * 3000 / args.files
+            os.utime(path, (mtime, mtime))
+
+        start = time.perf_counter()
+        old_cleanup(audio_dir)
+        print(f"listdir + getctime, {args.files} files: {(time.perf_counter() - start) * 1000:8.1f} ms")
+
+        janitor = Janitor([audio_dir], max_age_seconds=3600, max_bytes=args.files * args.size, min_age_seconds=60)
+        start = time.perf_counter()
+        janitor.run_once()
+        print(f"scandir pass, nothing to delete:     {(time.perf_counter() - start) * 1000:8.1f} ms")
+
+        janitor.max_bytes = args.files * args.size // 2
+        start = time.perf_counter()
+        deleted = janitor.run_once()
+        print(f"evict to half the budget ({deleted} files): {(time.perf_counter() - start) * 1000:8.1f} ms")
+        print(janitor.stats())
+
+
+if __name__ == '__main__':
+    main()
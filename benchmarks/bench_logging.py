@@ -0,0 +1,170 @@
+"""
+Logging overhead per request, as seen by the request thread: the log calls
+of one diagnosis request (webhook, generation, cleanup, TTS, paired send)
+replayed against the previous setup (basicConfig, synchronous handler, INFO
+f-strings with the raw model output and headers) and the queued JSON setup
+in Backend.Pipeline.logs.
+
+Each setup writes to a file and to a slow sink that takes --sink-ms per
+write, like a stderr pipe a log shipper is slow to drain.
+
+    python benchmarks/bench_logging.py [--requests 2000] [--sink-ms 0.5]
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from Backend.Pipeline.logs import SAMPLED, LogPipeline, request_id_var  # noqa: E402
+
+PHONE = 'whatsapp:+237600000001'
+SYMPTOMS = "my child has fever. and a runny nose. she is coughing at night"
+PROMPT = (f"Question: A patient presents with the following symptoms: {SYMPTOMS}. "
+          "What is the likely diagnosis and what are the first aid steps?\n\nAnswer:")
+RAW_OUTPUT = PROMPT + (" Diagnosis: common cold. First aid steps: rest, fluids, saline drops, monitor the "
+                       "temperature and see a doctor if the fever lasts more than three days." * 8)
+CLEANED = "*Diagnosis*:\ncommon cold.\n\n*First Aid Steps*:\n• rest\n• fluids\n• saline drops"
+TEXT_RESULT = {'success': True, 'sid': 'SM' + '0' * 32}
+AUDIO_PATH = '/srv/nursetalk/static/audio/' + 'a' * 64 + '.mp3'
+
+
+def previous_request(log):
+    """The INFO lines one diagnosis request wrote before the logging overhaul."""
+    log.info("--- Webhook request received ---")
+    log.info(f"User {PHONE} is in state: COLLECTING_SYMPTOMS")
+    log.info(f"User finished. Generating diagnosis for: '{SYMPTOMS}'")
+    log.info(f"🤖 Generating response for combined input: {PROMPT}...")
+    log.info(f"Raw model output: \"{RAW_OUTPUT}\"")
+    log.info(f"✅ Generated response in {1.234:.2f} seconds: {RAW_OUTPUT[:100]}...")
+    log.info(f"Raw model output: {RAW_OUTPUT}")
+    log.info(f"Cleaning raw response: \"{RAW_OUTPUT[:200]}...\"")
+    log.info(f"Cleaned response: \"{CLEANED[:200]}...\"")
+    log.info(f"Cleaned response: {CLEANED}")
+    log.info("Sending final diagnosis in FULL mode...")
+    log.info("🎯 Generating your voice response...")
+    log.info("🔊 Converting text to speech...")
+    log.info("⚡ Optimizing audio quality...")
+    log.info("💾 Saving optimized audio...")
+    log.info("✅ Voice response ready!")
+    log.info(f"Audio file generated: {AUDIO_PATH} ({48213} bytes)")
+    log.info("Attempting to send paired text and audio response...")
+    log.info(f"Starting paired response for {PHONE}")
+    log.info(f'Sent {1} segments to {PHONE}')
+    log.info(f"Text message sent successfully: {TEXT_RESULT}")
+    log.info(f"Audio path: {AUDIO_PATH}")
+    log.info(f"Audio file verified: {48213} bytes")
+    log.info(f"Audio URL: https://example.org/audio/{'a' * 64}.mp3")
+    log.info(f"Audio message sent successfully: SM{'1' * 32}")
+    log.info(f"Paired response completed. Text: {TEXT_RESULT}, Audio: SM{'1' * 32}")
+    log.info("send_paired_response returned: success=True, status=sent_paired")
+    log.info(f"Conversation for {PHONE} has been reset.")
+
+
+def current_request(log):
+    """The same request with the current log calls: lazy arguments, payloads at DEBUG."""
+    log.info("Message from %s in state %s", PHONE, 'COLLECTING_SYMPTOMS', extra=SAMPLED)
+    log.debug("Generating diagnosis for: %r", SYMPTOMS)
+    log.debug("🤖 Generating response for: %r", PROMPT)
+    log.debug("Raw model output: %r", RAW_OUTPUT)
+    log.info("✅ Generated response in %.2f seconds (%d chars)", 1.234, len(RAW_OUTPUT))
+    log.debug("Cleaning raw response: %r", RAW_OUTPUT[:200])
+    log.debug("Cleaned response: %r", CLEANED[:200])
+    log.info("Sending diagnosis to %s in %s mode", PHONE, 'FULL')
+    for step in ("🎯 Generating your voice response...", "🔊 Converting text to speech...",
+                 "⚡ Optimizing audio quality...", "💾 Saving optimized audio...", "✅ Voice response ready!"):
+        log.debug(step)
+    log.debug("Audio file generated: %s", AUDIO_PATH)
+    log.info("Sent %d segments to %s", 1, PHONE)
+    log.info("Paired response sent to %s: text %s, audio %s", PHONE, TEXT_RESULT['sid'], 'SM' + '1' * 32)
+
+
+class SlowFile:
+    """A file whose every write takes `delay` seconds longer."""
+
+    def __init__(self, path, delay):
+        self._file = open(path, 'w')
+        self.delay = delay
+
+    def write(self, text):
+        time.sleep(self.delay)
+        return self._file.write(text)
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def _reset_root():
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+
+
+def run(setup, stream, requests):
+    _reset_root()
+    log = logging.getLogger('bench.request')
+    pipeline = None
+    if setup == 'previous':
+        handler = logging.StreamHandler(stream)
+        handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+        logging.getLogger().addHandler(handler)
+        logging.getLogger().setLevel(logging.INFO)
+        replay = previous_request
+    else:
+        pipeline = LogPipeline('INFO', 'json', queue_size=10000, rate_limit=0, sample_rate=1.0, stream=stream)
+        replay = current_request
+
+    timings = []
+    start = time.perf_counter()
+    for i in range(requests):
+        token = request_id_var.set(f"{i:016x}")
+        t0 = time.perf_counter()
+        replay(log)
+        timings.append(time.perf_counter() - t0)
+        request_id_var.reset(token)
+    elapsed = time.perf_counter() - start
+    stats = {}
+    if pipeline is not None:
+        drain_start = time.perf_counter()
+        pipeline.stop()
+        stats = dict(pipeline.stats(), drain_seconds=time.perf_counter() - drain_start)
+    _reset_root()
+    timings.sort()
+    return {
+        'mean_us': statistics.mean(timings) * 1e6,
+        'p99_us': timings[int(len(timings) * 0.99)] * 1e6,
+        'requests_per_second': requests / elapsed,
+        **stats,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--sink-ms', type=float, default=0.5, help="added latency per write of the slow sink")
+    args = parser.parse_args()
+
+    print(f"{args.requests} requests, request-thread time for its log calls")
+    print(f"{'sink':<10} {'setup':<10} {'mean us':>9} {'p99 us':>9} {'req/s':>9} {'dropped':>8} {'drain s':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for sink in ('file', 'slow'):
+            for setup in ('previous', 'queued'):
+                path = os.path.join(tmp, f'{sink}-{setup}.log')
+                stream = open(path, 'w') if sink == 'file' else SlowFile(path, args.sink_ms / 1000)
+                result = run(setup, stream, args.requests)
+                stream.close()
+                print(f"{sink:<10} {setup:<10} {result['mean_us']:9.1f} {result['p99_us']:9.1f} "
+                      f"{result['requests_per_second']:9.0f} {result.get('dropped', '-'):>8} "
+                      f"{result.get('drain_seconds', 0):8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Cost of recording a latency observation from several threads: the sharded
+histogram in Backend.Pipeline.metrics against the same histogram behind a
+single lock, plus the time to render a scrape.
+
+    python benchmarks/bench_metrics.py [--threads 8] [--observations 200000]
+"""
+import argparse
+from bisect import bisect_left
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from Backend.Pipeline.metrics import DEFAULT_BUCKETS, MetricsRegistry  # noqa: E402
+
+
+class LockedHistogram:
+    """One shared set of buckets guarded by a lock, as a naive collector would do it."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        with self.lock:
+            self.counts[bisect_left(self.buckets, value)] += 1
+            self.sum += value
+
+
+def run_threads(observe, threads, observations):
+    def work():
+        for i in range(observations):
+            observe((i % 1000) / 100)
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--observations', type=int, default=200_000, help="per thread")
+    args = parser.parse_args()
+    total = args.threads * args.observations
+
+    registry = MetricsRegistry()
+    sharded = registry.histogram('stage_seconds', 'bench', ['stage']).labels(stage='generation')
+    locked = LockedHistogram()
+
+    for name, observe in (('locked', locked.observe), ('sharded', sharded.observe)):
+        elapsed = run_threads(observe, args.threads, args.observations)
+        print(f"{name:8} {total} observations on {args.threads} threads: {elapsed:.2f}s "
+              f"({elapsed / total * 1e9:.0f} ns each)")
+
+    _, count, _ = sharded.snapshot()
+    assert count == total, (count, total)
+
+    stages = registry.histogram('request_seconds', 'bench', ['endpoint'])
+    for i in range(50):
+        stages.labels(endpoint=f"e{i}").observe(0.1)
+    start = time.perf_counter()
+    body = registry.render()
+    print(f"render   {len(body.splitlines())} lines in {(time.perf_counter() - start) * 1000:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+Latency and memory of text generation on the PyTorch and ONNX Runtime
+backends, each in a fresh process: PyTorch, ONNX with an empty export cache
+(load time includes the export) and ONNX loading the cached export.
+
+    python benchmarks/bench_onnx_backend.py --model gpt2 [--prompts 8] [--repeat 2] [--threads 4]
+
+Needs `optimum[onnxruntime]`; without it the ONNX rows report the PyTorch
+fallback.
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from Backend.Model.evaluate import run_variant  # noqa: E402
+
+
+def _fmt(value, spec, scale=1):
+    return format(value * scale, spec) if value is not None else '-'
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', default='gpt2')
+    parser.add_argument('--prompts', type=int, default=8)
+    parser.add_argument('--repeat', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=0, help="ONNX intra-op threads (0: one worker's share of the CPUs)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        onnx_env = {'GPT_MODEL': args.model, 'MODEL_BACKEND': 'onnx', 'ONNX_CACHE_DIR': cache_dir,
+                    'ONNX_INTRA_OP_THREADS': args.threads}
+        runs = [
+            ('pytorch', {'GPT_MODEL': args.model, 'MODEL_BACKEND': 'pytorch'}),
+            ('onnx, exporting', onnx_env),
+            ('onnx, cached', onnx_env),
+        ]
+        results = [run_variant({'name': name, 'env': env}, args.repeat, args.prompts) for name, env in runs]
+
+    print(f"{args.model}, {args.prompts} prompts x {args.repeat}, {os.cpu_count()} CPUs")
+    print(f"{'run':<16} {'backend':<8} {'load s':>7} {'RSS MB':>7} {'peak MB':>8} {'first s':>8} "
+          f"{'TTFT ms':>8} {'p50 s':>7} {'p95 s':>7} {'tok/s':>7} {'tokens':>7}")
+    for result in results:
+        if 'error' in result:
+            print(f"{result['name']:<16} failed: {result['error']}")
+            continue
+        s = result['summary']
+        print(f"{result['name']:<16} {s['backend']:<8} {_fmt(s['load_seconds'], '7.1f')} {_fmt(s['rss_loaded_mb'], '7.0f')} "
+              f"{_fmt(s['peak_rss_mb'], '8.0f')} {_fmt(s['first_response_seconds'], '8.2f')} "
+              f"{_fmt(s['ttft_p50_seconds'], '8.0f', 1000)} {_fmt(s['latency_p50_seconds'], '7.2f')} "
+              f"{_fmt(s['latency_p95_seconds'], '7.2f')} {_fmt(s['tokens_per_second'], '7.1f')} "
+              f"{_fmt(s['mean_new_tokens'], '7.0f')}")
+
+
+if __name__ == '__main__':
+    main()
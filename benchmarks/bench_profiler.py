@@ -0,0 +1,65 @@
+"""
+Slowdown caused by the sampling profiler: a CPU-bound Python workload
+(regex cleanup and intent detection, like the webhook's own work) timed
+alone and while the profiler samples at several intervals, with a number
+of idle worker threads alive as in the app. The time the sampler itself
+spends walking stacks is the steadier figure; on a small noisy VM the
+throughput comparison can swing by several percent either way.
+
+    python benchmarks/bench_profiler.py [--seconds 1] [--repeat 5] [--idle-threads 8]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from Backend.Model.intent_matcher import get_matcher  # noqa: E402
+from Backend.Pipeline.profiler import ProfileSession  # noqa: E402
+
+MESSAGE = "hi, my son has had a fever since yesterday and now he has a rash and keeps vomiting " * 4
+
+
+def workload(seconds):
+    """Runs intent detection in a loop; returns iterations per second."""
+    matcher = get_matcher()
+    iterations = 0
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        matcher.detect(MESSAGE)
+        iterations += 1
+    return iterations / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--seconds', type=float, default=1)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--idle-threads', type=int, default=8)
+    args = parser.parse_args()
+
+    stop = threading.Event()
+    for i in range(args.idle_threads):
+        threading.Thread(target=stop.wait, name=f"idle-{i}", daemon=True).start()
+
+    workload(1)  # warm up the matcher and caches
+    # Baseline and profiled runs are interleaved and the best of each kept,
+    # so drift in machine speed affects both sides alike
+    for interval_ms in (20, 10, 5, 1):
+        baseline, profiled, busy = [], [], []
+        for _ in range(args.repeat):
+            baseline.append(workload(args.seconds))
+            session = ProfileSession(seconds=args.seconds + 5, interval=interval_ms / 1000).start()
+            profiled.append(workload(args.seconds))
+            session.stop()
+            busy.append(session.report()['overhead_percent'])
+        slowdown = 100 * (1 - max(profiled) / max(baseline))
+        print(f"{interval_ms:>3} ms interval: {max(baseline):8.0f} detections/s without, {max(profiled):8.0f} with "
+              f"({slowdown:+.1f}%), sampler busy {max(busy)}% of the time")
+    stop.set()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""
+Cost and bounds of the per-number rate limiter in Backend.Pipeline.rate_limit.
+
+Growth: --users distinct numbers each send one message, --rate-per-second
+messages a second on a simulated clock. Reports the time per check, how
+many buckets are held and the memory they take, for the in-memory backend
+with idle pruning and with the max_keys cap alone.
+
+Spam: one number sends --spam messages in a few seconds while other users
+keep writing. Reports how many of the spammer's messages get through, how
+many notices go out, and that other users are never throttled.
+
+The Redis backend is included when REDIS_URL is set, or when fakeredis is
+installed (in-process, so it shows the script's cost and not the network).
+
+    python benchmarks/bench_rate_limit.py [--users 1000000] [--spam 500]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from Backend.Pipeline.rate_limit import Decision, InMemoryRateLimiter, RedisRateLimiter  # noqa: E402
+
+PER_MINUTE = 6
+BURST = 10
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _number(i):
+    return f'whatsapp:+2376{i:08d}'
+
+
+def _grow(limiter, clock, users, rate_per_second):
+    for i in range(users):
+        clock.now = i / rate_per_second
+        limiter.check(_number(i))
+
+
+def growth(name, make_limiter, users, rate_per_second):
+    # Timed and measured in separate runs: tracemalloc slows every allocation down
+    clock = Clock()
+    limiter = make_limiter(clock)
+    start = time.perf_counter()
+    _grow(limiter, clock, users, rate_per_second)
+    elapsed = time.perf_counter() - start
+    stats = limiter.stats()
+
+    clock = Clock()
+    limiter = make_limiter(clock)
+    tracemalloc.start()
+    _grow(limiter, clock, users, rate_per_second)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<22} {elapsed / users * 1e6:9.2f} {stats['tracked']:>9} {stats['evicted']:>9} {peak / 2**20:9.1f}")
+
+
+def spam(name, limiter, clock, messages, others):
+    clock.now = 0.0
+    spammer = _number(99_999_999)
+    spam_decisions = {decision: 0 for decision in Decision}
+    others_throttled = 0
+    for i in range(messages):
+        # The spammer sends 100 messages a second; every tenth tick another user writes once
+        clock.now = i / 100
+        spam_decisions[limiter.check(spammer)] += 1
+        if i % 10 == 0:
+            others_throttled += limiter.check(_number(i // 10 % others)) != Decision.ALLOW
+    print(f"{name:<22} {messages:>6} {spam_decisions[Decision.ALLOW]:>8} {spam_decisions[Decision.THROTTLE]:>8} "
+          f"{spam_decisions[Decision.THROTTLE_SILENT]:>8} {others_throttled:>15}")
+
+
+def _redis_client():
+    url = os.environ.get('REDIS_URL')
+    if url:
+        import redis
+        return f'redis ({url})', redis.Redis.from_url(url)
+    try:
+        import fakeredis
+    except ImportError:
+        return None, None
+    return 'redis (fakeredis)', fakeredis.FakeRedis()
+
+
+def redis_latency(name, client, checks):
+    limiter = RedisRateLimiter(client, PER_MINUTE, BURST, prefix='bench:ratelimit:')
+    start = time.perf_counter()
+    for i in range(checks):
+        limiter.check(_number(i % 1000))
+    elapsed = time.perf_counter() - start
+    for key in client.scan_iter('bench:ratelimit:*'):
+        client.delete(key)
+    print(f"{name}: {elapsed / checks * 1e6:.1f} us per check over {checks} checks, "
+          f"{limiter.stats()['errors']} errors, key TTL {limiter.idle_seconds:.0f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=1_000_000)
+    parser.add_argument('--rate-per-second', type=float, default=200, help="new users a second on the simulated clock")
+    parser.add_argument('--max-keys', type=int, default=100_000)
+    parser.add_argument('--spam', type=int, default=500, help="messages sent by the spamming number")
+    parser.add_argument('--redis-checks', type=int, default=5000)
+    args = parser.parse_args()
+
+    def make_limiter(clock):
+        return InMemoryRateLimiter(PER_MINUTE, BURST, max_keys=args.max_keys, clock=clock)
+
+    print(f"{PER_MINUTE}/minute, burst {BURST}: {args.users} users, {args.rate_per_second:.0f} new a second")
+    print(f"{'limiter':<22} {'us/check':>9} {'tracked':>9} {'evicted':>9} {'peak MB':>9}")
+    growth('memory (idle pruning)', make_limiter, args.users, args.rate_per_second)
+    # A rate high enough that no bucket goes idle: only max_keys bounds the dict
+    growth('memory (max_keys only)', make_limiter, args.users, 1e9)
+
+    print(f"\n{'spam':<22} {'sent':>6} {'allowed':>8} {'notices':>8} {'silent':>8} {'others throttled':>15}")
+    clock = Clock()
+    spam('memory', InMemoryRateLimiter(PER_MINUTE, BURST, clock=clock), clock, args.spam, others=20)
+
+    name, client = _redis_client()
+    if client is None:
+        print("\nredis: skipped (set REDIS_URL or install fakeredis)")
+        return
+    print()
+    redis_latency(name, client, args.redis_checks)
+
+
+if __name__ == '__main__':
+    main()
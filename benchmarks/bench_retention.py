@@ -0,0 +1,76 @@
+"""
+Live table size and history query latency before and after archiving a
+year of conversations down to the last 90 days, plus the cost of reading
+history back from the archive. Each synthetic user writes in sessions of
+six messages, spread over the year.
+
+    python benchmarks/bench_retention.py [--rows 1000000] [--codec gzip|zstd]
+"""
+import argparse
+from datetime import datetime, timedelta
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from flask import Flask  # noqa: E402
+from sqlalchemy import create_engine, text  # noqa: E402
+
+from Backend.database.data import init_database  # noqa: E402
+from Backend.database.retention import archive_conversations, measure, read_archived_history  # noqa: E402
+
+
+def seed(path, rows, days=365):
+    connection = sqlite3.connect(path)
+    start = datetime.utcnow() - timedelta(days=days)
+    step = days * 86400 / rows
+    connection.executemany(
+        "INSERT INTO conversation (phone_number, timestamp, user_input, bot_response, response_time, status) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        ((f"whatsapp:+2376{(i // 6) % 20000:08d}", (start + timedelta(seconds=i * step)).isoformat(sep=' '),
+          "My child has had a fever and a cough for two days",
+          "*Diagnosis*: likely a viral infection. *First Aid Steps*: fluids, rest, paracetamol for the fever.",
+          2.0, 'sent') for i in range(rows))
+    )
+    connection.commit()
+    connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--codec', choices=('gzip', 'zstd'), default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'retention.db')
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{path}"
+        init_database(app)
+        seed(path, args.rows)
+        engine = create_engine(f"sqlite:///{path}")
+        phones = [f"whatsapp:+2376{i:08d}" for i in range(0, 20000, 1000)]
+
+        print(f"before: {measure(engine, phones)}")
+        start = time.perf_counter()
+        rows, written = archive_conversations(engine, os.path.join(tmp, 'archive'),
+                                              datetime.utcnow() - timedelta(days=90), codec=args.codec)
+        elapsed = time.perf_counter() - start
+        print(f"archived {rows} rows into {written / 2**20:.1f} MB in {elapsed:.1f}s ({rows / elapsed:.0f} rows/s)")
+        with engine.connect() as connection:
+            start = time.perf_counter()
+            connection.execute(text("VACUUM"))
+            print(f"vacuum: {time.perf_counter() - start:.1f}s")
+        print(f"after:  {measure(engine, phones)}")
+
+        with engine.connect() as connection:
+            start = time.perf_counter()
+            page = read_archived_history(connection, phones[0], limit=10)
+            print(f"archived history page ({len(page)} rows): {(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
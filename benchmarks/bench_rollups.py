@@ -0,0 +1,104 @@
+"""
+Answering "p95 response time per hour" from the raw conversation table
+against the rollup table, plus the cost of the incremental rollup run.
+
+    python benchmarks/bench_rollups.py [--rows 1000000]
+"""
+import argparse
+from datetime import datetime, timedelta
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from flask import Flask  # noqa: E402
+from sqlalchemy import create_engine, text  # noqa: E402
+
+from Backend.database.data import init_database  # noqa: E402
+from Backend.database.rollups import apply_rollups, create_rollup_tables, query_rollups  # noqa: E402
+
+
+def seed(path, rows, start_id=0, base=datetime(2025, 1, 1)):
+    connection = sqlite3.connect(path)
+    rng = random.Random(start_id)
+    connection.executemany(
+        "INSERT INTO conversation (phone_number, timestamp, user_input, bot_response, response_time, status) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        ((f"whatsapp:+2376{i % 5000:08d}", (base + timedelta(seconds=i * 5)).isoformat(sep=' '),
+          "fever and cough", "*Diagnosis*: common cold", rng.lognormvariate(1.5, 0.6),
+          'failed' if rng.random() < 0.02 else 'sent') for i in range(start_id, start_id + rows))
+    )
+    connection.commit()
+    connection.close()
+
+
+def raw_p95_per_hour(engine, start, end):
+    """What answering the question costs without rollups: scan and sort every row in range."""
+    by_hour = {}
+    with engine.connect() as connection:
+        for timestamp, response_time in connection.execute(text(
+                "SELECT timestamp, response_time FROM conversation "
+                "WHERE timestamp >= :start AND timestamp < :end AND response_time IS NOT NULL"),
+                {'start': start.isoformat(sep=' '), 'end': end.isoformat(sep=' ')}):
+            by_hour.setdefault(timestamp[:13], []).append(response_time)
+    return {hour: statistics.quantiles(values, n=20)[-1] for hour, values in by_hour.items()}
+
+
+def timed(fn, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'rollups.db')
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{path}"
+        init_database(app)
+        seed(path, args.rows)
+        engine = create_engine(f"sqlite:///{path}")
+        create_rollup_tables(engine)
+
+        start = time.perf_counter()
+        processed = apply_rollups(engine)
+        elapsed = time.perf_counter() - start
+        print(f"initial rollup: {processed} rows in {elapsed:.2f}s ({processed / elapsed:.0f} rows/s)")
+
+        seed(path, 1000, start_id=args.rows)
+        start = time.perf_counter()
+        processed = apply_rollups(engine)
+        print(f"incremental rollup: {processed} new rows in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        range_end = datetime(2025, 1, 1) + timedelta(seconds=args.rows * 5)
+        range_start = range_end - timedelta(days=7)
+        raw_seconds, raw = timed(lambda: raw_p95_per_hour(engine, range_start, range_end), repeat=3)
+
+        def from_rollups():
+            with engine.connect() as connection:
+                return query_rollups(connection, 'hour', range_start, range_end)
+        rollup_seconds, summary = timed(from_rollups)
+
+        hours = sorted(raw)
+        errors = [abs(bucket['latency']['p95'] - raw[hour]) / raw[hour]
+                  for hour, bucket in zip(hours, summary['buckets'])]
+        print(f"p95 per hour over 7 days ({len(hours)} hours)")
+        print(f"  raw table scan : {raw_seconds * 1000:9.1f} ms")
+        print(f"  rollup table   : {rollup_seconds * 1000:9.1f} ms")
+        print(f"  p95 relative error: mean {statistics.mean(errors):.1%}, max {max(errors):.1%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+Searching conversations through the FTS5 index against a LIKE '%...%' scan
+of user_input and bot_response, on a synthetic corpus where each term
+appears in a small share of rows. Also reports the one-off index build time
+and what the sync triggers add to inserts. The LIKE page is unranked and
+stops at the first 20 hits in id order, so it is only cheap for common terms;
+the count columns show the cost of visiting every match.
+
+    python benchmarks/bench_search.py [--rows 1000000]
+"""
+import argparse
+from datetime import datetime, timedelta
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from flask import Flask  # noqa: E402
+from sqlalchemy import create_engine, text  # noqa: E402
+
+from Backend.database.data import init_database  # noqa: E402
+from Backend.database.search import create_search_index, search_conversations  # noqa: E402
+
+COMMON = ("fever", "cough", "headache", "vomiting", "diarrhoea", "tired", "not eating", "crying", "cold", "pain")
+RARE = ("rash", "convulsion", "stiff neck", "blood in stool", "swollen eyes")
+REPLIES = (
+    "*Diagnosis*: likely a viral infection. *First Aid Steps*: give fluids and rest.",
+    "*Diagnosis*: possible malaria. *First Aid Steps*: visit a clinic for a rapid test.",
+    "*Diagnosis*: common cold. *First Aid Steps*: keep warm, clear the nose, give fluids.",
+)
+INSERT = ("INSERT INTO conversation (phone_number, timestamp, user_input, bot_response, response_time, status) "
+          "VALUES (?, ?, ?, ?, ?, ?)")
+
+
+def rows(count, start=0):
+    rng = random.Random(start)
+    base = datetime(2025, 1, 1)
+    for i in range(start, start + count):
+        symptoms = rng.sample(COMMON, 2)
+        if rng.random() < 0.01:
+            symptoms.append(rng.choice(RARE))
+        yield (f"whatsapp:+2376{i % 20000:08d}", (base + timedelta(seconds=i * 5)).isoformat(sep=' '),
+               f"my child has {' and '.join(symptoms)} since yesterday", rng.choice(REPLIES), 2.0, 'sent')
+
+
+def timed(fn, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'search.db')
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{path}"
+        app.config['SEARCH_INDEX'] = False
+        init_database(app)
+        connection = sqlite3.connect(path)
+        connection.executemany(INSERT, rows(args.rows))
+        connection.commit()
+        connection.close()
+
+        engine = create_engine(f"sqlite:///{path}")
+        start = time.perf_counter()
+        create_search_index(engine)
+        print(f"index build for {args.rows} rows: {time.perf_counter() - start:.1f}s")
+
+        print(f"{'query':<16} {'LIKE first 20':>14} {'FTS5 first 20':>14} {'LIKE count':>11} {'FTS5 count':>11} {'matches':>8}")
+        with engine.connect() as connection:
+            for term in ("rash", "convulsion", "stiff neck", "fever"):
+                like = text("SELECT id FROM conversation WHERE user_input LIKE :p OR bot_response LIKE :p "
+                            "ORDER BY id LIMIT 20")
+                like_count = text("SELECT count(*) FROM conversation WHERE user_input LIKE :p OR bot_response LIKE :p")
+                fts_count = text("SELECT count(*) FROM conversation_fts WHERE conversation_fts MATCH :q")
+                pattern = {'p': f"%{term}%"}
+                quoted = {'q': ' AND '.join(f'"{word}"' for word in term.split())}
+                like_page, _ = timed(lambda: connection.execute(like, pattern).all(), repeat=3)
+                fts_page, _ = timed(lambda: search_conversations(connection, term, limit=20))
+                like_total, (count,) = timed(lambda: connection.execute(like_count, pattern).one(), repeat=3)
+                fts_total, _ = timed(lambda: connection.execute(fts_count, quoted).one())
+                print(f"{term:<16} {like_page * 1000:>11.1f} ms {fts_page * 1000:>11.1f} ms "
+                      f"{like_total * 1000:>8.1f} ms {fts_total * 1000:>8.1f} ms {count:>8}")
+
+        for label, with_index in (("without triggers", False), ("with triggers", True)):
+            trial = os.path.join(tmp, f"insert-{with_index}.db")
+            trial_app = Flask(label)
+            trial_app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{trial}"
+            trial_app.config['SEARCH_INDEX'] = with_index
+            init_database(trial_app)
+            connection = sqlite3.connect(trial)
+            batch = list(rows(100_000))
+            start = time.perf_counter()
+            for i in range(0, len(batch), 100):  # the log writer's batch size
+                connection.executemany(INSERT, batch[i:i + 100])
+                connection.commit()
+            elapsed = time.perf_counter() - start
+            connection.close()
+            print(f"insert 100k rows in batches of 100, {label}: {elapsed:.2f}s ({len(batch) / elapsed:.0f} rows/s)")
+
+
+if __name__ == '__main__':
+    main()
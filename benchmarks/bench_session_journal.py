@@ -0,0 +1,72 @@
+"""
+Write-behind session journal: cost on the request path, background write
+throughput and restore time for a large number of sessions.
+
+    python benchmarks/bench_session_journal.py [--ops 200000] [--sessions 200000]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from Backend.Model.session_journal import SessionJournal  # noqa: E402
+
+
+def wait_drained(journal, expected):
+    while journal.written + journal.dropped < expected:
+        time.sleep(0.01)
+
+
+def throughput(directory, ops):
+    journal = SessionJournal(directory, snapshot_interval=3600, max_pending=ops).start()
+    journal.wait_restored()  # The (empty) restore
+    expires_at = time.time() + 1800
+
+    start = time.perf_counter()
+    for i in range(ops):
+        journal.record('append', f"whatsapp:+2376{i % 50000:08d}", "fever and cough since yesterday", expires_at)
+    enqueue_seconds = time.perf_counter() - start
+    wait_drained(journal, ops)
+    total_seconds = time.perf_counter() - start
+    journal.close()
+
+    print(f"request path:   {enqueue_seconds / ops * 1e6:.2f} us per operation")
+    print(f"journal writes: {journal.written / total_seconds:,.0f} ops/s ({journal.dropped} dropped)")
+
+
+def restore(directory, sessions):
+    journal = SessionJournal(directory, snapshot_interval=3600, max_pending=sessions * 2).start()
+    journal.wait_restored()
+    expires_at = time.time() + 1800
+    for i in range(sessions):
+        phone = f"whatsapp:+2377{i:08d}"
+        journal.record('type', phone, 'COLLECTING_SYMPTOMS', expires_at)
+        journal.record('append', phone, "fever and cough since yesterday", expires_at)
+    wait_drained(journal, sessions * 2)
+    start = time.perf_counter()
+    journal.close()
+    print(f"compaction:     {time.perf_counter() - start:.2f}s for {sessions:,} sessions "
+          f"({os.path.getsize(journal.snapshot_path) / 1e6:.1f} MB snapshot)")
+
+    restored = SessionJournal(directory).start()
+    restored.wait_restored()
+    print(f"restore:        {restored.restore_seconds:.2f}s for {restored.restored_sessions:,} sessions")
+    restored.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ops', type=int, default=200000)
+    parser.add_argument('--sessions', type=int, default=200000)
+    args = parser.parse_args()
+
+    for run in (lambda d: throughput(d, args.ops), lambda d: restore(d, args.sessions)):
+        directory = tempfile.mkdtemp(prefix='session-journal-')
+        try:
+            run(directory)
+        finally:
+            shutil.rmtree(directory)
@@ -0,0 +1,99 @@
+"""
+Per-message overhead of the conversation session stores. A message costs one
+load plus one symptom append, which is what the webhook does while collecting
+symptoms.
+
+    python benchmarks/bench_session_store.py [--users 2000] [--messages 5]
+    python benchmarks/bench_session_store.py --synthetic-users 1000000
+
+Set REDIS_URL to also measure a real Redis server. --synthetic-users fills the
+bounded in-memory store with that many users on a simulated clock and reports
+insert rate, memory, expiry and eviction costs.
+"""
+import argparse
+import os
+import resource
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from Backend.Model.session_store import InMemorySessionStore, RedisSessionStore  # noqa: E402
+from Backend.Model.local_redis import LocalRedis  # noqa: E402
+
+
+def run(store, users, messages):
+    phones = [f"whatsapp:+2376{i:08d}" for i in range(users)]
+    start = time.perf_counter()
+    for round_ in range(messages):
+        for phone in phones:
+            store.load(phone)
+            store.append_symptom(phone, f"symptom {round_}: fever and cough since yesterday")
+    elapsed = time.perf_counter() - start
+    for phone in phones:
+        store.delete(phone)
+    return elapsed / (users * messages) * 1e6
+
+
+def rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def synthetic_users(users):
+    clock = [0.0]
+    ttl = 1800
+    # Cap below the user count so the LRU fallback is exercised too
+    store = InMemorySessionStore(ttl_seconds=ttl, max_sessions=int(users * 0.9), clock=lambda: clock[0])
+    rss_before = rss_mb()
+
+    start = time.perf_counter()
+    for i in range(users):
+        # Users arrive evenly over one TTL
+        clock[0] = ttl * i / users
+        store.append_symptom(f"whatsapp:+2376{i:08d}", "fever and cough since yesterday")
+    insert_seconds = time.perf_counter() - start
+    filled = store.stats()
+    rss_after = rss_mb()
+
+    # Half the sessions pass their TTL
+    clock[0] = ttl * 1.5
+    start = time.perf_counter()
+    store.count()
+    half_expiry_seconds = time.perf_counter() - start
+
+    clock[0] = ttl * 3
+    start = time.perf_counter()
+    store.count()
+    full_expiry_seconds = time.perf_counter() - start
+    drained = store.stats()
+
+    print(f"users inserted:          {users:,} ({users / insert_seconds:,.0f}/s, {insert_seconds / users * 1e6:.2f} us each)")
+    print(f"sessions held (cap):     {filled['sessions']:,} ({filled['max_sessions']:,}), LRU evictions {filled['evicted']:,}")
+    print(f"memory gauge:            {filled['memory_bytes'] / 1e6:,.1f} MB ({filled['memory_bytes'] / max(filled['sessions'], 1):.0f} B/session)")
+    print(f"peak RSS growth:         {rss_after - rss_before:,.1f} MB")
+    print(f"expire ~half:            {half_expiry_seconds * 1000:,.1f} ms")
+    print(f"expire remainder:        {full_expiry_seconds * 1000:,.1f} ms (expired total {drained['expired']:,}, left {drained['sessions']})")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--messages', type=int, default=5)
+    parser.add_argument('--synthetic-users', type=int, default=0)
+    args = parser.parse_args()
+
+    if args.synthetic_users:
+        synthetic_users(args.synthetic_users)
+        sys.exit(0)
+
+    stores = [
+        ('in-memory', InMemorySessionStore()),
+        ('redis (local stand-in)', RedisSessionStore(LocalRedis(), prefix='bench:session:')),
+    ]
+    if os.environ.get('REDIS_URL'):
+        import redis
+        stores.append(('redis', RedisSessionStore(redis.Redis.from_url(os.environ['REDIS_URL']), prefix='bench:session:')))
+
+    print(f"{'store':<26}{'us/message':>12}")
+    for name, store in stores:
+        print(f"{name:<26}{run(store, args.users, args.messages):>12.1f}")
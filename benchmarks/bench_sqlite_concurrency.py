@@ -0,0 +1,138 @@
+"""
+Many history readers alongside one steady writer, each in its own process
+like gunicorn workers, with SQLite's default settings against the tuned
+profile (WAL, synchronous=NORMAL, busy timeout).
+
+    python benchmarks/bench_sqlite_concurrency.py [--readers 8] [--seconds 10] [--rows 200000]
+"""
+import argparse
+from datetime import datetime, timedelta
+import os
+import random
+import multiprocessing
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from flask import Flask  # noqa: E402
+
+from Backend.database.data import Conversation, db, init_database  # noqa: E402
+
+PHONES = [f"whatsapp:+2376{i:08d}" for i in range(5000)]
+
+
+def make_app(path, tuned):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{path}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    if not tuned:
+        app.config['SQLITE_PRAGMAS'] = {}
+    init_database(app)
+    return app
+
+
+def seed(app, rows):
+    start = datetime.utcnow() - timedelta(days=30)
+    with app.app_context(), db.engine.begin() as connection:
+        batch = []
+        for i in range(rows):
+            batch.append({
+                'phone_number': random.choice(PHONES),
+                'timestamp': start + timedelta(seconds=i * 10),
+                'user_input': 'fever and cough', 'bot_response': '*Diagnosis*: common cold',
+                'response_time': random.uniform(1, 20), 'status': 'sent',
+            })
+            if len(batch) == 100:
+                connection.execute(Conversation.__table__.insert().values(batch))
+                batch = []
+
+
+def reader(path, tuned, seconds, results):
+    app = make_app(path, tuned)
+    latencies, errors = [], 0
+    deadline = time.monotonic() + seconds
+    with app.app_context():
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                Conversation.query.filter_by(phone_number=random.choice(PHONES)).order_by(
+                    Conversation.timestamp.desc()).limit(10).all()
+                latencies.append(time.perf_counter() - start)
+            except Exception:
+                errors += 1
+            finally:
+                db.session.remove()
+    results.put(('read', latencies, errors))
+
+
+def writer(path, tuned, seconds, writes_per_second, results):
+    app = make_app(path, tuned)
+    latencies, errors = [], 0
+    deadline = time.monotonic() + seconds
+    with app.app_context():
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                with db.engine.begin() as connection:
+                    connection.execute(Conversation.__table__.insert().values([{
+                        'phone_number': random.choice(PHONES), 'timestamp': datetime.utcnow(),
+                        'user_input': 'rash', 'bot_response': '*Diagnosis*: eczema',
+                        'response_time': 3.0, 'status': 'sent',
+                    }]))
+                latencies.append(time.perf_counter() - start)
+            except Exception:
+                errors += 1
+            time.sleep(max(0.0, 1 / writes_per_second - (time.perf_counter() - start)))
+    results.put(('write', latencies, errors))
+
+
+def percentile(samples, pct):
+    return samples[min(len(samples) - 1, int(len(samples) * pct))] * 1000 if samples else float('nan')
+
+
+def run(path, tuned, readers, seconds, writes_per_second):
+    """Readers and the writer run in separate processes, like gunicorn workers."""
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=reader, args=(path, tuned, seconds, results)) for _ in range(readers)]
+    processes.append(multiprocessing.Process(target=writer, args=(path, tuned, seconds, writes_per_second, results)))
+    for process in processes:
+        process.start()
+    reads, writes, errors = [], [], {'read': 0, 'write': 0}
+    for _ in processes:
+        kind, latencies, failed = results.get()
+        (reads if kind == 'read' else writes).extend(latencies)
+        errors[kind] += failed
+    for process in processes:
+        process.join()
+    reads.sort()
+    writes.sort()
+    return {
+        'reads/s': len(reads) / seconds,
+        'read p50': percentile(reads, 0.5), 'read p99': percentile(reads, 0.99),
+        'writes/s': len(writes) / seconds,
+        'write p50': percentile(writes, 0.5), 'write p99': percentile(writes, 0.99),
+        'errors': errors,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--writes-per-second', type=float, default=50)
+    args = parser.parse_args()
+
+    columns = ['reads/s', 'read p50', 'read p99', 'writes/s', 'write p50', 'write p99']
+    print(f"{'profile':<10}" + "".join(f"{c:>11}" for c in columns) + "  errors   (latencies in ms)")
+    for name, tuned in [('default', False), ('tuned', True)]:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'bench.db')
+            app = make_app(path, tuned)
+            seed(app, args.rows)
+            with app.app_context():
+                db.engine.dispose()
+            result = run(path, tuned, args.readers, args.seconds, args.writes_per_second)
+            print(f"{name:<10}" + "".join(f"{result[c]:>11,.1f}" for c in columns) + f"  {result['errors']}")
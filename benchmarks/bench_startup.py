@@ -0,0 +1,173 @@
+"""
+Startup cost of the app.
+
+Import report (default): what `import Backend.FlaskAPI.flasky` spends its
+time on, from `python -X importtime`, and whether any of the heavy modules
+that should only load on use (torch, transformers, gTTS, pydub, ...) came in.
+With --budget-ms the run fails when the import takes longer, which makes
+startup regressions visible in CI.
+
+    python benchmarks/bench_startup.py [--top 15] [--budget-ms 1500]
+
+Workers (--workers N): starts gunicorn with N workers from src/gunicorn.conf.py,
+without and with preload, and reports the time until every worker answers
+/ready and the RSS and PSS of all processes. PSS splits shared pages between
+the processes sharing them, so its total is the memory actually used.
+
+    python benchmarks/bench_startup.py --workers 4 --model gpt2
+"""
+import argparse
+import os
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+HEAVY_MODULES = ('torch', 'transformers', 'onnxruntime', 'optimum', 'gtts', 'pydub', 'speech_recognition', 'boto3')
+IMPORTTIME_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)')
+
+
+def _env(**overrides):
+    env = dict(os.environ)
+    env.setdefault('TWILIO_ACCOUNT_SID', 'AC00000000000000000000000000000000')
+    env.setdefault('TWILIO_AUTH_TOKEN', 'benchmark')
+    env.setdefault('TWILIO_NUMBER', '+14155238886')
+    env.update({key: str(value) for key, value in overrides.items()})
+    return env
+
+
+def import_report(top, budget_ms):
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import Backend.FlaskAPI.flasky'],
+                            cwd=SRC, env=_env(), capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        sys.exit(f"import failed:\n{result.stderr[-2000:]}")
+
+    modules = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+    # Modules are listed as they finish, so the app's imports are the lines
+    # between the previous top-level module and the app module itself
+    end = next(i for i, m in enumerate(modules) if m[0] == 'Backend.FlaskAPI.flasky')
+    begin = max((i for i in range(end) if modules[i][3] == 0), default=-1) + 1
+    total_ms = modules[end][2] / 1000
+
+    # The app module and its direct imports, most expensive first
+    top_level = sorted((m for m in modules[begin:end + 1] if m[3] <= 1), key=lambda m: m[2], reverse=True)
+    print(f"import Backend.FlaskAPI.flasky: {total_ms:.0f} ms ({wall:.2f}s with interpreter start), "
+          f"{len(modules)} modules")
+    print(f"{'module':<48} {'cumulative ms':>14} {'self ms':>8}")
+    for name, self_us, cumulative_us, _ in top_level[:top]:
+        print(f"{name:<48} {cumulative_us / 1000:14.1f} {self_us / 1000:8.1f}")
+
+    loaded = {name.split('.')[0] for name, *_ in modules}
+    heavy = [name for name in HEAVY_MODULES if name in loaded]
+    print(f"heavy modules imported: {', '.join(heavy) if heavy else 'none'}")
+    if budget_ms and total_ms > budget_ms:
+        sys.exit(f"import took {total_ms:.0f} ms, over the {budget_ms} ms budget")
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _children(pid):
+    children = []
+    for task in os.listdir(f'/proc/{pid}/task'):
+        with open(f'/proc/{pid}/task/{task}/children') as f:
+            children.extend(int(child) for child in f.read().split())
+    return children
+
+
+def _memory_mb(pid):
+    """RSS and PSS of one process, from /proc/<pid>/smaps_rollup."""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            key, _, rest = line.partition(':')
+            if key in ('Rss', 'Pss'):
+                values[key] = int(rest.split()[0]) / 1024
+    return values['Rss'], values['Pss']
+
+
+def run_gunicorn(workers, preload, model, timeout):
+    port = _free_port()
+    with tempfile.TemporaryDirectory() as tmp:
+        env = _env(WEB_CONCURRENCY=workers, GUNICORN_PRELOAD=int(preload), GUNICORN_BIND=f'127.0.0.1:{port}',
+                   GPT_MODEL=model, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'startup.db')}")
+        start = time.perf_counter()
+        server = subprocess.Popen([sys.executable, '-m', 'gunicorn'], cwd=SRC, env=env,
+                                  stdout=subprocess.DEVNULL, stderr=open(os.path.join(tmp, 'gunicorn.log'), 'w'))
+        try:
+            ready = set()
+            deadline = start + timeout
+            while len(ready) < workers and time.perf_counter() < deadline and server.poll() is None:
+                try:
+                    # A new connection each time, so any idle worker may accept it
+                    response = requests.get(f'http://127.0.0.1:{port}/ready', timeout=5,
+                                            headers={'Connection': 'close'})
+                    if response.status_code == 200:
+                        ready.add(response.json()['pid'])
+                        continue
+                except requests.RequestException:
+                    pass
+                time.sleep(0.05)
+            time_to_ready = time.perf_counter() - start
+            if len(ready) < workers:
+                with open(os.path.join(tmp, 'gunicorn.log')) as f:
+                    log = f.read()[-2000:]
+                return {'error': f"{len(ready)}/{workers} workers ready after {time_to_ready:.0f}s\n{log}"}
+
+            time.sleep(1)
+            pids = [server.pid] + _children(server.pid)
+            memory = [_memory_mb(pid) for pid in pids]
+            return {
+                'time_to_ready': time_to_ready,
+                'processes': len(pids),
+                'rss_mb': sum(rss for rss, _ in memory),
+                'pss_mb': sum(pss for _, pss in memory),
+                'worker_rss_mb': max(rss for rss, _ in memory[1:]),
+            }
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--budget-ms', type=float, default=0, help="fail when the import takes longer")
+    parser.add_argument('--workers', type=int, default=0, help="measure gunicorn startup with this many workers")
+    parser.add_argument('--model', default='gpt2')
+    parser.add_argument('--timeout', type=float, default=600)
+    args = parser.parse_args()
+
+    if not args.workers:
+        import_report(args.top, args.budget_ms)
+        return
+
+    print(f"{args.model}, {args.workers} gunicorn workers, {os.cpu_count()} CPUs")
+    print(f"{'mode':<10} {'ready s':>8} {'procs':>6} {'RSS MB':>8} {'PSS MB':>8} {'worker RSS MB':>14}")
+    for preload in (False, True):
+        name = 'preload' if preload else 'per-worker'
+        result = run_gunicorn(args.workers, preload, args.model, args.timeout)
+        if 'error' in result:
+            print(f"{name:<10} failed: {result['error']}")
+            continue
+        print(f"{name:<10} {result['time_to_ready']:8.1f} {result['processes']:6d} {result['rss_mb']:8.0f} "
+              f"{result['pss_mb']:8.0f} {result['worker_rss_mb']:14.0f}")
+
+
+if __name__ == '__main__':
+    main()
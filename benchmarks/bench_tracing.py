@@ -0,0 +1,76 @@
+"""
+Overhead of the tracing layer on an instrumented call: a plain function,
+then the same function under traced() with tracing off, with 1% sampling,
+and with every trace recorded and written to a JSON-lines file.
+
+    python benchmarks/bench_tracing.py [--calls 200000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from Backend.Pipeline.tracing import JsonLinesExporter, Tracer  # noqa: E402
+
+
+def make_request(tracer):
+    """A root span with two children, like a webhook calling generation and a Twilio send."""
+    @tracer.traced('send_message')
+    def send_message():
+        pass
+
+    @tracer.traced('get_ai_response')
+    def generate():
+        pass
+
+    @tracer.traced('whatsapp_webhook')
+    def webhook():
+        generate()
+        send_message()
+    return webhook
+
+
+def plain_request():
+    def send_message():
+        pass
+
+    def generate():
+        pass
+
+    def webhook():
+        generate()
+        send_message()
+    return webhook
+
+
+def run(fn, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--calls', type=int, default=200_000)
+    args = parser.parse_args()
+
+    baseline = run(plain_request(), args.calls)
+    print(f"{'untraced':12} {baseline:8.0f} ns per request")
+
+    with tempfile.TemporaryDirectory() as directory:
+        for label, rate in (('off', 0.0), ('1% sampled', 0.01), ('all sampled', 1.0)):
+            tracer = Tracer()
+            exporter = JsonLinesExporter(os.path.join(directory, 'traces.jsonl'), max_pending=args.calls * 3)
+            tracer.configure(rate, exporter)
+            elapsed = run(make_request(tracer), args.calls)
+            exporter.close()
+            print(f"{label:12} {elapsed:8.0f} ns per request (+{elapsed - baseline:.0f} ns), "
+                  f"{exporter.exported} spans written")
+
+
+if __name__ == '__main__':
+    main()
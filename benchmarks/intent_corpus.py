@@ -0,0 +1,71 @@
+"""
+Regression corpus for intent detection: real symptom descriptions and replies
+as parents type or dictate them, with the intents each one must produce.
+"""
+
+GREETING = 'greeting'
+AFFIRMATIVE = 'affirmative'
+NEGATIVE = 'negative'
+URGENT = 'urgent'
+
+CORPUS = [
+    # Symptom descriptions that must not end symptom collection
+    ("My son has a runny nose and a cough", set()),
+    ("she has had a nosebleed since this morning", set()),
+    ("there is a knot on his head after he fell", set()),
+    ("he is snoring loudly and has a blocked nose", set()),
+    ("abnormal rash on her stomach", set()),
+    ("the baby is not eating well", set()),
+    ("she keeps rubbing her nose and ears", set()),
+    ("high fever for two days", set()),
+    ("he has hiccups that won't stop", set()),
+    ("vomiting since yesterday and diarrhoea", set()),
+    ("he is teething and drooling a lot", set()),
+    ("my daughter is a bit warm and cranky", set()),
+    ("noisy breathing at night", set()),
+    ("pain in the abdomen", set()),
+    ("she has a sore throat and swollen glands", set()),
+    ("he's coughing up green phlegm", set()),
+    ("yellow crust around the eyes", set()),
+    ("he knocked his tooth out", set()),
+    ("she has a nodule on her neck", set()),
+    # Replies that end symptom collection
+    ("no", {NEGATIVE}),
+    ("No.", {NEGATIVE}),
+    ("nope", {NEGATIVE}),
+    ("nah that's it", {NEGATIVE}),
+    ("That's all", {NEGATIVE}),
+    ("that’s all thanks", {NEGATIVE}),
+    ("thats all", {NEGATIVE}),
+    ("that is all", {NEGATIVE}),
+    ("nothing else", {NEGATIVE}),
+    ("No more", {NEGATIVE}),
+    ("no thank you", {NEGATIVE}),
+    ("I'm done", {NEGATIVE}),
+    ("finished", {NEGATIVE}),
+    # Affirmative replies
+    ("yes", {AFFIRMATIVE}),
+    ("Yes, he also has a rash", {AFFIRMATIVE}),
+    ("ok", {AFFIRMATIVE}),
+    ("sure", {AFFIRMATIVE}),
+    # Greetings
+    ("hi", {GREETING}),
+    ("Hello!", {GREETING}),
+    ("hey there", {GREETING}),
+    ("Good morning nurse", {GREETING}),
+    ("good evening", {GREETING}),
+    # Emergencies, alone or mixed with other intents
+    ("my baby is not breathing", {URGENT}),
+    ("He stopped breathing for a moment", {URGENT}),
+    ("she can't breathe properly", {URGENT}),
+    ("she can’t breathe", {URGENT}),
+    ("he had a seizure an hour ago", {URGENT}),
+    ("he is having a fit", {URGENT}),
+    ("convulsions and high fever", {URGENT}),
+    ("the child is unconscious", {URGENT}),
+    ("he won't wake up", {URGENT}),
+    ("his lips are blue", {URGENT}),
+    ("my toddler swallowed poison", {URGENT}),
+    ("hi, he is having a seizure", {GREETING, URGENT}),
+    ("no pulse", {URGENT}),
+]
@@ -0,0 +1,44 @@
+"""
+Micro-benchmarks for the pure-Python code on the webhook's request path.
+
+    python -m pytest benchmarks/micro
+    python -m pytest benchmarks/micro --benchmark-save=baseline   # record a new baseline
+
+Baselines live in benchmarks/micro/baselines, one directory per machine
+(platform, interpreter and Python version); see the README.
+"""
+import glob
+import os
+import sys
+import warnings
+
+from pytest_benchmark.utils import get_machine_id
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINES = os.path.join(HERE, 'baselines')
+
+sys.path.insert(0, os.path.join(HERE, '..', '..', 'src'))
+
+# test_messaging gets the shared TwilioClient, which refuses to start without
+# credentials; fake ones will do, since no request is ever sent
+for name, value in (('TWILIO_ACCOUNT_SID', 'ACbenchmark'), ('TWILIO_AUTH_TOKEN', 'benchmark'),
+                    ('TWILIO_NUMBER', '+15550000000')):
+    os.environ.setdefault(name, value)
+
+
+def pytest_configure(config):
+    # Keep baselines next to the suite rather than in ./.benchmarks of
+    # whatever directory pytest was started from
+    if getattr(config.option, 'benchmark_storage', None) == 'file://./.benchmarks':
+        config.option.benchmark_storage = f"file://{BASELINES}"
+
+    # Nothing to compare against on a machine without a baseline: measure
+    # only, instead of failing on --benchmark-compare-fail
+    if config.option.benchmark_compare and not glob.glob(os.path.join(BASELINES, get_machine_id(), '*.json')):
+        warnings.warn(f"No micro-benchmark baseline for {get_machine_id()}; record one with --benchmark-save=baseline")
+        config.option.benchmark_compare = []
+        config.option.benchmark_compare_fail = None
+
+    # Compare and print, but never fail, e.g. on a busy laptop
+    if os.environ.get('BENCHMARK_GATE', '1').lower() in ('0', 'false', 'no', 'off'):
+        config.option.benchmark_compare_fail = None
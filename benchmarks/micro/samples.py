@@ -0,0 +1,74 @@
+"""
+Inputs for the micro-benchmarks: what the model, parents and the session
+store actually see, plus the degenerate cases that have hurt before.
+"""
+
+# A typical well-formed answer from the model
+MODEL_OUTPUT = """Answer: [Patient is a 4 year old child]
+Diagnosis: The symptoms point to a viral upper respiratory infection,
+most likely a common cold, with a mild fever. [1]
+First Aid: Give plenty of fluids, such as water or diluted juice.
+First Aid: Let the child rest and keep them at a comfortable temperature.
+First Aid: Use saline drops to clear a blocked nose.
+First Aid: Give plenty of fluids, such as water or diluted juice.
+Urgent: Seek immediate care if breathing becomes fast or difficult. [source: WHO]
+"""
+
+# Degenerate generation: the model loops on the same lines until max_length
+REPETITIVE_OUTPUT = (
+    "Diagnosis: Viral infection with fever and cough.\n"
+    + "First Aid: Give plenty of fluids and let the child rest.\n" * 400
+    + "First Aid: give plenty of fluids and let the child rest.\n" * 400
+    + "the the the the the the the the the the the the the the the the\n" * 200
+)
+
+# One enormous line with no section headers and no line breaks
+RUN_ON_OUTPUT = "the child has a fever and a cough and is tired and not eating well and " * 300
+
+# Many short bracketed fragments, e.g. citations or token artifacts
+BRACKETED_OUTPUT = "Diagnosis: Common cold [1] with fever [2] [citation needed].\n" * 200
+
+# Opening brackets that never close: the lazy `\[.*?\]` cleanup rescans the
+# rest of the line from every one of them, so cost grows with the square of
+# the length. Kept small so the suite stays fast; a regression shows as a
+# large multiple, not a few percent.
+UNCLOSED_BRACKETS_OUTPUT = "Diagnosis: fever [see note " * 60
+
+CLEAN_RESPONSE_INPUTS = {
+    'typical': MODEL_OUTPUT,
+    'repetitive': REPETITIVE_OUTPUT,
+    'run_on': RUN_ON_OUTPUT,
+    'bracketed': BRACKETED_OUTPUT,
+    'unclosed_brackets': UNCLOSED_BRACKETS_OUTPUT,
+}
+
+# Messages as parents send them, from one word to a dictated voice note
+MESSAGES = {
+    'reply': "no thats all",
+    'greeting': "hi there",
+    'symptom': "my son has had a fever since yesterday and now he has a rash",
+    'voice_note': (
+        "okay so um my daughter she is three and since last night she has been really hot "
+        "and she is not eating and she threw up twice this morning and now she is just lying "
+        "on the couch and she keeps saying her tummy hurts and I gave her some water but "
+        "she spat it out and I don't know if I should take her to the clinic or wait"
+    ),
+    'repetitive': "help " * 1000,
+}
+
+# Replies to segment for WhatsApp's 1600 character limit
+SEGMENT_INPUTS = {
+    'short': MODEL_OUTPUT,
+    'sentences': "Keep the child hydrated and rested. Watch for a rising temperature! " * 150,
+    'lines': "• Give plenty of fluids\n" * 400,
+    'no_breaks': "a" * 10_000,
+}
+
+SYMPTOMS = [
+    "fever since yesterday",
+    "dry cough at night",
+    "not eating much",
+    "rash on the arms",
+    "vomited twice this morning",
+    "seems very tired",
+]
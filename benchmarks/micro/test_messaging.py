@@ -0,0 +1,24 @@
+import pytest
+
+from Backend.Model.conversation_patterns import UserIntent
+from samples import MESSAGES, SEGMENT_INPUTS
+from twilioM.nurseTalk import get_twilio_client
+
+
+@pytest.mark.benchmark(group='is_negative')
+@pytest.mark.parametrize('name', MESSAGES)
+def test_is_negative(benchmark, name):
+    benchmark(UserIntent.is_negative, MESSAGES[name])
+
+
+@pytest.mark.benchmark(group='is_greeting')
+@pytest.mark.parametrize('name', MESSAGES)
+def test_is_greeting(benchmark, name):
+    benchmark(UserIntent.is_greeting, MESSAGES[name])
+
+
+@pytest.mark.benchmark(group='segment_message')
+@pytest.mark.parametrize('name', SEGMENT_INPUTS)
+def test_segment_message(benchmark, name):
+    segments = benchmark(get_twilio_client()._segment_message, SEGMENT_INPUTS[name])
+    assert all(len(segment) <= 1600 + len("..") for segment in segments)
@@ -0,0 +1,24 @@
+import pytest
+
+from Backend.Model.response_handler import clean_response
+from samples import CLEAN_RESPONSE_INPUTS
+
+
+@pytest.mark.benchmark(group='clean_response')
+@pytest.mark.parametrize('name', CLEAN_RESPONSE_INPUTS)
+def test_clean_response(benchmark, name):
+    result = benchmark(clean_response, CLEAN_RESPONSE_INPUTS[name])
+    assert result.startswith("*Diagnosis*:")
+
+
+@pytest.fixture(scope='module')
+def tts_service(tmp_path_factory):
+    from AIV.translateTranscribe import TTSService
+    return TTSService(static_dir=str(tmp_path_factory.mktemp('audio')))
+
+
+@pytest.mark.benchmark(group='tts_clean_response')
+@pytest.mark.parametrize('name', CLEAN_RESPONSE_INPUTS)
+def test_tts_clean_response(benchmark, tts_service, name):
+    result = benchmark(tts_service.clean_response, CLEAN_RESPONSE_INPUTS[name])
+    assert result.endswith("Have you tried any remedies so far?")
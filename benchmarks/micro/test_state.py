@@ -0,0 +1,61 @@
+from datetime import datetime
+
+import pytest
+
+from Backend.database.data import Conversation
+from Backend.Model.conversation_state import ConversationState
+from Backend.Model.session_store import InMemorySessionStore
+from samples import MESSAGES, MODEL_OUTPUT, SYMPTOMS
+
+PHONE = 'whatsapp:+15551234567'
+
+
+@pytest.fixture
+def state():
+    return ConversationState(PHONE, InMemorySessionStore())
+
+
+@pytest.mark.benchmark(group='conversation_state')
+def test_symptom_collection(benchmark, state):
+    """One conversation: symptoms come in, are read back for the model, then cleared."""
+    def collect():
+        for symptom in SYMPTOMS:
+            state.add_symptom(symptom)
+        symptoms = state.get_all_symptoms()
+        state.reset()
+        return symptoms
+
+    assert benchmark(collect).count('. ') == len(SYMPTOMS) - 1
+
+
+@pytest.mark.benchmark(group='conversation_state')
+def test_add_symptom(benchmark, state):
+    def add():
+        state.add_symptom(SYMPTOMS[0])
+        # Keep the history at a realistic length across millions of rounds
+        if len(state.symptom_history) >= 20:
+            state.reset()
+
+    benchmark(add)
+
+
+@pytest.mark.benchmark(group='conversation_state')
+@pytest.mark.parametrize('count', [6, 200])
+def test_get_all_symptoms(benchmark, state, count):
+    for i in range(count):
+        state.add_symptom(SYMPTOMS[i % len(SYMPTOMS)])
+    benchmark(state.get_all_symptoms)
+
+
+@pytest.mark.benchmark(group='conversation_state')
+def test_reset(benchmark, state):
+    benchmark(state.reset)
+
+
+@pytest.mark.benchmark(group='conversation_to_dict')
+@pytest.mark.parametrize('repeat', [1, 50])
+def test_conversation_to_dict(benchmark, repeat):
+    conversation = Conversation(id=1, phone_number=PHONE, timestamp=datetime(2024, 5, 1, 9, 30),
+                                user_input=MESSAGES['voice_note'], bot_response=MODEL_OUTPUT * repeat,
+                                response_time=2.4, status='sent')
+    assert benchmark(conversation.to_dict)['id'] == 1
@@ -0,0 +1,148 @@
+"""
+Where generated voice responses are published for Twilio to fetch.
+
+LocalAudioStorage keeps files in the Flask static audio folder, served by
+/audio/<filename>. S3AudioStorage uploads them to an S3-compatible bucket
+(AWS, MinIO, ...) and hands out time-limited pre-signed URLs, so media
+downloads go straight to the object store and several app nodes can share
+the files.
+"""
+import logging
+import os
+import threading
+import time
+
+from decouple import config
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+
+class AudioStorage:
+    """Publishes a locally generated audio file and returns a URL Twilio can fetch."""
+
+    def publish(self, local_path, key):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def stats(self):
+        return {}
+
+
+class LocalAudioStorage(AudioStorage):
+    """Serves files from the static audio directory through the app's /audio route."""
+
+    def __init__(self, directory, base_url):
+        self.directory = directory
+        self.base_url = base_url.rstrip('/')
+
+    def publish(self, local_path, key):
+        target = os.path.join(self.directory, key)
+        if os.path.abspath(local_path) != os.path.abspath(target):
+            os.replace(local_path, target)
+        return f"{self.base_url}/audio/{key}"
+
+    def delete(self, key):
+        try:
+            os.remove(os.path.join(self.directory, key))
+        except FileNotFoundError:
+            pass
+
+
+class S3AudioStorage(AudioStorage):
+    """
+    Uploads to an S3-compatible bucket and returns pre-signed GET URLs valid
+    for `url_expiry` seconds. Uploads stream from disk through boto3's
+    transfer manager, switching to parallel multipart uploads above
+    `multipart_threshold` bytes. The local copy is removed once uploaded.
+    """
+
+    def __init__(self, bucket, prefix='audio/', url_expiry=3600, endpoint_url=None, region=None,
+                 multipart_threshold=8 * MB, multipart_chunksize=8 * MB, max_concurrency=4, client=None):
+        try:
+            import boto3
+            from boto3.s3.transfer import TransferConfig
+            from botocore.config import Config
+        except ImportError:
+            raise RuntimeError("AUDIO_STORAGE=s3 requires the 'boto3' package")
+
+        self.bucket = bucket
+        self.prefix = prefix
+        self.url_expiry = url_expiry
+        # Signature v4 URLs work with every region and with MinIO
+        self.client = client or boto3.client(
+            's3',
+            endpoint_url=endpoint_url or None,
+            region_name=region or None,
+            config=Config(signature_version='s3v4', retries={'max_attempts': 3, 'mode': 'standard'})
+        )
+        self.transfer_config = TransferConfig(
+            multipart_threshold=multipart_threshold,
+            multipart_chunksize=multipart_chunksize,
+            max_concurrency=max_concurrency,
+            use_threads=max_concurrency > 1
+        )
+        self._lock = threading.Lock()
+        self.uploads = 0
+        self.failures = 0
+        self.bytes_uploaded = 0
+        self.upload_seconds = 0.0
+
+    def publish(self, local_path, key):
+        size = os.path.getsize(local_path)
+        start = time.perf_counter()
+        try:
+            self.client.upload_file(
+                local_path, self.bucket, self.prefix + key,
+                ExtraArgs={'ContentType': 'audio/mpeg', 'CacheControl': 'private, max-age=86400, immutable'},
+                Config=self.transfer_config
+            )
+        except Exception:
+            with self._lock:
+                self.failures += 1
+            raise
+        with self._lock:
+            self.uploads += 1
+            self.bytes_uploaded += size
+            self.upload_seconds += time.perf_counter() - start
+        os.remove(local_path)
+        return self.client.generate_presigned_url(
+            'get_object',
+            Params={'Bucket': self.bucket, 'Key': self.prefix + key},
+            ExpiresIn=self.url_expiry
+        )
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self.prefix + key)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'uploads': self.uploads,
+                'failures': self.failures,
+                'bytes_uploaded': self.bytes_uploaded,
+                'upload_seconds': round(self.upload_seconds, 3),
+            }
+
+
+def create_audio_storage(directory, base_url):
+    """Builds the backend selected by AUDIO_STORAGE ('local' or 's3')."""
+    backend = config('AUDIO_STORAGE', default='local').lower()
+    if backend == 'local':
+        return LocalAudioStorage(directory, base_url)
+    if backend != 's3':
+        raise ValueError(f"Unknown AUDIO_STORAGE '{backend}'")
+
+    bucket = config('AUDIO_S3_BUCKET')
+    storage = S3AudioStorage(
+        bucket,
+        prefix=config('AUDIO_S3_PREFIX', default='audio/'),
+        url_expiry=config('AUDIO_URL_EXPIRY', default=3600, cast=int),
+        endpoint_url=config('AUDIO_S3_ENDPOINT_URL', default=''),
+        region=config('AUDIO_S3_REGION', default='')
+    )
+    logger.info("Publishing audio to s3://%s/%s", bucket, storage.prefix)
+    return storage
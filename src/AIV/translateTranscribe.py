@@ -1,9 +1,6 @@
-from gtts import gTTS
-from pydub import AudioSegment
-from transformers import pipeline
-import speech_recognition as sr
 import os
 import uuid
+import hashlib
 import time
 import requests
 import logging
@@ -13,86 +10,127 @@ from urllib.parse import urlparse
 from decouple import config
 import re
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+from Backend.Pipeline.tracing import tracer
+
+# gTTS, pydub and SpeechRecognition are imported where they are used: together
+# they add about 200 ms to app startup, and with SPEECH_SERVICE_URL set the
+# gTTS and SpeechRecognition paths never run
+
 logger = logging.getLogger(__name__)
 
 class TTSService:
     def __init__(self, static_dir=None):
         self.static_dir = static_dir or os.path.join(os.path.dirname(__file__), '..', 'Backend', 'FlaskAPI', 'static', 'audio')
         os.makedirs(self.static_dir, exist_ok=True)
+        # When set, speech is synthesized and recognized by this HTTP service
+        # (POST /tts, POST /stt) instead of Google, e.g. the load-test mocks
+        self.speech_service_url = config('SPEECH_SERVICE_URL', default='').rstrip('/')
+        self._speech_session = requests.Session() if self.speech_service_url else None
+
+    def _remote_tts(self, text, file_path):
+        response = self._speech_session.post(f"{self.speech_service_url}/tts", json={'text': text, 'lang': 'en'}, timeout=60)
+        response.raise_for_status()
+        with open(file_path, 'wb') as f:
+            f.write(response.content)
 
+    def _remote_stt(self, wav_path):
+        with open(wav_path, 'rb') as f:
+            response = self._speech_session.post(f"{self.speech_service_url}/stt", data=f,
+                                                 headers={'Content-Type': 'audio/wav'}, timeout=60)
+        response.raise_for_status()
+        return response.json()['text']
+
+    @tracer.traced('tts.generate_speech')
     def generate_speech(self, text, phone_number=None):
         """Generate speech from text with status updates"""
         try:
             # Notify start of process
-            status_msg = "🎯 Generating your voice response..."
-            logger.info(status_msg)
+            logger.debug("🎯 Generating your voice response...")
             
             # Create unique filename
             filename = f"response_{phone_number.split(':')[-1]}_{uuid.uuid4().hex[:8]}.mp3"
             file_path = os.path.join(self.static_dir, filename)
 
             # Generate MP3
-            logger.info("🔊 Converting text to speech...")
-            tts = gTTS(text=text, lang='en', slow=False)
-            tts.save(file_path)
+            logger.debug("🔊 Converting text to speech...")
+            with tracer.span('tts.synthesize', chars=len(text)):
+                if self.speech_service_url:
+                    self._remote_tts(text, file_path)
+                else:
+                    from gtts import gTTS
+                    tts = gTTS(text=text, lang='en', slow=False)
+                    tts.save(file_path)
 
             # Optimize audio
-            logger.info("⚡ Optimizing audio quality...")
-            audio = AudioSegment.from_mp3(file_path)
-            normalized_audio = audio.normalize()
+            logger.debug("⚡ Optimizing audio quality...")
+            from pydub import AudioSegment
+            with tracer.span('tts.decode'):
+                audio = AudioSegment.from_mp3(file_path)
+                normalized_audio = audio.normalize()
             
             # Export with optimized settings
-            logger.info("💾 Saving optimized audio...")
-            normalized_audio.export(
-                file_path,
-                format="mp3",
-                parameters=["-q:a", "0", "-b:a", "128k"]
-            )
+            logger.debug("💾 Saving optimized audio...")
+            with tracer.span('tts.ffmpeg_encode'):
+                normalized_audio.export(
+                    file_path,
+                    format="mp3",
+                    parameters=["-q:a", "0", "-b:a", "128k"]
+                )
+
+            # Name the file after its content so its URL can be cached forever
+            filename = f"{self._content_digest(file_path)}.mp3"
+            os.replace(file_path, os.path.join(self.static_dir, filename))
 
-            logger.info("✅ Voice response ready!")
+            logger.debug("✅ Voice response ready!")
             return filename
 
         except Exception as e:
-            logger.error(f"❌ Error generating speech: {e}")
+            logger.error("❌ Error generating speech: %s", e)
             return None
 
-    def clean_old_files(self, max_age_hours=24):
-        """Clean up old audio files"""
-        try:
-            current_time = time.time()
-            for filename in os.listdir(self.static_dir):
-                file_path = os.path.join(self.static_dir, filename)
-                if os.path.getmtime(file_path) < (current_time - max_age_hours * 3600):
-                    os.remove(file_path)
-        except Exception as e:
-            logger.error(f"Error cleaning old files: {e}")
+    @staticmethod
+    def _content_digest(file_path):
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(65536), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
 
+    @tracer.traced('tts.transcribe_audio')
     def transcribe_audio(self, audio_file_path):
         """Convert audio to text with status updates"""
         try:
-            logger.info("🎤 Processing your voice message...")
+            logger.debug("🎤 Processing your voice message...")
+            from pydub import AudioSegment
             audio = AudioSegment.from_file(audio_file_path)
             
             # Create temporary WAV file
             temp_wav = os.path.join(
                 os.path.dirname(audio_file_path),
-                f"temp_{int(time.time())}.wav"
+                f"temp_{uuid.uuid4().hex}.wav"
             )
             
-            logger.info("🔄 Converting audio format...")
-            audio.export(
-                temp_wav,
-                format="wav",
-                parameters=[
-                    "-ac", "1",
-                    "-ar", "16000",
-                    "-sample_fmt", "s16"
-                ]
-            )
+            logger.debug("🔄 Converting audio format...")
+            with tracer.span('tts.ffmpeg_to_wav'):
+                audio.export(
+                    temp_wav,
+                    format="wav",
+                    parameters=[
+                        "-ac", "1",
+                        "-ar", "16000",
+                        "-sample_fmt", "s16"
+                    ]
+                )
             
+            if self.speech_service_url:
+                try:
+                    with tracer.span('tts.recognize_remote'):
+                        return self._remote_stt(temp_wav).strip()
+                finally:
+                    os.remove(temp_wav)
+
             # Initialize recognizer
+            import speech_recognition as sr
             recognizer = sr.Recognizer()
             recognizer.energy_threshold = 300
             recognizer.dynamic_energy_threshold = True
@@ -100,14 +138,15 @@ class TTSService:
             
             try:
                 with sr.AudioFile(temp_wav) as source:
-                    logger.info("👂 Listening to your message...")
+                    logger.debug("👂 Listening to your message...")
                     recognizer.adjust_for_ambient_noise(source, duration=0.5)
                     
-                    logger.info("📝 Converting speech to text...")
+                    logger.debug("📝 Converting speech to text...")
                     audio_data = recognizer.record(source)
                     
-                    text = recognizer.recognize_google(audio_data, language='en-US')
-                    logger.info("✅ Successfully converted your voice to text!")
+                    with tracer.span('tts.recognize_google'):
+                        text = recognizer.recognize_google(audio_data, language='en-US')
+                    logger.debug("✅ Successfully converted your voice to text!")
                     
                     return text.strip()
                     
@@ -116,13 +155,14 @@ class TTSService:
                     os.remove(temp_wav)
                     
         except Exception as e:
-            logger.error(f"❌ Error processing voice message: {str(e)}")
+            logger.error("❌ Error processing voice message: %s", e)
             return None
 
+    @tracer.traced('tts.download_audio')
     def download_audio_from_url(self, audio_url, save_path):
         """Download audio with progress updates"""
         try:
-            logger.info("📥 Receiving your voice message...")
+            logger.debug("📥 Receiving your voice message...")
             
             # Set up retry strategy
             retry_strategy = Retry(
@@ -145,7 +185,7 @@ class TTSService:
                 'Accept': 'audio/*, application/octet-stream'
             }
 
-            logger.info(f"Attempting to download audio from: {audio_url}")
+            logger.debug("Downloading audio from %s", audio_url)
             
             # Download the file with authentication
             response = session.get(
@@ -173,12 +213,12 @@ class TTSService:
                         if total_size:
                             progress = (downloaded_size / total_size) * 100
                             if progress % 25 == 0:  # Update every 25%
-                                logger.info(f"📊 Download progress: {progress:.0f}%")
+                                logger.debug("📊 Download progress: %.0f%%", progress)
 
             # Verify downloaded file
             if os.path.exists(save_path) and os.path.getsize(save_path) > 0:
                 file_size = os.path.getsize(save_path)
-                logger.info(f"Successfully downloaded audio file ({file_size} bytes)")
+                logger.debug("Downloaded audio file (%d bytes)", file_size)
                 return True
             else:
                 logger.error("Downloaded file is empty or missing")
@@ -188,10 +228,10 @@ class TTSService:
             if e.response.status_code == 401:
                 logger.error("Authentication failed. Check Twilio credentials.")
             else:
-                logger.error(f"HTTP error occurred: {str(e)}")
+                logger.error("HTTP error occurred: %s", e)
             return False
         except Exception as e:
-            logger.error(f"Error downloading audio: {str(e)}", exc_info=True)
+            logger.error("Error downloading audio: %s", e, exc_info=True)
             return False
         finally:
             session.close()
@@ -243,16 +283,19 @@ class TTSService:
             return '\n'.join(formatted_response)
             
         except Exception as e:
-            logger.error(f"Error cleaning response: {str(e)}")
+            logger.error("Error cleaning response: %s", e)
             return text  # Return original text if cleaning fails
 
 class SpeechConverter:
     def __init__(self, temp_dir="temp_audio"):
+        import speech_recognition as sr
         self.recognizer = sr.Recognizer()
         self.temp_dir = temp_dir
         os.makedirs(self.temp_dir, exist_ok=True)
 
     def text_to_speech(self, text, filename="output", format="mp3"):
+        from gtts import gTTS
+        from pydub import AudioSegment
         mp3_path = os.path.join(self.temp_dir, f"{filename}.mp3")
         tts = gTTS(text)
         tts.save(mp3_path)
@@ -268,6 +311,8 @@ class SpeechConverter:
             raise ValueError("Unsupported format. Choose 'mp3' or 'ogg'.")
 
     def speech_to_text(self, audio_path):
+        import speech_recognition as sr
+        from pydub import AudioSegment
         # Convert to WAV (SpeechRecognition prefers WAV)
         audio = AudioSegment.from_file(audio_path)
         wav_path = os.path.join(self.temp_dir, "temp.wav")
@@ -0,0 +1,63 @@
+import logging
+import os
+import re
+
+from flask import Blueprint, Response, current_app, request, send_from_directory
+
+from Backend.Pipeline.janitor import file_leases
+
+logger = logging.getLogger(__name__)
+
+audio_bp = Blueprint('audio', __name__)
+
+# Generated responses are named after the SHA-256 of their bytes, so a
+# given URL always returns the same content and can be cached forever
+CONTENT_ADDRESSED = re.compile(r'^([0-9a-f]{32,64})\.mp3$')
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+CORS_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Methods': 'GET, HEAD, OPTIONS',
+    'Access-Control-Allow-Headers': 'Content-Type, Range, If-None-Match, If-Range',
+    'Access-Control-Expose-Headers': 'Content-Length, Content-Range, ETag',
+}
+
+
+def audio_folder():
+    return os.path.join(current_app.config['STATIC_FOLDER'], 'audio')
+
+
+@audio_bp.route('/audio/<filename>', methods=['GET', 'HEAD'], provide_automatic_options=False)
+def serve_audio(filename):
+    """
+    Serve a generated audio file. Range and conditional requests are handled
+    by send_from_directory; the body goes out through the WSGI file wrapper
+    (sendfile under gunicorn), or X-Sendfile when USE_X_SENDFILE is set.
+    """
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Audio request for %s from %s (range: %s)", filename, request.remote_addr, request.range)
+    match = CONTENT_ADDRESSED.match(filename)
+    # The lease keeps the janitor away until the file is open; the body is
+    # then streamed from the open descriptor, which survives an unlink
+    with file_leases.hold(os.path.join(audio_folder(), filename)):
+        if match:
+            # The digest is a strong validator, so If-Range and If-None-Match work across nodes
+            response = send_from_directory(audio_folder(), filename, mimetype='audio/mpeg', conditional=True,
+                                           etag=match.group(1), max_age=IMMUTABLE_MAX_AGE)
+            response.cache_control.immutable = True
+            response.cache_control.public = True
+        else:
+            # Older randomly named files: cacheable, but revalidated on every use
+            response = send_from_directory(audio_folder(), filename, mimetype='audio/mpeg', conditional=True,
+                                           max_age=0)
+            response.cache_control.no_cache = True
+    response.headers.update(CORS_HEADERS)
+    return response
+
+
+@audio_bp.route('/audio/<filename>', methods=['OPTIONS'])
+def audio_options(filename):
+    """Handle CORS preflight requests for audio files"""
+    response = Response()
+    response.headers.update(CORS_HEADERS)
+    return response
@@ -0,0 +1,26 @@
+from functools import wraps
+import hmac
+import logging
+
+from decouple import config
+from flask import Response, request
+
+logger = logging.getLogger(__name__)
+
+
+def require_admin_token(view):
+    """
+    Protects an operator endpoint with the ADMIN_TOKEN bearer token.
+    The endpoint is disabled entirely while ADMIN_TOKEN is not configured.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        expected = config('ADMIN_TOKEN', default='')
+        if not expected:
+            return Response("Admin endpoints are disabled", status=403, mimetype='text/plain')
+        supplied = request.headers.get('Authorization', '')
+        if not hmac.compare_digest(supplied.encode('utf-8'), f"Bearer {expected}".encode('utf-8')):
+            logger.warning("Rejected admin request to %s from %s", request.path, request.remote_addr)
+            return Response("Unauthorized", status=401, mimetype='text/plain')
+        return view(*args, **kwargs)
+    return wrapper
@@ -1,45 +1,60 @@
-from flask import Flask, request, jsonify, Response, send_file
-import re
+import time
+_import_started = time.perf_counter()
+
+from flask import Blueprint, Flask, request, jsonify, Response, stream_with_context
 import logging
 from datetime import datetime
 import os
-import time
-import random
-from twilio.request_validator import RequestValidator
+import threading
 from twilio.twiml.messaging_response import MessagingResponse
-from twilio.rest import Client
 from decouple import config
 import requests
 
-from Backend.database.data import db, init_database, save_conversation, get_conversation_history
+from Backend.database.data import db, init_database, save_conversation, get_conversation_history, encode_cursor, decode_cursor
+from Backend.database.writer import ConversationLogWriter
+from Backend.database.export import FORMATS as EXPORT_FORMATS, export_conversations, parse_date
+from Backend.database.rollups import RollupJob, query_rollups
+from Backend.database.retention import RetentionJob
+from Backend.database.search import search_conversations
+from Backend.FlaskAPI.auth import require_admin_token
+from Backend.FlaskAPI.audio_routes import audio_bp
+from Backend.FlaskAPI.profiler_routes import profiler_bp
 from Backend.Model.loadModel import initialize_model, clear_model_cache, get_ai_response
-from Backend.Model.conversation_state import get_conversation_state, ConversationStateType
+from Backend.Model.conversation_state import get_conversation_state, get_session_store, ConversationStateType
+from Backend.Model.session_store import InMemorySessionStore
 from Backend.Model.conversation_patterns import UserIntent
-from twilioM.nurseTalk import send_message as external_send_message
+from Backend.Model.response_handler import clean_response
+from twilioM.nurseTalk import send_message, create_twilio_client
 from AIV.translateTranscribe import TTSService
+from AIV.audio_storage import create_audio_storage
 from Backend.Model.conversation_patterns import ConversationManager
 from Backend.Model.model_singleton import ModelSingleton
+from Backend.Pipeline.admission import AdmissionController, DeliveryMode
+from Backend.Pipeline.background import BackgroundQueue
+from Backend.Pipeline.janitor import Janitor, file_leases
+from Backend.Pipeline import logs
+from Backend.Pipeline.logs import SAMPLED, configure_logging, init_request_ids
+from Backend.Pipeline.profiler import profiler
+from Backend.Pipeline.metrics import registry as metrics, STAGE_SECONDS, MESSAGES, track_request
+from Backend.Pipeline.tracing import tracer, create_span_exporter
+from Backend.Pipeline.scheduler import PriorityScheduler, Priority
+from Backend.Pipeline.rate_limit import ConcurrencyLimiter, Decision, InMemoryRateLimiter, create_rate_limiter
+from Backend.Model.urgent_symptoms import EMERGENCY_REPLY
+from Backend.Model.intent_matcher import Intent
+
+# Every text send and model generation is timed as a pipeline stage
+external_send_message = STAGE_SECONDS.timed(stage='twilio_text')(send_message)
+timed_ai_response = STAGE_SECONDS.timed(stage='generation')(get_ai_response)
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
-app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///nurse_talk.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['TWILIO_AUTH_TOKEN'] = config('TWILIO_AUTH_TOKEN')
-app.config['TWILIO_ACCOUNT_SID'] = config('TWILIO_ACCOUNT_SID')  # Add this
-app.config['STATIC_FOLDER'] = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
-app.config['TEMP_FOLDER'] = os.path.join(app.config['STATIC_FOLDER'], 'temp')
-
-# Add after existing app.config settings
-app.config.update(
-    MAX_AUDIO_SIZE=16 * 1024 * 1024,  # 16MB max size
-    ALLOWED_AUDIO_TYPES=['audio/ogg', 'audio/mpeg', 'audio/mp3', 'audio/wav'],
-    AUDIO_CONVERSION_ENABLED=True
-)
+main_bp = Blueprint('main', __name__)
+
+# Seconds spent in each startup phase, exported on /metrics. Under gunicorn
+# with preload, import, database and model are paid once in the master.
+startup = {'import_seconds': time.perf_counter() - _import_started, 'preloaded': False}
+_create_lock = threading.Lock()
+_worker_pid = None
 
 def get_ngrok_url():
     """Try to get the current ngrok URL automatically"""
@@ -55,126 +70,252 @@ def get_ngrok_url():
     except:
         return None
 
-# Configure BASE_URL - use the provided ngrok URL directly
-base_url = 'https://3ccd08a85137.ngrok-free.app'
-logger.info(f"Using ngrok URL: {base_url}")
-
-app.config['BASE_URL'] = base_url
-logger.info(f"Configured BASE_URL: {base_url}")
-
-# Initialize Twilio client for direct audio sending
-twilio_client = Client(app.config['TWILIO_ACCOUNT_SID'], app.config['TWILIO_AUTH_TOKEN'])
-
-# Initialize components with better error handling
-try:
-    init_database(app)
-    logger.info("Database initialized successfully")
-except Exception as e:
-    logger.error(f"Database initialization failed: {e}")
-    raise RuntimeError("Failed to initialize database")
-
-# Initialize AI model
-try:
-    model_singleton = ModelSingleton.get_instance()
-    model = model_singleton.get_model()
-    logger.info("AI model reference obtained successfully")
-except Exception as e:
-    logger.error(f"Model initialization failed: {e}")
-    raise RuntimeError(f"Failed to initialize AI model: {str(e)}")
-
-# Initialize other components
-tts_service = TTSService()
-conversation_manager = ConversationManager()
-
-# Ensure temp folder exists
-os.makedirs(app.config['TEMP_FOLDER'], exist_ok=True)
-
-def clean_response(text):
+def create_app(preload=False):
     """
-    Cleans the raw AI model output by intelligently parsing multi-line
-    diagnosis and first-aid sections.
+    Builds the app: configuration, database and model. Background threads,
+    clients and per-process pools are started by start_worker(), right away
+    unless `preload` is set; gunicorn's preload mode (see gunicorn.conf.py)
+    calls it in each worker after fork instead, so the model loaded here is
+    shared copy-on-write by all workers.
     """
-    logger.info(f"Cleaning raw response: \"{text[:200]}...\"")
-
-    # 1. Initial cleanup
-    text = re.sub(r'\[.*?\]', '', text).strip()
-    text = text.replace("Answer:", "").strip()
-    lines = [line.strip() for line in text.split('\n') if line.strip()]
-
-    # 2. State-machine based parsing
-    diagnosis_lines = []
-    first_aid_lines = []
-    current_section = None
-
-    for line in lines:
-        # First, clean up any residual double spaces from the initial regex
-        line = re.sub(r'\s{2,}', ' ', line).strip()
-        if not line:
-            continue
-
-        if line.lower().startswith("diagnosis:"):
-            current_section = "diagnosis"
-            # Add the text after the keyword
-            diag_text = line.split(":", 1)[1].strip()
-            if diag_text:
-                diagnosis_lines.append(diag_text)
-            continue
-        elif line.lower().startswith("first aid:"):
-            current_section = "first_aid"
-            # Add the text after the keyword
-            aid_text = line.split(":", 1)[1].strip()
-            if aid_text:
-                first_aid_lines.append(aid_text)
-            continue
-        
-        # Append line to the current section if it's a continuation
-        if current_section == "diagnosis":
-            diagnosis_lines.append(line)
-        elif current_section == "first_aid":
-            first_aid_lines.append(line)
-        elif current_section is None:
-            # If we haven't found a section yet, assume it's part of the diagnosis
-            diagnosis_lines.append(line)
-
-    # 3. Process the collected lines
-    # Join multi-line diagnosis
-    if diagnosis_lines:
-        full_diagnosis = " ".join(diagnosis_lines)
-    else:
-        full_diagnosis = "No specific diagnosis provided. Please describe the symptoms."
-
-    # De-duplicate first aid steps
-    unique_steps = []
-    seen_steps = set()
-    for step in first_aid_lines:
-        if step and step.lower() not in seen_steps:
-            unique_steps.append(step)
-            seen_steps.add(step.lower())
-            
-    # 4. Assemble the final response
-    cleaned_text = f"*Diagnosis*:\n{full_diagnosis}"
-    
-    if unique_steps:
-        cleaned_text += "\n\n*First Aid Steps*:"
-        for step in unique_steps:
-            cleaned_text += f"\n• {step}"
-            
-    logger.info(f"Cleaned response: \"{cleaned_text[:200]}...\"")
-    return cleaned_text
+    global app, model_singleton, model
+    with _create_lock:
+        if 'app' in globals():
+            return app
+        started = time.perf_counter()
+        configure_logging()
+
+        flask_app = Flask(__name__)
+        init_request_ids(flask_app)
+        flask_app.config['SQLALCHEMY_DATABASE_URI'] = config('DATABASE_URL', default='sqlite:///nurse_talk.db')
+        flask_app.config['DB_POOL_SIZE'] = config('DB_POOL_SIZE', default=5, cast=int)
+        flask_app.config['DB_MAX_OVERFLOW'] = config('DB_MAX_OVERFLOW', default=10, cast=int)
+        flask_app.config['SEARCH_INDEX'] = config('SEARCH_INDEX', default=True, cast=bool)
+        flask_app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        flask_app.config['TWILIO_AUTH_TOKEN'] = config('TWILIO_AUTH_TOKEN')
+        flask_app.config['TWILIO_ACCOUNT_SID'] = config('TWILIO_ACCOUNT_SID')  # Add this
+        flask_app.config['STATIC_FOLDER'] = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+        flask_app.config['TEMP_FOLDER'] = os.path.join(flask_app.config['STATIC_FOLDER'], 'temp')
+        flask_app.config['USE_X_SENDFILE'] = config('USE_X_SENDFILE', default=False, cast=bool)
+        flask_app.register_blueprint(main_bp)
+        flask_app.register_blueprint(audio_bp)
+        flask_app.register_blueprint(profiler_bp)
+
+        # Add after existing app.config settings
+        flask_app.config.update(
+            MAX_AUDIO_SIZE=16 * 1024 * 1024,  # 16MB max size
+            ALLOWED_AUDIO_TYPES=['audio/ogg', 'audio/mpeg', 'audio/mp3', 'audio/wav'],
+            AUDIO_CONVERSION_ENABLED=True
+        )
+
+        # Load shedding for audio: thresholds on in-flight diagnoses and deferred-audio queue depth
+        flask_app.config.update(
+            ADMISSION_DEFER_AUDIO_IN_FLIGHT=config('ADMISSION_DEFER_AUDIO_IN_FLIGHT', default=2, cast=int),
+            ADMISSION_TEXT_ONLY_IN_FLIGHT=config('ADMISSION_TEXT_ONLY_IN_FLIGHT', default=4, cast=int),
+            ADMISSION_DEFER_AUDIO_QUEUE=config('ADMISSION_DEFER_AUDIO_QUEUE', default=4, cast=int),
+            ADMISSION_TEXT_ONLY_QUEUE=config('ADMISSION_TEXT_ONLY_QUEUE', default=8, cast=int),
+            ADMISSION_HYSTERESIS=config('ADMISSION_HYSTERESIS', default=1, cast=int),
+            AUDIO_WORKERS=config('AUDIO_WORKERS', default=1, cast=int),
+            AUDIO_QUEUE_SIZE=config('AUDIO_QUEUE_SIZE', default=16, cast=int),
+            INFERENCE_WORKERS=config('INFERENCE_WORKERS', default=1, cast=int),
+            INFERENCE_TIMEOUT=config('INFERENCE_TIMEOUT', default=120, cast=int),
+            DIAGNOSIS_MAX_IN_FLIGHT=config('DIAGNOSIS_MAX_IN_FLIGHT', default=8, cast=int),
+            TORCH_THREADS=config('TORCH_THREADS', default=0, cast=int),
+            WEB_CONCURRENCY=config('WEB_CONCURRENCY', default=1, cast=int),
+            CONVERSATION_LOG_BATCH_SIZE=config('CONVERSATION_LOG_BATCH_SIZE', default=100, cast=int),
+            CONVERSATION_LOG_FLUSH_INTERVAL=config('CONVERSATION_LOG_FLUSH_INTERVAL', default=2.0, cast=float),
+            CONVERSATION_LOG_MAX_PENDING=config('CONVERSATION_LOG_MAX_PENDING', default=5000, cast=int),
+            ROLLUP_INTERVAL=config('ROLLUP_INTERVAL', default=60, cast=float),
+            RETENTION_DAYS=config('RETENTION_DAYS', default=0, cast=int),
+            ARCHIVE_DIR=config('ARCHIVE_DIR', default='archive'),
+            AUDIO_MAX_AGE_SECONDS=config('AUDIO_MAX_AGE_SECONDS', default=3600, cast=int),
+            AUDIO_DISK_BUDGET_MB=config('AUDIO_DISK_BUDGET_MB', default=500, cast=int),
+            JANITOR_MIN_AGE_SECONDS=config('JANITOR_MIN_AGE_SECONDS', default=120, cast=int),
+            JANITOR_INTERVAL=config('JANITOR_INTERVAL', default=60, cast=int),
+            TRACE_SAMPLE_RATE=config('TRACE_SAMPLE_RATE', default=0.0, cast=float),
+            TRACE_EXPORTER=config('TRACE_EXPORTER', default='jsonl'),
+            TRACE_FILE=config('TRACE_FILE', default='traces.jsonl'),
+            TRACE_OTLP_ENDPOINT=config('TRACE_OTLP_ENDPOINT', default='http://localhost:4318/v1/traces')
+        )
+
+        # Configure BASE_URL - use the provided ngrok URL directly
+        base_url = 'https://3ccd08a85137.ngrok-free.app'
+        flask_app.config['BASE_URL'] = base_url
+        logger.info("Configured BASE_URL: %s", base_url)
+
+        # Initialize components with better error handling
+        phase = time.perf_counter()
+        try:
+            init_database(flask_app)
+            logger.info("Database initialized successfully")
+        except Exception as e:
+            logger.error("Database initialization failed: %s", e)
+            raise RuntimeError("Failed to initialize database")
+        startup['database_seconds'] = time.perf_counter() - phase
+
+        # Initialize AI model
+        phase = time.perf_counter()
+        try:
+            model_singleton = ModelSingleton.get_instance()
+            if not preload:
+                # Not shared with other processes: size the thread pool before loading
+                model_singleton.threads = _generation_threads(flask_app, flask_app.config['WEB_CONCURRENCY'])
+            model = model_singleton.get_model()
+            logger.info("AI model reference obtained successfully")
+        except Exception as e:
+            logger.error("Model initialization failed: %s", e)
+            raise RuntimeError(f"Failed to initialize AI model: {str(e)}")
+        startup['model_seconds'] = time.perf_counter() - phase
+
+        # Ensure temp folder exists
+        os.makedirs(flask_app.config['TEMP_FOLDER'], exist_ok=True)
+
+        startup['create_app_seconds'] = time.perf_counter() - started
+        startup['preloaded'] = preload
+        app = flask_app
+
+    if not preload:
+        start_worker()
+    return app
+
+def _generation_threads(flask_app, workers):
+    """Generation threads per process: TORCH_THREADS, or the CPUs split across workers and their inference threads."""
+    return flask_app.config['TORCH_THREADS'] or \
+        max(1, (os.cpu_count() or 1) // (max(1, workers) * flask_app.config['INFERENCE_WORKERS']))
+
+def start_worker(workers=None):
+    """
+    Starts what each serving process needs for itself: database connections,
+    the Twilio client, background threads and the model's thread pool. Runs
+    once per process; `workers` is the number of sibling processes sharing
+    the CPUs (default WEB_CONCURRENCY).
+    """
+    global _worker_pid, twilio_client, conversation_log, rollup_job, retention_job, tts_service, audio_storage, \
+        conversation_manager, audio_queue, inference_scheduler, admission, janitor, rate_limiter, diagnosis_slots
+    with _create_lock:
+        if 'app' not in globals() or _worker_pid == os.getpid():
+            return
+        _worker_pid = os.getpid()
+        started = time.perf_counter()
+        workers = workers or app.config['WEB_CONCURRENCY']
+        if workers > 1 and isinstance(get_session_store(), InMemorySessionStore):
+            logger.error("%d workers with SESSION_STORE=memory: each worker keeps its own conversations, so a "
+                         "user's messages reaching different workers lose their earlier symptoms. "
+                         "Set SESSION_STORE=redis or run a single worker.", workers)
+
+        # Pooled connections opened by the parent belong to it; don't close them from here
+        with app.app_context():
+            db.engine.dispose(close=False)
+
+        # Request tracing is off unless TRACE_SAMPLE_RATE > 0
+        if app.config['TRACE_SAMPLE_RATE'] > 0:
+            tracer.configure(
+                app.config['TRACE_SAMPLE_RATE'],
+                create_span_exporter(app.config['TRACE_EXPORTER'], app.config['TRACE_FILE'], app.config['TRACE_OTLP_ENDPOINT'])
+            )
+            logger.info("Tracing %.0f%% of requests to %s", app.config['TRACE_SAMPLE_RATE'] * 100, app.config['TRACE_EXPORTER'])
+
+        # Initialize Twilio client for direct audio sending
+        twilio_client = create_twilio_client(app.config['TWILIO_ACCOUNT_SID'], app.config['TWILIO_AUTH_TOKEN'])
+
+        # Conversation rows are written in batches from a background thread
+        conversation_log = ConversationLogWriter(
+            app,
+            batch_size=app.config['CONVERSATION_LOG_BATCH_SIZE'],
+            flush_interval=app.config['CONVERSATION_LOG_FLUSH_INTERVAL'],
+            max_pending=app.config['CONVERSATION_LOG_MAX_PENDING']
+        )
+        # Hourly and daily usage/latency aggregates, brought up to date in the background
+        rollup_job = RollupJob(app, interval=app.config['ROLLUP_INTERVAL'])
+        # Rows older than RETENTION_DAYS move to compressed archive files (off when 0)
+        retention_job = None
+        if app.config['RETENTION_DAYS'] > 0:
+            retention_job = RetentionJob(app, app.config['ARCHIVE_DIR'], app.config['RETENTION_DAYS'])
+
+        # Initialize other components
+        tts_service = TTSService()
+        # Local disk (served by /audio) or an S3-compatible bucket with pre-signed URLs
+        audio_storage = create_audio_storage(os.path.join(app.config['STATIC_FOLDER'], 'audio'), app.config['BASE_URL'])
+        conversation_manager = ConversationManager()
+        audio_queue = BackgroundQueue(
+            'deferred-audio',
+            workers=app.config['AUDIO_WORKERS'],
+            max_size=app.config['AUDIO_QUEUE_SIZE']
+        )
+        inference_scheduler = PriorityScheduler('inference', workers=app.config['INFERENCE_WORKERS'])
+        admission = AdmissionController(
+            defer_audio_in_flight=app.config['ADMISSION_DEFER_AUDIO_IN_FLIGHT'],
+            text_only_in_flight=app.config['ADMISSION_TEXT_ONLY_IN_FLIGHT'],
+            defer_audio_queue=app.config['ADMISSION_DEFER_AUDIO_QUEUE'],
+            text_only_queue=app.config['ADMISSION_TEXT_ONLY_QUEUE'],
+            hysteresis=app.config['ADMISSION_HYSTERESIS'],
+            queue_depth_fn=lambda: audio_queue.depth() + inference_scheduler.depth()
+        )
+
+        # Token bucket per sending number, and a cap on diagnoses running at once in this process
+        rate_limiter = create_rate_limiter()
+        if workers > 1 and isinstance(rate_limiter, InMemoryRateLimiter):
+            logger.warning("RATE_LIMIT_BACKEND=memory with %d workers: a number may send up to %d times "
+                           "its limit", workers, workers)
+        diagnosis_slots = ConcurrencyLimiter(app.config['DIAGNOSIS_MAX_IN_FLIGHT'])
+
+        # Removes expired audio and leftover temp files, and keeps them within a disk budget
+        janitor = Janitor(
+            [os.path.join(app.config['STATIC_FOLDER'], 'audio'), app.config['TEMP_FOLDER']],
+            max_age_seconds=app.config['AUDIO_MAX_AGE_SECONDS'],
+            max_bytes=app.config['AUDIO_DISK_BUDGET_MB'] * 1024 * 1024,
+            min_age_seconds=app.config['JANITOR_MIN_AGE_SECONDS'],
+            interval=app.config['JANITOR_INTERVAL']
+        ).start()
+
+        # Shares the weights loaded before fork; only the thread pool is per process
+        model_singleton.prepare_worker(_generation_threads(app, workers))
+
+        # Component counters exported on /metrics. Each worker reports its own;
+        # `worker_pid` tells the scrapes apart
+        metrics.register_stats('worker', lambda: {'pid': _worker_pid, 'workers': workers})
+        metrics.register_stats('model', lambda: {'loaded': model_singleton.is_loaded(), 'warm': model_singleton.warm,
+                                                  'onnx': model_singleton.backend == 'onnx',
+                                                  'threads': model_singleton.threads or 0})
+        metrics.register_stats('conversation_log', conversation_log.stats)
+        metrics.register_stats('rollups', rollup_job.stats)
+        if retention_job is not None:
+            metrics.register_stats('retention', retention_job.stats)
+        metrics.register_stats('sessions', get_session_store().stats)
+        metrics.register_stats('audio_queue', audio_queue.stats)
+        metrics.register_stats('inference', inference_scheduler.stats)
+        metrics.register_stats('admission', admission.stats)
+        metrics.register_stats('rate_limit', rate_limiter.stats)
+        metrics.register_stats('diagnosis_slots', diagnosis_slots.stats)
+        metrics.register_stats('audio_storage', audio_storage.stats)
+        metrics.register_stats('janitor', janitor.stats)
+        metrics.register_stats('tracing', tracer.stats)
+        metrics.register_stats('startup', lambda: dict(startup))
+        metrics.register_stats('logging', logs.stats)
+
+        startup['worker_seconds'] = time.perf_counter() - started
+        logger.info("Worker %d started in %.2fs", _worker_pid, startup['worker_seconds'])
+
+def __getattr__(name):
+    # `flasky.app` (gunicorn Backend.FlaskAPI.flasky:app, tests) builds the app on first access
+    if name == 'app':
+        return create_app()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def send_whatsapp_audio(to_number, audio_url):
     """Send audio message directly using Twilio client"""
     try:
-        message = twilio_client.messages.create(
-            from_='whatsapp:+14155238886',  # Your Twilio WhatsApp number
-            to=to_number,
-            media_url=[audio_url],
-            body=""  # Empty body for audio-only message
-        )
-        logger.info(f"Audio message sent successfully: {message.sid}")
+        with STAGE_SECONDS.time(stage='twilio_media'), tracer.span('twilio.send_media'):
+            message = twilio_client.messages.create(
+                from_='whatsapp:+14155238886',  # Your Twilio WhatsApp number
+                to=to_number,
+                media_url=[audio_url],
+                body=""  # Empty body for audio-only message
+            )
+        logger.info("Audio message sent: %s", message.sid)
         return True
     except Exception as e:
-        logger.error(f"Failed to send audio message: {e}")
+        logger.error("Failed to send audio message: %s", e)
         return False
 
 def generate_twiml_response(message, status="info"):
@@ -194,39 +335,56 @@ def generate_twiml_response(message, status="info"):
     response.message(f"{emoji} {message}")
     return str(response)
 
-@app.route('/webhook', methods=['POST'])
+@main_bp.route('/webhook', methods=['POST'])
+@track_request('webhook')
+@profiler.counts_requests
+@tracer.traced('whatsapp_webhook')
 def whatsapp_webhook():
     """Handle incoming WhatsApp messages using a state machine."""
-    logger.info("--- Webhook request received ---")
     try:
         from_number = request.form.get('From', '')
         user_input = request.form.get('Body', '').strip() if request.form.get('Body') else None
 
+        # Over its rate limit, a number gets a canned answer before any download, transcription or model work
+        if from_number:
+            decision = rate_limiter.check(from_number)
+            if decision != Decision.ALLOW:
+                MESSAGES.labels(kind='throttled').inc()
+                return throttled_reply(from_number, user_input, decision)
+
         # If no text, check for audio
-        if not user_input:
+        if user_input:
+            MESSAGES.labels(kind='text').inc()
+        else:
             num_media = int(request.form.get('NumMedia', 0))
             if num_media > 0 and request.form.get('MediaContentType0', '').startswith('audio/'):
                 media_url = request.form.get('MediaUrl0')
                 content_type = request.form.get('MediaContentType0')
-                logger.info(f"Audio message detected. Media URL: {media_url}, Content-Type: {content_type}")
+                logger.info("Voice message from %s (%s)", from_number, content_type, extra=SAMPLED)
                 # Download and transcribe audio
                 temp_audio_path = os.path.join(app.config['STATIC_FOLDER'], 'temp', f"input_{from_number.replace('+','')}.ogg")
+                MESSAGES.labels(kind='audio').inc()
+                release_temp_audio = file_leases.acquire(temp_audio_path)
                 try:
-                    if not tts_service.download_audio_from_url(media_url, temp_audio_path):
+                    with STAGE_SECONDS.time(stage='media_download'):
+                        downloaded = tts_service.download_audio_from_url(media_url, temp_audio_path)
+                    if not downloaded:
                         logger.error("Failed to download audio file.")
-                        external_send_message(from_number, "Sorry, I couldn't download your audio message.")
+                        reply(from_number, "[voice message]", "Sorry, I couldn't download your audio message.")
                         return Response("OK", status=200)
-                    user_input = tts_service.transcribe_audio(temp_audio_path)
-                    logger.info(f"[AUDIO->TEXT] Transcribed audio to text: '{user_input}'")
-                    logger.info(f"Transcribed audio to: {user_input}")
+                    with STAGE_SECONDS.time(stage='transcription'):
+                        user_input = tts_service.transcribe_audio(temp_audio_path)
+                    logger.debug("Transcribed voice message: %r", user_input)
                 except Exception as e:
-                    logger.error(f"Audio processing failed: {e}")
-                    external_send_message(from_number, "Sorry, I couldn't process your audio message.")
+                    logger.error("Audio processing failed: %s", e)
+                    reply(from_number, "[voice message]", "Sorry, I couldn't process your audio message.")
                     return Response("OK", status=200)
                 finally:
+                    release_temp_audio()
                     if os.path.exists(temp_audio_path):
                         os.remove(temp_audio_path)
             else:
+                MESSAGES.labels(kind='invalid').inc()
                 logger.warning("Request missing From or Body or valid audio. Aborting.")
                 return Response("Request incomplete", status=400)
         
@@ -235,156 +393,66 @@ def whatsapp_webhook():
             return Response("Request incomplete", status=400)
         
         session_state = get_conversation_state(from_number)
-        logger.info(f"User {from_number} is in state: {session_state.type.name}")
+        logger.info("Message from %s in state %s", from_number, session_state.type.name, extra=SAMPLED)
+
+        with STAGE_SECONDS.time(stage='intent'):
+            intents = UserIntent.detect(user_input)
+
+        # Urgent symptoms skip the queue: canned first aid now, model diagnosis at top priority
+        if Intent.URGENT in intents:
+            logger.warning("Urgent symptoms reported by %s", from_number)
+            reply(from_number, user_input, EMERGENCY_REPLY)
+            session_state.add_symptom(user_input)
+            run_diagnosis(from_number, session_state.get_all_symptoms(), Priority.URGENT)
+            session_state.reset()
+            return Response("OK", status=200)
 
         # Respond to greetings before any state logic
-        if UserIntent.is_greeting(user_input):
-            external_send_message(
-                to_number=from_number,
-                body_text="Hello! Please describe your child's symptoms and I'll help you with a diagnosis and first aid advice."
+        if Intent.GREETING in intents:
+            reply(
+                from_number,
+                user_input,
+                "Hello! Please describe your child's symptoms and I'll help you with a diagnosis and first aid advice."
             )
             return Response("OK", status=200)
 
         # --- State Machine Logic ---
         if session_state.type == ConversationStateType.COLLECTING_SYMPTOMS:
-            if UserIntent.is_negative(user_input):
+            if Intent.NEGATIVE in intents:
                 symptom_summary = session_state.get_all_symptoms()
-                logger.info(f"User finished. Generating diagnosis for: '{symptom_summary}'")
+                logger.debug("Generating diagnosis for: %r", symptom_summary)
                 
                 if not symptom_summary.strip():
-                    external_send_message(from_number, "Please describe at least one symptom before I can help.")
-                    session_state.reset()
-                    return Response("OK", status=200)
-
-                try:
-                    bot_response, _ = get_ai_response(symptom_summary)
-                    logger.info(f"Raw model output: {bot_response}")
-                except Exception as e:
-                    logger.error(f"Model generation failed: {e}")
-                    external_send_message(from_number, "Sorry, I couldn't generate a diagnosis at this time.")
+                    reply(from_number, user_input, "Please describe at least one symptom before I can help.")
                     session_state.reset()
                     return Response("OK", status=200)
 
-                try:
-                    cleaned_response = clean_response(bot_response)
-                    logger.info(f"Cleaned response: {cleaned_response}")
-                except Exception as e:
-                    logger.error(f"Response cleaning failed: {e}")
-                    external_send_message(from_number, "Sorry, I couldn't process the diagnosis output.")
+                # Turned away at capacity: the symptoms are kept so the user can ask again
+                if run_diagnosis(from_number, symptom_summary, Priority.NORMAL):
                     session_state.reset()
-                    return Response("OK", status=200)
-
-                logger.info("Sending final diagnosis text and audio...")
-                try:
-                    audio_filename = tts_service.generate_speech(cleaned_response, from_number)
-                    if audio_filename:
-                        audio_path = os.path.join(app.config['STATIC_FOLDER'], 'audio', audio_filename)
-                        if os.path.exists(audio_path):
-                            logger.info(f"Audio file generated: {audio_path} ({os.path.getsize(audio_path)} bytes)")
-                        else:
-                            logger.error(f"Audio file {audio_path} does not exist after generation!")
-                    else:
-                        logger.error("Audio filename is None after generation!")
-                except Exception as e:
-                    logger.error(f"Audio generation failed: {e}")
-                    audio_filename = None
-
-                # Try to send both text and audio, fallback to text if audio fails
-                try:
-                    if audio_filename and os.path.exists(os.path.join(app.config['STATIC_FOLDER'], 'audio', audio_filename)):
-                        logger.info("Attempting to send paired text and audio response...")
-                        success, status = send_paired_response(from_number, cleaned_response, audio_filename)
-                        logger.info(f"send_paired_response returned: success={success}, status={status}")
-                        if not success:
-                            logger.warning("Paired response failed, falling back to text-only.")
-                            external_send_message(from_number, cleaned_response)
-                    else:
-                        logger.warning("Audio not available, sending text-only response.")
-                        external_send_message(from_number, cleaned_response)
-                except Exception as e:
-                    logger.error(f"Sending response failed: {e}")
-                    external_send_message(from_number, cleaned_response)
-                
-                session_state.reset()
-                logger.info(f"Conversation for {from_number} has been reset.")
                 return Response("OK", status=200)
             else:
                 session_state.add_symptom(user_input)
-                logger.info(f"Added new symptom. History: {session_state.symptom_history}")
-                external_send_message(
-                    to_number=from_number,
-                    body_text="Got it. If you’re finished listing symptoms, reply with ‘no’ or ‘that’s all’. Otherwise, add more symptoms."
+                logger.debug("Added symptom, history: %s", session_state.symptom_history)
+                reply(
+                    from_number,
+                    user_input,
+                    "Got it. If you’re finished listing symptoms, reply with ‘no’ or ‘that’s all’. Otherwise, add more symptoms."
                 )
         else: # GREETING state
             session_state.reset()
             session_state.add_symptom(user_input)
             session_state.type = ConversationStateType.COLLECTING_SYMPTOMS
-            logger.info(f"New conversation started. First symptom: '{user_input}'")
-            external_send_message(to_number=from_number, body_text="I've noted that. Is there anything else about the symptoms?")
+            logger.debug("New conversation, first symptom: %r", user_input)
+            reply(from_number, user_input, "I've noted that. Is there anything else about the symptoms?")
             
         return Response("OK", status=200)
 
     except Exception as e:
-        logger.error(f"Webhook error: {str(e)}", exc_info=True)
+        logger.error("Webhook error: %s", e, exc_info=True)
         return Response("Server error", status=500)
 
-@app.route('/audio/<filename>')
-def serve_audio(filename):
-    """Serve audio files with proper headers and error handling"""
-    try:
-        # Log the request for debugging
-        logger.info(f"🎵 Audio request received for: {filename}")
-        logger.info(f"📡 Request from: {request.remote_addr}")
-        logger.info(f"🔗 Full URL: {request.url}")
-        logger.info(f"📋 Request headers: {dict(request.headers)}")
-        
-        safe_filename = os.path.basename(filename)
-        audio_path = os.path.join(app.config['STATIC_FOLDER'], 'audio', safe_filename)
-        
-        logger.info(f"📁 Looking for audio file at: {audio_path}")
-        
-        if os.path.exists(audio_path):
-            file_size = os.path.getsize(audio_path)
-            logger.info(f"✅ Audio file found, size: {file_size} bytes")
-            
-            # Set proper headers for audio streaming
-            response = send_file(
-                audio_path,
-                mimetype='audio/mpeg',
-                as_attachment=False,
-                download_name=safe_filename
-            )
-            
-            # Add CORS headers for Twilio
-            response.headers['Access-Control-Allow-Origin'] = '*'
-            response.headers['Access-Control-Allow-Methods'] = 'GET, OPTIONS'
-            response.headers['Access-Control-Allow-Headers'] = 'Content-Type'
-            response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
-            response.headers['Pragma'] = 'no-cache'
-            response.headers['Expires'] = '0'
-            response.headers['Content-Length'] = str(file_size)
-            
-            logger.info(f"✅ Successfully serving audio file: {safe_filename}")
-            logger.info(f"📊 Response headers: {dict(response.headers)}")
-            return response
-        else:
-            logger.error(f"❌ Audio file not found: {audio_path}")
-            return Response("Audio file not found", status=404, mimetype='text/plain')
-            
-    except Exception as e:
-        logger.error(f"❌ Error serving audio {filename}: {e}", exc_info=True)
-        return Response(f"Error serving audio: {str(e)}", status=500, mimetype='text/plain')
-
-@app.route('/audio/<filename>', methods=['OPTIONS'])
-def audio_options(filename):
-    """Handle CORS preflight requests for audio files"""
-    response = Response()
-    response.headers['Access-Control-Allow-Origin'] = '*'
-    response.headers['Access-Control-Allow-Methods'] = 'GET, OPTIONS'
-    response.headers['Access-Control-Allow-Headers'] = 'Content-Type'
-    return response
-
-@app.route('/health', methods=['GET'])
+@main_bp.route('/health', methods=['GET'])
 def health_check():
     """Simple health check endpoint"""
     return jsonify({
@@ -392,78 +460,304 @@ def health_check():
         "timestamp": datetime.now().isoformat()
     })
 
-@app.route('/conversations/<phone_number>')
+@main_bp.route('/ready', methods=['GET'])
+def readiness_check():
+    """Readiness probe: 503 until the model is loaded, so no traffic reaches a cold worker"""
+    loaded = model_singleton.is_loaded()
+    return jsonify({
+        "ready": loaded,
+        "model_loaded": loaded,
+        "model_warm": model_singleton.warm,
+        "pid": os.getpid()
+    }), 200 if loaded else 503
+
+@main_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Per-stage latency histograms, in-flight gauges and component counters in Prometheus text format"""
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@main_bp.route('/stats')
+def get_stats():
+    """Message counts, error rates and response-time quantiles per hour or per day"""
+    try:
+        period = request.args.get('period', 'hour')
+        start = parse_date(request.args.get('start'))
+        end = parse_date(request.args.get('end'))
+        with db.engine.connect() as connection:
+            return jsonify(query_rollups(connection, period, start, end))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def whatsapp_number(phone_number):
+    """
+    The stored 'whatsapp:+<digits>' form of a phone number given with or
+    without the prefix or '+'. A '+' in a query string arrives as a space.
+    """
+    digits = phone_number.strip()
+    if digits.startswith('whatsapp:'):
+        digits = digits[len('whatsapp:'):].strip()
+    return f"whatsapp:+{digits.lstrip('+')}"
+
+@main_bp.route('/conversations/search')
+@require_admin_token
+def search_conversation_log():
+    """Full-text search over all conversations, best match first"""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({"error": "q is required"}), 400
+    if db.engine.dialect.name != 'sqlite' or not app.config['SEARCH_INDEX']:
+        return jsonify({"error": "Search is not available for this database"}), 501
+
+    phone_number = request.args.get('phone_number')
+    if phone_number:
+        phone_number = whatsapp_number(phone_number)
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    match = 'any' if request.args.get('match') == 'any' else 'all'
+    try:
+        with db.engine.connect() as connection:
+            results = search_conversations(connection, query, phone_number, limit, offset, match)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({
+        "query": query,
+        "results": results,
+        "next_offset": offset + limit if len(results) == limit else None
+    })
+
+@main_bp.route('/conversations/export')
+@require_admin_token
+def export_conversation_log():
+    """Stream the conversation log as NDJSON or CSV, optionally gzip-compressed"""
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"error": f"Unsupported format '{fmt}'"}), 400
+    try:
+        phone_number = request.args.get('phone_number')
+        filters = {
+            'phone_number': whatsapp_number(phone_number) if phone_number else None,
+            'start': parse_date(request.args.get('start')),
+            'end': parse_date(request.args.get('end')),
+        }
+    except ValueError:
+        return jsonify({"error": "start and end must be ISO dates"}), 400
+    compress = request.args.get('gzip', '').lower() in ('1', 'true', 'yes')
+
+    def generate():
+        with db.engine.connect() as connection:
+            yield from export_conversations(connection, fmt, compress, **filters)
+
+    filename = f"conversations.{fmt}" + ('.gz' if compress else '')
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/gzip' if compress else EXPORT_FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+@main_bp.route('/conversations/<phone_number>')
 def get_conversations(phone_number):
-    """Get conversation history for a phone number"""
+    """Get conversation history for a phone number, newest first, one page at a time"""
     try:
         # Ensure proper WhatsApp format for lookup
-        if not phone_number.startswith('whatsapp:'):
-            phone_number = f"whatsapp:+{phone_number.lstrip('+')}"
-        
-        history = get_conversation_history(phone_number)
+        phone_number = whatsapp_number(phone_number)
+
+        limit = min(max(request.args.get('limit', 10, type=int), 1), 100)
+        cursor = request.args.get('cursor')
+        try:
+            before = decode_cursor(cursor) if cursor else None
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        include_archived = request.args.get('include_archived', '').lower() in ('1', 'true', 'yes')
+        history = get_conversation_history(phone_number, limit=limit, before=before, include_archived=include_archived)
         return jsonify({
             "phone_number": phone_number,
-            "conversations": history
+            "conversations": history,
+            "next_cursor": encode_cursor(history[-1]) if len(history) == limit else None
         })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-def cleanup_old_audio_files():
-    """Clean up audio files older than 1 hour"""
-    audio_dir = os.path.join(app.config['STATIC_FOLDER'], 'audio')
-    current_time = time.time()
-    for filename in os.listdir(audio_dir):
-        file_path = os.path.join(audio_dir, filename)
-        # Remove files older than 1 hour
-        if os.path.getctime(file_path) < (current_time - 3600):
-            try:
-                os.remove(file_path)
-                logger.info(f"Cleaned up old audio file: {filename}")
-            except Exception as e:
-                logger.error(f"Failed to remove old audio file {filename}: {e}")
+def reply(to_number, user_input, body_text, status=None):
+    """Send a text reply and queue the exchange for the conversation log."""
+    result = external_send_message(to_number, body_text)
+    if status is None:
+        status = 'sent' if result.get('success') else 'failed'
+    conversation_log.log(to_number, user_input, body_text, status=status)
+    return result
 
+def throttled_reply(from_number, user_input, decision):
+    """
+    Answer to a number over its rate limit. Urgent symptoms still get the
+    emergency reply; anything else gets one notice per notice interval and is
+    otherwise dropped.
+    """
+    if user_input and Intent.URGENT in UserIntent.detect(user_input):
+        reply(from_number, user_input, EMERGENCY_REPLY, status='throttled')
+    elif decision == Decision.THROTTLE:
+        logger.warning("Rate limit reached for %s", from_number)
+        reply(from_number, user_input or "[voice message]",
+              "You're sending messages faster than I can answer. Please wait a minute, then send your message again.",
+              status='throttled')
+    return Response("OK", status=200)
+
+@tracer.traced('run_diagnosis')
+def run_diagnosis(to_number, symptom_summary, priority):
+    """
+    Generate a diagnosis on the inference scheduler and deliver it to the user.
+    Returns False, after asking the user to retry, when DIAGNOSIS_MAX_IN_FLIGHT
+    diagnoses are already running. Urgent diagnoses are never turned away.
+    """
+    tracer.current_span().set_attribute('priority', priority.name)
+    if not diagnosis_slots.acquire(force=priority == Priority.URGENT):
+        logger.warning("Diagnosis for %s turned away: %d already running", to_number, diagnosis_slots.in_flight)
+        reply(to_number, symptom_summary,
+              "I'm helping a lot of people right now. Please reply 'no' again in a minute and I'll send your diagnosis.",
+              status='busy')
+        return False
+    try:
+        generate_and_deliver(to_number, symptom_summary, priority)
+    finally:
+        diagnosis_slots.release()
+    return True
+
+def generate_and_deliver(to_number, symptom_summary, priority):
+    """Runs the model for a diagnosis, cleans the output and sends it in the admitted delivery mode."""
+    with admission.track():
+        future = inference_scheduler.submit(priority, timed_ai_response, symptom_summary)
+        try:
+            bot_response, response_time = future.result(timeout=app.config['INFERENCE_TIMEOUT'])
+        except Exception as e:
+            # Still waiting for a worker: drop it instead of generating a reply nobody will get
+            if future.cancel():
+                logger.warning("Diagnosis for %s dropped after waiting %ds for the model",
+                               to_number, app.config['INFERENCE_TIMEOUT'])
+            logger.error("Model generation failed: %s", e)
+            reply(to_number, symptom_summary, "Sorry, I couldn't generate a diagnosis at this time.", status='failed')
+            return
+
+        try:
+            with STAGE_SECONDS.time(stage='clean_response'), tracer.span('clean_response'):
+                cleaned_response = clean_response(bot_response)
+        except Exception as e:
+            logger.error("Response cleaning failed: %s", e)
+            reply(to_number, symptom_summary, "Sorry, I couldn't process the diagnosis output.", status='failed')
+            return
+
+        status = deliver_diagnosis(to_number, cleaned_response, admission.admit())
+        conversation_log.log(to_number, symptom_summary, cleaned_response, response_time, status)
+
+def generate_audio_file(text, to_number):
+    """Generate speech for a response. Returns the audio filename, or None if it is unusable."""
+    try:
+        with STAGE_SECONDS.time(stage='tts'):
+            audio_filename = tts_service.generate_speech(text, to_number)
+        if audio_filename:
+            audio_path = os.path.join(app.config['STATIC_FOLDER'], 'audio', audio_filename)
+            if os.path.exists(audio_path):
+                logger.debug("Audio file generated: %s", audio_path)
+                return audio_filename
+            logger.error("Audio file %s does not exist after generation!", audio_path)
+        else:
+            logger.error("Audio filename is None after generation!")
+    except Exception as e:
+        logger.error("Audio generation failed: %s", e)
+    return None
+
+@tracer.traced('send_deferred_audio')
+def send_deferred_audio(to_number, text_response):
+    """Background job: generate the audio for an already-sent text diagnosis and send it."""
+    audio_filename = generate_audio_file(text_response, to_number)
+    if audio_filename:
+        audio_path = os.path.join(app.config['STATIC_FOLDER'], 'audio', audio_filename)
+        try:
+            with tracer.span('audio.publish'):
+                audio_url = audio_storage.publish(audio_path, audio_filename)
+        except Exception as e:
+            logger.error("Failed to publish audio %s: %s", audio_filename, e)
+            return
+        send_whatsapp_audio(to_number, audio_url)
+
+@tracer.traced('deliver_diagnosis')
+def deliver_diagnosis(to_number, cleaned_response, mode):
+    """
+    Send a diagnosis using the delivery mode chosen by the admission controller.
+    Returns the status to record in the conversation log.
+    """
+    tracer.current_span().set_attribute('mode', mode.name)
+    logger.info("Sending diagnosis to %s in %s mode", to_number, mode.name)
+    try:
+        if mode == DeliveryMode.DEFERRED_AUDIO:
+            result = external_send_message(to_number, cleaned_response)
+            if not audio_queue.submit(send_deferred_audio, to_number, cleaned_response):
+                logger.warning("Deferred audio queue full, diagnosis sent as text only.")
+            return 'sent' if result.get('success') else 'failed'
+        if mode == DeliveryMode.TEXT_ONLY:
+            result = external_send_message(to_number, cleaned_response)
+            return 'sent' if result.get('success') else 'failed'
+
+        # Try to send both text and audio, fallback to text if audio fails
+        audio_filename = generate_audio_file(cleaned_response, to_number)
+        if audio_filename:
+            success, status = send_paired_response(to_number, cleaned_response, audio_filename)
+            if success:
+                return 'sent'
+            logger.warning("Paired response failed (%s), falling back to text-only.", status)
+        else:
+            logger.warning("Audio not available, sending text-only response.")
+        result = external_send_message(to_number, cleaned_response)
+        return 'sent' if result.get('success') else 'failed'
+    except Exception as e:
+        logger.error("Sending response failed: %s", e)
+        result = external_send_message(to_number, cleaned_response)
+        return 'sent' if result.get('success') else 'failed'
+
+@tracer.traced('send_paired_response')
 def send_paired_response(to_number, text_response, audio_filename):
     """Send both text and audio responses as a pair, with robust logging."""
     try:
-        logger.info(f"Starting paired response for {to_number}")
         # Send text response first
         text_result = external_send_message(
             to_number=to_number,
             body_text=text_response,
             message_type='whatsapp'
         )
-        logger.info(f"Text message sent successfully: {text_result}")
         # Prepare audio response
-        base_url = app.config['BASE_URL']
-        audio_url = f"{base_url}/audio/{audio_filename}"
         audio_path = os.path.join(app.config['STATIC_FOLDER'], 'audio', audio_filename)
-        logger.info(f"Audio URL: {audio_url}")
-        logger.info(f"Audio path: {audio_path}")
         # Verify audio file exists and has content
         if not os.path.exists(audio_path):
-            logger.error(f"Audio file not found at {audio_path}")
+            logger.error("Audio file not found at %s", audio_path)
             return False, 'audio_file_missing'
         file_size = os.path.getsize(audio_path)
         if file_size == 0:
-            logger.error(f"Audio file is empty: {audio_path}")
+            logger.error("Audio file is empty: %s", audio_path)
             return False, 'audio_file_empty'
-        logger.info(f"Audio file verified: {file_size} bytes")
+        try:
+            with tracer.span('audio.publish'):
+                audio_url = audio_storage.publish(audio_path, audio_filename)
+        except Exception as e:
+            logger.error("Failed to publish audio %s: %s", audio_filename, e)
+            return False, 'audio_publish_failed'
         # Send audio response
         try:
-            audio_result = twilio_client.messages.create(
-                from_='whatsapp:+14155238886',
-                to=to_number,
-                media_url=[audio_url]
-            )
-            logger.info(f"Audio message sent successfully: {audio_result.sid}")
-            logger.info(f"Paired response completed. Text: {text_result}, Audio: {audio_result.sid}")
+            with STAGE_SECONDS.time(stage='twilio_media'), tracer.span('twilio.send_media'):
+                audio_result = twilio_client.messages.create(
+                    from_='whatsapp:+14155238886',
+                    to=to_number,
+                    media_url=[audio_url]
+                )
+            logger.info("Paired response sent to %s: text %s, audio %s",
+                        to_number, text_result.get('sid'), audio_result.sid)
             return True, 'sent_paired'
         except Exception as e:
-            logger.error(f"Failed to send audio message: {e}")
+            logger.error("Failed to send audio message: %s", e)
             return False, 'audio_send_failed'
     except Exception as e:
-        logger.error(f"Failed to send paired response: {e}", exc_info=True)
+        logger.error("Failed to send paired response: %s", e, exc_info=True)
         return False, 'failed'
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    # The reloader and debugger are for local development only; profile production with /admin/profile
+    create_app().run(debug=config('FLASK_DEBUG', default=False, cast=bool), host='0.0.0.0', port=5000)
\ No newline at end of file
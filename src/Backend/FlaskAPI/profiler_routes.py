@@ -0,0 +1,70 @@
+import logging
+
+from flask import Blueprint, Response, jsonify, request
+
+from Backend.FlaskAPI.auth import require_admin_token
+from Backend.Pipeline.profiler import profiler
+
+logger = logging.getLogger(__name__)
+
+profiler_bp = Blueprint('profiler', __name__)
+
+FORMATS = {
+    'collapsed': 'text/plain; charset=utf-8',
+    'svg': 'image/svg+xml',
+}
+
+
+def _flag(value):
+    return str(value).lower() in ('1', 'true', 'yes', 'on')
+
+
+@profiler_bp.route('/admin/profile', methods=['POST'])
+@require_admin_token
+def start_profile():
+    """
+    Start sampling the live process. Parameters (query string or form):
+    seconds (default 30), requests (stop after this many webhook requests),
+    interval_ms (default 10) and memory=1 to also take tracemalloc snapshots.
+    """
+    try:
+        requests_limit = request.values.get('requests')
+        session = profiler.start(
+            seconds=float(request.values.get('seconds', 30)),
+            max_requests=int(requests_limit) if requests_limit else None,
+            interval=float(request.values.get('interval_ms', 10)) / 1000,
+            memory=_flag(request.values.get('memory', False))
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 409
+    logger.info("Profiling started by %s for up to %ss", request.remote_addr, session.seconds)
+    return jsonify(session.report()), 202
+
+
+@profiler_bp.route('/admin/profile', methods=['GET'])
+@require_admin_token
+def get_profile():
+    """The current or last profile: format=json (summary), collapsed (stacks) or svg (flame graph)."""
+    session = profiler.session
+    if session is None:
+        return jsonify({"error": "No profile has been started"}), 404
+    fmt = request.args.get('format', 'json')
+    if fmt == 'json':
+        return jsonify(session.report(top=request.args.get('top', 20, type=int)))
+    if fmt not in FORMATS:
+        return jsonify({"error": f"format must be json, {', '.join(FORMATS)}"}), 400
+    body = session.collapsed() if fmt == 'collapsed' else session.flamegraph()
+    return Response(body, content_type=FORMATS[fmt])
+
+
+@profiler_bp.route('/admin/profile', methods=['DELETE'])
+@require_admin_token
+def stop_profile():
+    """Stop the running profile early."""
+    session = profiler.stop()
+    if session is None:
+        return jsonify({"error": "No profile has been started"}), 404
+    return jsonify(session.report())
+
@@ -1,17 +1,27 @@
 from datetime import datetime, timedelta
-import re
+
+from .intent_matcher import Intent, VOCABULARIES, get_matcher
+from .conversation_state import get_session_store
 
 class UserIntent:
     """A simple utility to determine user intent from short, conversational messages."""
 
     # Words indicating the user has more symptoms to add
-    AFFIRMATIVE_WORDS = {'yes', 'yep', 'ya', 'sure', 'ok', 'absolutely', 'correct'}
+    AFFIRMATIVE_WORDS = set(VOCABULARIES['en'][Intent.AFFIRMATIVE])
     
     # Words indicating the user is finished providing symptoms
-    NEGATIVE_WORDS = {'no', 'nope', 'nah', 'thats all', "that's all", 'done', 'finished', 'no thank you', 'nothing else', 'that is all', 'no more'}
+    NEGATIVE_WORDS = set(VOCABULARIES['en'][Intent.NEGATIVE])
 
     # Words indicating a greeting
-    GREETING_WORDS = {'hi', 'hello', 'hey', 'good morning', 'good afternoon', 'good evening', 'greetings'}
+    GREETING_WORDS = set(VOCABULARIES['en'][Intent.GREETING])
+
+    @staticmethod
+    def detect(message: str) -> set:
+        """
+        Returns every intent found in the message in a single pass,
+        e.g. {Intent.GREETING, Intent.URGENT} for "hi, he is having a seizure".
+        """
+        return get_matcher().detect(message)
 
     @staticmethod
     def is_negative(message: str) -> bool:
@@ -19,12 +29,7 @@ class UserIntent:
         Checks if the user's message indicates they are finished adding symptoms.
         Returns True if the user says "no", "that's all", etc.
         """
-        msg = message.lower().strip()
-        msg = re.sub(r'[^a-z\s]', '', msg)  # Remove punctuation
-        for word in UserIntent.NEGATIVE_WORDS:
-            if word in msg:
-                return True
-        return False
+        return Intent.NEGATIVE in UserIntent.detect(message)
 
     @staticmethod
     def is_greeting(message: str) -> bool:
@@ -32,17 +37,15 @@ class UserIntent:
         Checks if the user's message is a greeting.
         Returns True if the message is a greeting word.
         """
-        msg = message.lower().strip()
-        # Only match whole words using regex word boundaries
-        for greet in UserIntent.GREETING_WORDS:
-            if re.search(rf'\b{re.escape(greet)}\b', msg):
-                return True
-        return False
+        return Intent.GREETING in UserIntent.detect(message)
 
 class ConversationManager:
-    def __init__(self):
+    def __init__(self, store=None):
+        # Symptom history lives in the shared session store; `sessions` only
+        # holds short-lived quick-response context for this process.
+        self.store = store or get_session_store()
         self.sessions = {}
-        self.session_timeout = timedelta(minutes=30)
+        self.session_timeout = timedelta(seconds=self.store.ttl_seconds)
         
     def get_quick_response(self, message, phone_number):
         message = message.lower().strip()
@@ -83,17 +86,16 @@ class ConversationManager:
     def update_session(self, phone_number, user_input=None):
         """Update session with the latest user input and interaction time."""
         now = datetime.now()
-        if phone_number not in self.sessions:
-            self.sessions[phone_number] = {'symptom_history': []}
-        
         # Add new symptom to the history if provided
         if user_input:
-            self.sessions[phone_number]['symptom_history'].append(user_input)
-            
-        self.sessions[phone_number]['last_interaction'] = now
+            self.store.append_symptom(phone_number, user_input)
+        else:
+            self.store.touch(phone_number)
+
+        self.sessions.setdefault(phone_number, {})['last_interaction'] = now
         
     def clean_old_sessions(self):
-        """Remove expired sessions"""
+        """Remove expired quick-response context. The session store expires symptom history itself."""
         now = datetime.now()
         expired = [
             phone for phone, data in self.sessions.items()
@@ -104,5 +106,5 @@ class ConversationManager:
             
     def get_symptom_history(self, phone_number):
         """Get the accumulated list of symptoms for this conversation."""
-        session = self.sessions.get(phone_number, {})
-        return session.get('symptom_history', [])
\ No newline at end of file
+        _, symptoms = self.store.load(phone_number)
+        return symptoms
\ No newline at end of file
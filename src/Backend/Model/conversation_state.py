@@ -1,6 +1,9 @@
-from datetime import datetime, timedelta
 from enum import Enum, auto
 import logging
+import threading
+import time
+
+from .session_store import create_session_store
 
 logger = logging.getLogger(__name__)
 class ConversationStateType(Enum):
@@ -9,59 +12,89 @@ class ConversationStateType(Enum):
     COLLECTING_SYMPTOMS = auto()    # The system is actively asking for and recording symptoms.
 
 class ConversationState:
-    """Holds all information about a single user's ongoing session."""
-    def __init__(self):
-        self.type = ConversationStateType.GREETING
-        self.symptom_history = []
-        self.last_update = datetime.now()
+    """
+    Holds all information about a single user's ongoing session.
+    Changes are written through to the session store, so every worker sees them.
+    """
+    __slots__ = ('phone_number', '_store', '_type', 'symptom_history', 'last_update')
+
+    def __init__(self, phone_number=None, store=None, state_type=ConversationStateType.GREETING, symptom_history=None):
+        self.phone_number = phone_number
+        self._store = store
+        self._type = state_type
+        self.symptom_history = symptom_history or []
+        self.last_update = time.monotonic()
+
+    @property
+    def type(self):
+        return self._type
+
+    @type.setter
+    def type(self, state_type):
+        self._type = state_type
+        self.last_update = time.monotonic()
+        if self._store is not None:
+            self._store.set_type(self.phone_number, state_type.name)
 
     def add_symptom(self, symptom: str):
         """Adds a new symptom to the session's history."""
         self.symptom_history.append(symptom)
-        self.last_update = datetime.now()
-    
+        self.last_update = time.monotonic()
+        if self._store is not None:
+            self._store.append_symptom(self.phone_number, symptom)
+
     def get_all_symptoms(self) -> str:
         """Returns a single string of all recorded symptoms."""
         return ". ".join(self.symptom_history)
 
     def reset(self):
         """Resets the conversation to its initial state."""
-        self.type = ConversationStateType.GREETING
+        self._type = ConversationStateType.GREETING
         self.symptom_history = []
-        self.last_update = datetime.now()
+        self.last_update = time.monotonic()
+        if self._store is not None:
+            self._store.reset(self.phone_number, self._type.name)
+
+# Session store shared by all requests (and, with SESSION_STORE=redis, all workers).
+# Sessions expire after SESSION_TTL_SECONDS of inactivity. Created on first use:
+# the journal behind the in-memory store runs a writer thread, which must be
+# started in the worker process rather than in a preloading parent.
+_session_store = None
+_session_store_lock = threading.Lock()
 
-# In-memory session store
-_conversation_states = {}
+def get_session_store():
+    """Returns the session store used for conversation state."""
+    global _session_store
+    if _session_store is None:
+        with _session_store_lock:
+            if _session_store is None:
+                _session_store = create_session_store()
+    return _session_store
 
 def get_conversation_state(phone_number: str) -> ConversationState:
     """Gets, or creates, the conversation state for a given phone number."""
-    if phone_number not in _conversation_states:
-        _conversation_states[phone_number] = ConversationState()
-    
-    state = _conversation_states[phone_number]
-    # Reset the conversation if it has been inactive for more than 30 minutes
-    if datetime.now() - state.last_update > timedelta(minutes=30):
-        state.reset()
-        logger.info(f"Resetting stale conversation for {phone_number}")
-        
-    return state
+    store = get_session_store()
+    state_type, symptoms = store.load(phone_number)
+    return ConversationState(
+        phone_number,
+        store,
+        ConversationStateType[state_type] if state_type else ConversationStateType.GREETING,
+        symptoms
+    )
 
 def update_conversation_state(phone_number, state):
     """Update the conversation state for a given phone number"""
-    _conversation_states[phone_number] = {
-        "state": state,
-        "last_update": datetime.now()
-    }
+    get_session_store().set_type(phone_number, state.name)
 
 def clear_conversation_state(phone_number):
     """Clear the conversation state for a given phone number"""
-    if phone_number in _conversation_states:
-        del _conversation_states[phone_number]
+    get_session_store().delete(phone_number)
 
 def reset_conversation_questions(phone_number):
     """Reset the asked questions for a given phone number to start fresh"""
-    if phone_number in _conversation_states:
-        _conversation_states[phone_number]["state"].reset_questions()
-        _conversation_states[phone_number]["last_update"] = datetime.now()
-        return True
-    return False
\ No newline at end of file
+    store = get_session_store()
+    state_type, symptoms = store.load(phone_number)
+    if state_type is None and not symptoms:
+        return False
+    store.reset(phone_number, ConversationStateType.GREETING.name)
+    return True
@@ -0,0 +1,339 @@
+"""
+Compares model variants on a fixed corpus of pediatric symptom prompts.
+
+Each variant runs in its own process with its own environment (GPT_MODEL and
+anything else the model loader reads), so load time and memory are measured
+from a cold start and one variant cannot affect the next. Every prompt goes
+through get_ai_response and clean_response exactly as in the webhook.
+
+    python -m Backend.Model.evaluate --variant gpt2 --variant distilgpt2
+    python -m Backend.Model.evaluate --variant "local:GPT_MODEL=/models/gpt2-finetuned" --repeat 3
+    python -m Backend.Model.evaluate --variant "torch:GPT_MODEL=gpt2" --variant "onnx:GPT_MODEL=gpt2,MODEL_BACKEND=onnx"
+    python -m Backend.Model.evaluate --variants-file variants.json --output evaluation.json
+
+A variants file is a JSON list of {"name": ..., "env": {"GPT_MODEL": ..., ...}}.
+Run from src/.
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+# (user message, symptom history) pairs as deliver_diagnosis sends them. Most
+# conversations end with the collected symptoms; a few ask a direct question.
+PROMPTS = (
+    ("no thats all", ["my daughter has a high fever", "she is very tired", "she is not eating"]),
+    ("no", ["he has been coughing all night", "his nose is runny"]),
+    ("that's it", ["she has a rash on her arms and legs", "the rash is itchy"]),
+    ("no more", ["my baby keeps vomiting after feeding", "he is 4 months old"]),
+    ("done", ["he has diarrhea", "he has a stomach ache", "it started yesterday"]),
+    ("nothing else", ["she has a sore throat", "her glands are swollen", "she has a mild fever"]),
+    ("no", ["he fell and bumped his head", "there is a bump on his forehead"]),
+    ("that's all", ["she has red itchy eyes", "there is yellow crust on her eyelids"]),
+    ("no", ["my son burned his hand on the stove"]),
+    ("no thanks", ["she has an earache", "she keeps pulling her ear", "she cried all night"]),
+    ("nope", ["he has a nosebleed that won't stop"]),
+    ("no", ["my toddler has a temperature of 39", "he is shivering"]),
+    ("What should I do if my child has a fever of 38.5?", None),
+    ("My son has a bee sting on his arm and it is swollen. What should I do?", None),
+    ("How do I treat a small cut on my daughter's knee?", None),
+    ("My baby has a diaper rash. How can I help?", None),
+)
+
+# A reply counts as well formed when the model wrote a "Diagnosis:" line and
+# at least one first aid step, which is what clean_response is built to parse
+DIAGNOSIS_PREFIX = 'diagnosis:'
+FIRST_AID_HEADER = "*First Aid Steps*:"
+
+
+class GenerationProbe:
+    """
+    A generate() streamer that records when the first new token arrives and
+    how many follow. generate() hands it the prompt ids first, then each new
+    token as it is produced.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.started = time.perf_counter()
+        self.first_token_at = None
+        self.last_token_at = None
+        self.tokens = 0
+        self._prompt_seen = False
+
+    def put(self, value):
+        if not self._prompt_seen:
+            self._prompt_seen = True
+            return
+        now = time.perf_counter()
+        if self.first_token_at is None:
+            self.first_token_at = now
+        self.last_token_at = now
+        self.tokens += value.numel() if hasattr(value, 'numel') else len(value)
+
+    def end(self):
+        pass
+
+    def result(self):
+        if self.first_token_at is None:
+            return {'ttft_seconds': None, 'new_tokens': 0, 'tokens_per_second': None}
+        decode_seconds = self.last_token_at - self.first_token_at
+        return {
+            'ttft_seconds': self.first_token_at - self.started,
+            'new_tokens': self.tokens,
+            # Decode rate, after the first token (which also pays for the prompt)
+            'tokens_per_second': (self.tokens - 1) / decode_seconds if self.tokens > 1 and decode_seconds > 0 else None,
+        }
+
+
+class _ProbedModel:
+    """Passes the probe to every generation call of the wrapped pipeline."""
+
+    def __init__(self, model, probe):
+        self.model = model
+        self.probe = probe
+
+    def __call__(self, *args, **kwargs):
+        self.probe.reset()
+        return self.model(*args, streamer=self.probe, **kwargs)
+
+
+def rss_mb():
+    """Current resident set size, where /proc is available."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 1024
+
+
+def structure(raw, cleaned):
+    has_diagnosis = any(line.strip().lower().startswith(DIAGNOSIS_PREFIX) for line in raw.split('\n'))
+    has_first_aid = FIRST_AID_HEADER in cleaned
+    return has_diagnosis, has_first_aid
+
+
+def evaluate_prompts(repeat=1, limit=None):
+    """Loads the configured model and runs the corpus through it. Runs in the worker process."""
+    from .loadModel import get_ai_response
+    from .model_singleton import ModelSingleton
+    from .response_handler import clean_response
+
+    prompts = PROMPTS[:limit] if limit else PROMPTS
+    singleton = ModelSingleton.get_instance()
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    model = singleton.get_model()
+    load_seconds = time.perf_counter() - start
+    rss_loaded = rss_mb()
+
+    probe = GenerationProbe()
+    singleton._model = _ProbedModel(model, probe)
+
+    # The first call pays for lazy allocations; it is reported on its own
+    start = time.perf_counter()
+    get_ai_response(*prompts[0])
+    first_response_seconds = time.perf_counter() - start
+
+    samples = []
+    for _ in range(repeat):
+        for user_input, history in prompts:
+            start = time.perf_counter()
+            raw, _ = get_ai_response(user_input, history)
+            generation = probe.result()
+            clean_start = time.perf_counter()
+            cleaned = clean_response(raw)
+            end = time.perf_counter()
+            has_diagnosis, has_first_aid = structure(raw, cleaned)
+            samples.append(dict(
+                generation,
+                prompt=user_input if history is None else ". ".join(history),
+                latency_seconds=end - start,
+                clean_seconds=end - clean_start,
+                failed=generation['new_tokens'] == 0,
+                has_diagnosis=has_diagnosis,
+                has_first_aid=has_first_aid,
+                well_formed=has_diagnosis and has_first_aid,
+                output_chars=len(cleaned),
+                output=cleaned,
+            ))
+
+    return {
+        'model': os.environ.get('GPT_MODEL', 'gpt2'),
+        'backend': singleton.backend,
+        'load_seconds': load_seconds,
+        'rss_before_load_mb': rss_before,
+        'rss_loaded_mb': rss_loaded,
+        'peak_rss_mb': peak_rss_mb(),
+        'first_response_seconds': first_response_seconds,
+        'samples': samples,
+    }
+
+
+def _percentile(values, pct):
+    values = sorted(v for v in values if v is not None)
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def _median(values):
+    values = [v for v in values if v is not None]
+    return statistics.median(values) if values else None
+
+
+def summarize(result):
+    samples = result['samples']
+    count = len(samples)
+
+    def rate(key):
+        return sum(1 for s in samples if s[key]) / count if count else None
+
+    return {
+        'backend': result['backend'],
+        'load_seconds': result['load_seconds'],
+        'rss_loaded_mb': result['rss_loaded_mb'],
+        'peak_rss_mb': result['peak_rss_mb'],
+        'first_response_seconds': result['first_response_seconds'],
+        'responses': count,
+        'failed': sum(1 for s in samples if s['failed']),
+        'latency_p50_seconds': _percentile([s['latency_seconds'] for s in samples], 50),
+        'latency_p95_seconds': _percentile([s['latency_seconds'] for s in samples], 95),
+        'ttft_p50_seconds': _percentile([s['ttft_seconds'] for s in samples], 50),
+        'ttft_p95_seconds': _percentile([s['ttft_seconds'] for s in samples], 95),
+        'tokens_per_second': _median([s['tokens_per_second'] for s in samples]),
+        'mean_new_tokens': statistics.mean(s['new_tokens'] for s in samples) if count else None,
+        'mean_output_chars': statistics.mean(s['output_chars'] for s in samples) if count else None,
+        'clean_p95_ms': 1000 * _percentile([s['clean_seconds'] for s in samples], 95) if count else None,
+        'diagnosis_rate': rate('has_diagnosis'),
+        'first_aid_rate': rate('has_first_aid'),
+        'well_formed_rate': rate('well_formed'),
+    }
+
+
+def run_variant(variant, repeat=1, limit=None, timeout=3600):
+    """Evaluates one variant in a fresh interpreter with its environment overrides."""
+    command = [sys.executable, '-m', 'Backend.Model.evaluate', '--worker', '--repeat', str(repeat)]
+    if limit:
+        command += ['--limit', str(limit)]
+    env = dict(os.environ, **{k: str(v) for k, v in variant.get('env', {}).items()})
+    logger.info("Evaluating %s (%s)", variant['name'], variant.get('env', {}))
+    try:
+        proc = subprocess.run(command, env=env, cwd=SRC_DIR, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return {'name': variant['name'], 'env': variant.get('env', {}), 'error': f"timed out after {timeout}s"}
+    if proc.returncode != 0:
+        lines = proc.stderr.strip().splitlines()
+        return {'name': variant['name'], 'env': variant.get('env', {}), 'error': lines[-1] if lines else f"exit {proc.returncode}"}
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    return dict(result, name=variant['name'], env=variant.get('env', {}), summary=summarize(result))
+
+
+def parse_variant(text):
+    """'gpt2' or 'name:KEY=value,KEY=value'."""
+    if ':' not in text:
+        return {'name': text, 'env': {'GPT_MODEL': text}}
+    name, _, assignments = text.partition(':')
+    env = {}
+    for assignment in filter(None, assignments.split(',')):
+        key, sep, value = assignment.partition('=')
+        if not sep:
+            raise argparse.ArgumentTypeError(f"Expected KEY=value, got '{assignment}'")
+        env[key.strip()] = value.strip()
+    return {'name': name, 'env': env}
+
+
+def _fmt(value, spec, scale=1):
+    return format(value * scale, spec) if value is not None else '-'
+
+
+def print_table(results, min_well_formed):
+    """Prints variants fastest first and names the fastest usable one."""
+    ok = sorted((r for r in results if 'error' not in r), key=lambda r: r['summary']['latency_p50_seconds'] or 0)
+    header = (f"{'variant':<24} {'backend':<8} {'load s':>7} {'RSS MB':>7} {'TTFT ms':>8} {'tok/s':>7} {'p50 s':>7} "
+              f"{'p95 s':>7} {'diag %':>7} {'aid %':>6} {'ok %':>5} {'chars':>6}")
+    print(header)
+    print('-' * len(header))
+    for r in ok:
+        s = r['summary']
+        usable = s['well_formed_rate'] is not None and s['well_formed_rate'] >= min_well_formed and not s['failed']
+        print(f"{r['name'][:23] + ('*' if usable else ''):<24} {s['backend'] or '-':<8} {_fmt(s['load_seconds'], '7.1f')} "
+              f"{_fmt(s['rss_loaded_mb'], '7.0f')} {_fmt(s['ttft_p50_seconds'], '8.0f', 1000)} "
+              f"{_fmt(s['tokens_per_second'], '7.1f')} {_fmt(s['latency_p50_seconds'], '7.2f')} "
+              f"{_fmt(s['latency_p95_seconds'], '7.2f')} {_fmt(s['diagnosis_rate'], '7.0f', 100)} "
+              f"{_fmt(s['first_aid_rate'], '6.0f', 100)} {_fmt(s['well_formed_rate'], '5.0f', 100)} "
+              f"{_fmt(s['mean_output_chars'], '6.0f')}")
+    for r in results:
+        if 'error' in r:
+            print(f"{r['name'][:24]:<24} failed: {r['error']}")
+
+    usable = [r for r in ok if r['summary']['well_formed_rate'] >= min_well_formed and not r['summary']['failed']]
+    print()
+    if usable:
+        print(f"Fastest usable variant (* above, at least {min_well_formed:.0%} well formed): {usable[0]['name']}")
+    else:
+        print(f"No variant produced at least {min_well_formed:.0%} well-formed replies")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m Backend.Model.evaluate',
+                                     description="Compare model variants for latency and output quality.")
+    parser.add_argument('--variant', action='append', type=parse_variant, default=[],
+                        help="GPT_MODEL value, or name:KEY=value,... environment overrides (repeatable)")
+    parser.add_argument('--variants-file', help="JSON list of {\"name\": ..., \"env\": {...}}")
+    parser.add_argument('--repeat', type=int, default=1, help="Passes over the prompt corpus")
+    parser.add_argument('--limit', type=int, help="Only use the first N prompts")
+    parser.add_argument('--min-well-formed', type=float, default=0.8,
+                        help="Share of well-formed replies a variant needs to count as usable")
+    parser.add_argument('--timeout', type=float, default=3600, help="Seconds allowed per variant")
+    parser.add_argument('--output', help="Write full results, including every reply, to this JSON file")
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        logging.basicConfig(level=logging.WARNING, stream=sys.stderr)
+        print(json.dumps(evaluate_prompts(args.repeat, args.limit)))
+        return
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    variants = list(args.variant)
+    if args.variants_file:
+        with open(args.variants_file, encoding='utf-8') as f:
+            variants.extend(json.load(f))
+    if not variants:
+        variants = [{'name': 'default', 'env': {}}]
+
+    results = [run_variant(v, args.repeat, args.limit, args.timeout) for v in variants]
+    print()
+    print_table(results, args.min_well_formed)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'prompts': len(PROMPTS[:args.limit] if args.limit else PROMPTS), 'repeat': args.repeat,
+                       'variants': results}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -3,7 +3,8 @@ from transformers import AutoTokenizer, AutoModelForCausalLM
 import logging
 from pathlib import Path
 
-logging.basicConfig(level=logging.INFO)
+from Backend.Pipeline.logs import configure_logging
+
 logger = logging.getLogger(__name__)
 
 def setup_model_cache():
@@ -25,11 +26,12 @@ def setup_model_cache():
         tokenizer = AutoTokenizer.from_pretrained(model_name, cache_dir=cache_dir)
         model = AutoModelForCausalLM.from_pretrained(model_name, cache_dir=cache_dir)
         
-        logger.info(f"Model cached successfully in {cache_dir}")
+        logger.info("Model cached successfully in %s", cache_dir)
         return True
     except Exception as e:
-        logger.error(f"Failed to initialize model: {e}")
+        logger.error("Failed to initialize model: %s", e)
         return False
 
 if __name__ == "__main__":
+    configure_logging(fmt='text')
     setup_model_cache()
\ No newline at end of file
@@ -0,0 +1,119 @@
+from enum import Enum
+import re
+
+from .urgent_symptoms import URGENT_TERMS
+
+
+class Intent(Enum):
+    """Intents that can be recognised in a short conversational message."""
+    GREETING = 'greeting'
+    AFFIRMATIVE = 'affirmative'     # The user has more symptoms to add
+    NEGATIVE = 'negative'           # The user is finished providing symptoms
+    URGENT = 'urgent'               # The message describes an emergency
+
+
+# Per-language phrase lists. Phrases are matched on whole words after normalisation,
+# so "no" matches "no, that's it" but not "runny nose".
+VOCABULARIES = {
+    'en': {
+        Intent.GREETING: ('hi', 'hello', 'hey', 'good morning', 'good afternoon', 'good evening', 'greetings'),
+        Intent.AFFIRMATIVE: ('yes', 'yep', 'ya', 'sure', 'ok', 'absolutely', 'correct'),
+        Intent.NEGATIVE: ('no', 'nope', 'nah', 'thats all', "that's all", 'done', 'finished', 'no thank you',
+                          'nothing else', 'that is all', 'no more'),
+        Intent.URGENT: URGENT_TERMS,
+    },
+}
+
+_NON_WORD = re.compile(r"\W+")
+
+
+def _lower_without_apostrophes(text: str) -> str:
+    # Chained replace is several times faster than str.translate with a non-Latin-1 table
+    return text.lower().replace("'", "").replace("’", "")
+
+
+def normalize(text: str) -> str:
+    """Lowercases, drops apostrophes and replaces other punctuation with single spaces."""
+    return _NON_WORD.sub(' ', _lower_without_apostrophes(text)).strip()
+
+
+def _trie_pattern(node):
+    """
+    Turns a character trie into a regex with shared prefixes factored out,
+    which the re engine rejects in one or two character comparisons instead
+    of trying every phrase in turn. Spaces match any run of punctuation or
+    whitespace, so messages need no normalisation pass beyond lowercasing.
+    Longer phrases are tried first, so "no thank you" wins over "no" at the
+    same position.
+    """
+    branches = [
+        (r'\W+' if char == ' ' else re.escape(char)) + _trie_pattern(child)
+        for char, child in sorted(node.items()) if char
+    ]
+    if not branches:
+        return ''
+    pattern = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+    if '' in node:
+        pattern = '(?:' + pattern + ')?'
+    return pattern
+
+
+class IntentMatcher:
+    """
+    Matches every phrase of a set of vocabularies with a single precompiled
+    pattern, so a message is scanned once no matter how many phrases or
+    intents there are.
+    """
+
+    def __init__(self, vocabularies):
+        self.phrase_intents = {}
+        for vocabulary in vocabularies:
+            for intent, phrases in vocabulary.items():
+                for phrase in phrases:
+                    key = normalize(phrase)
+                    if key:
+                        self.phrase_intents.setdefault(key, set()).add(intent)
+
+        trie = {}
+        for phrase in self.phrase_intents:
+            node = trie
+            for char in phrase:
+                node = node.setdefault(char, {})
+            node[''] = True
+        self.pattern = re.compile(rf"(?<!\w){_trie_pattern(trie)}(?!\w)")
+
+    def matches(self, message: str):
+        """Returns (intent, phrase) pairs for every phrase found in the message, in order."""
+        found = []
+        for match in self.pattern.finditer(_lower_without_apostrophes(message)):
+            phrase = _NON_WORD.sub(' ', match.group(0))
+            for intent in self.phrase_intents[phrase]:
+                found.append((intent, phrase))
+        return found
+
+    def detect(self, message: str) -> set:
+        """Returns the set of intents found in the message."""
+        intents = set()
+        for match in self.pattern.finditer(_lower_without_apostrophes(message)):
+            intents.update(self.phrase_intents[_NON_WORD.sub(' ', match.group(0))])
+        return intents
+
+
+_matchers = {}
+
+
+def register_vocabulary(language: str, vocabulary: dict):
+    """Adds or extends a language's phrase lists. Matchers are rebuilt on next use."""
+    current = VOCABULARIES.setdefault(language, {})
+    for intent, phrases in vocabulary.items():
+        current[intent] = tuple(current.get(intent, ())) + tuple(phrases)
+    _matchers.clear()
+
+
+def get_matcher(languages=None) -> IntentMatcher:
+    """Returns the cached matcher for the given languages (all registered languages by default)."""
+    key = tuple(sorted(languages or VOCABULARIES))
+    matcher = _matchers.get(key)
+    if matcher is None:
+        matcher = _matchers[key] = IntentMatcher(VOCABULARIES[lang] for lang in key)
+    return matcher
@@ -1,4 +1,5 @@
 from .model_singleton import ModelSingleton
+from Backend.Pipeline.tracing import tracer
 import logging
 import time
 
@@ -11,7 +12,7 @@ def initialize_model():
         model_singleton.get_model()
         return True
     except Exception as e:
-        logger.error(f"Model initialization failed: {e}")
+        logger.error("Model initialization failed: %s", e)
         return False
 
 def clear_model_cache():
@@ -21,9 +22,10 @@ def clear_model_cache():
         model_singleton.clear_cache()
         return True
     except Exception as e:
-        logger.error(f"Failed to clear model cache: {e}")
+        logger.error("Failed to clear model cache: %s", e)
         return False
 
+@tracer.traced('get_ai_response')
 def get_ai_response(user_input, symptom_history=None):
     """Get response from the AI model, considering all past symptoms."""
     start_time = time.time()
@@ -39,7 +41,7 @@ def get_ai_response(user_input, symptom_history=None):
         else:
             input_text = f"Question: {user_input}\n\nAnswer:"
 
-        logger.info(f"🤖 Generating response for combined input: {input_text}...")
+        logger.debug("🤖 Generating response for: %r", input_text)
 
         # Generate response using a simpler, more robust set of parameters
         response = model(
@@ -51,7 +53,7 @@ def get_ai_response(user_input, symptom_history=None):
 
         # Extract and clean the response text
         raw_response = response[0]['generated_text']
-        logger.info(f"Raw model output: \"{raw_response}\"")
+        logger.debug("Raw model output: %r", raw_response)
 
         bot_response = raw_response
         if input_text in bot_response:
@@ -65,11 +67,12 @@ def get_ai_response(user_input, symptom_history=None):
         if not bot_response or bot_response.strip() == "":
             bot_response = "I am sorry, but I could not determine a response. Could you please rephrase your question?"
         
-        logger.info(f"✅ Generated response in {response_time:.2f} seconds: {bot_response[:100]}...")
+        model_singleton.warm = True
+        logger.info("✅ Generated response in %.2f seconds (%d chars)", response_time, len(bot_response))
         return bot_response, response_time
 
     except Exception as e:
-        logger.error(f"❌ Error generating AI response: {e}", exc_info=True)
+        logger.error("❌ Error generating AI response: %s", e, exc_info=True)
         # Return a fallback response with time
         return ("I apologize, but I'm having trouble processing your request. "
                 "Please try again in a moment."), time.time() - start_time
\ No newline at end of file
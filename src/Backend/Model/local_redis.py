@@ -0,0 +1,141 @@
+import fnmatch
+import threading
+import time
+
+
+class LocalRedis:
+    """
+    In-process stand-in for the subset of the redis-py client used by
+    RedisSessionStore, so the Redis backend can be exercised without a server.
+    Values are stored as bytes, like a real Redis connection returns them.
+    """
+
+    def __init__(self):
+        self._data = {}
+        self._expires = {}
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _encode(value):
+        return value if isinstance(value, bytes) else str(value).encode('utf-8')
+
+    def _get_live(self, key):
+        expires_at = self._expires.get(key)
+        if expires_at is not None and expires_at <= time.monotonic():
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        return self._data.get(key)
+
+    def get(self, key):
+        with self._lock:
+            value = self._get_live(key)
+            return value if isinstance(value, bytes) else None
+
+    def set(self, key, value, ex=None):
+        with self._lock:
+            self._data[key] = self._encode(value)
+            self._expires.pop(key, None)
+            if ex is not None:
+                self._expires[key] = time.monotonic() + ex
+            return True
+
+    def rpush(self, key, *values):
+        with self._lock:
+            items = self._get_live(key)
+            if items is None:
+                items = self._data[key] = []
+            items.extend(self._encode(v) for v in values)
+            return len(items)
+
+    def lrange(self, key, start, end):
+        with self._lock:
+            items = self._get_live(key) or []
+            end = len(items) if end == -1 else end + 1
+            return list(items[start:end])
+
+    def expire(self, key, seconds):
+        with self._lock:
+            if self._get_live(key) is None:
+                return False
+            self._expires[key] = time.monotonic() + seconds
+            return True
+
+    def ttl(self, key):
+        with self._lock:
+            if self._get_live(key) is None:
+                return -2
+            expires_at = self._expires.get(key)
+            return -1 if expires_at is None else int(expires_at - time.monotonic())
+
+    def delete(self, *keys):
+        with self._lock:
+            removed = 0
+            for key in keys:
+                if self._get_live(key) is not None:
+                    removed += 1
+                self._data.pop(key, None)
+                self._expires.pop(key, None)
+            return removed
+
+    def zadd(self, key, mapping, xx=False):
+        with self._lock:
+            members = self._get_live(key)
+            if members is None:
+                members = self._data[key] = {}
+            added = 0
+            for member, score in mapping.items():
+                member = self._encode(member)
+                if member not in members:
+                    if xx:
+                        continue
+                    added += 1
+                members[member] = float(score)
+            return added
+
+    def zrem(self, key, *members):
+        with self._lock:
+            items = self._get_live(key) or {}
+            return sum(items.pop(self._encode(member), None) is not None for member in members)
+
+    def zremrangebyscore(self, key, low, high):
+        with self._lock:
+            items = self._get_live(key) or {}
+            low, high = float(low), float(high)
+            removed = [member for member, score in items.items() if low <= score <= high]
+            for member in removed:
+                del items[member]
+            return len(removed)
+
+    def zcard(self, key):
+        with self._lock:
+            return len(self._get_live(key) or {})
+
+    def scan_iter(self, match='*'):
+        with self._lock:
+            keys = [key for key in list(self._data) if self._get_live(key) is not None]
+        return iter([key for key in keys if fnmatch.fnmatchcase(key, match)])
+
+    def pipeline(self, transaction=True):
+        return _LocalPipeline(self)
+
+
+class _LocalPipeline:
+    """Buffers commands and runs them under the client lock on execute()."""
+
+    def __init__(self, client):
+        self._client = client
+        self._commands = []
+
+    def __getattr__(self, name):
+        method = getattr(self._client, name)
+
+        def queue(*args, **kwargs):
+            self._commands.append((method, args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        with self._client._lock:
+            results = [method(*args, **kwargs) for method, args, kwargs in self._commands]
+        self._commands = []
+        return results
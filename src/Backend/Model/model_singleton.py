@@ -1,4 +1,3 @@
-from transformers.pipelines import pipeline
 import os
 import logging
 from pathlib import Path
@@ -9,6 +8,14 @@ logger = logging.getLogger(__name__)
 class ModelSingleton:
     _instance = None
     _model = None
+    # Set once the loaded model has produced a response (first-call allocations done)
+    warm = False
+    # Backend actually serving generation: 'pytorch' or 'onnx'
+    backend = None
+    # Intra-op threads for generation in this process; None leaves the library default
+    threads = None
+    # Process that loaded the model; differs from os.getpid() in a forked worker
+    loaded_pid = None
     
     @classmethod
     def get_instance(cls):
@@ -23,31 +30,81 @@ class ModelSingleton:
                 model_name = str(config("GPT_MODEL", default="gpt2"))
                 auth_token = config("HUGGING_FACE_TOKEN", default=None)
 
-                logger.info(f"Model specified in environment: '{model_name}'")
+                logger.info("Model specified in environment: '%s'", model_name)
                 if auth_token:
                     logger.info("Hugging Face token FOUND.")
                 else:
                     logger.warning("Hugging Face token NOT FOUND. This will fail for private models.")
                 
-                logger.info(f"Initializing pipeline for model: '{model_name}'...")
-                
-                self._model = pipeline(
-                    "text-generation",
-                    model=model_name,
-                    token=auth_token,
-                    device=-1
-                )
-                logger.info(f"--- Model '{model_name}' loaded successfully. ---")
+                if str(config("MODEL_BACKEND", default="pytorch")).lower() == 'onnx':
+                    self._model = self._load_onnx(model_name, auth_token)
+
+                if self._model is None:
+                    # transformers (and torch with it) takes seconds to import
+                    from transformers.pipelines import pipeline
+
+                    logger.info("Initializing pipeline for model: '%s'...", model_name)
+
+                    self._model = pipeline(
+                        "text-generation",
+                        model=model_name,
+                        token=auth_token,
+                        device=-1
+                    )
+                    self.backend = 'pytorch'
+                self.loaded_pid = os.getpid()
+                logger.info("--- Model '%s' loaded successfully (%s). ---", model_name, self.backend)
             except Exception as e:
-                logger.error(f"--- 🔴 FAILED to load model '{model_name}': {e} ---", exc_info=True)
+                logger.error("--- 🔴 FAILED to load model '%s': %s ---", model_name, e, exc_info=True)
                 raise RuntimeError(f"Model loading failed: {str(e)}")
         return self._model
 
+    def _load_onnx(self, model_name, auth_token):
+        """ONNX Runtime pipeline, or None (with a warning) so PyTorch is used instead."""
+        try:
+            from .onnx_backend import DEFAULT_CACHE_DIR, default_intra_op_threads, load_onnx_pipeline
+
+            threads = config("ONNX_INTRA_OP_THREADS", default=0, cast=int) or self.threads or \
+                default_intra_op_threads(config("INFERENCE_WORKERS", default=1, cast=int))
+            model = load_onnx_pipeline(
+                model_name,
+                cache_dir=config("ONNX_CACHE_DIR", default=DEFAULT_CACHE_DIR),
+                token=auth_token,
+                intra_op_threads=threads
+            )
+            self.backend = 'onnx'
+            return model
+        except Exception as e:
+            logger.warning("ONNX backend unavailable for '%s', falling back to PyTorch: %s", model_name, e, exc_info=True)
+            return None
+
+    def prepare_worker(self, threads):
+        """
+        Per-process setup for serving, run in each worker. When the model was
+        loaded by a preloading parent, PyTorch weights stay shared
+        copy-on-write and only the thread count is set here, in the child. An
+        ONNX Runtime session owns threads that do not survive fork, so that
+        backend is reloaded from the cached export.
+        """
+        self.threads = threads
+        if self.backend == 'onnx' and self.loaded_pid != os.getpid():
+            self.clear_cache()
+            self.get_model()
+        elif self.backend == 'pytorch':
+            import torch
+            torch.set_num_threads(threads)
+        logger.info("Model ready in worker %d (%s, %s threads)", os.getpid(), self.backend, threads)
+
+    def is_loaded(self):
+        return self._model is not None
+
     def clear_cache(self):
         """Clear the model from memory"""
         if self._model is not None:
             del self._model
             self._model = None
+            self.warm = False
+            self.backend = None
             logger.info("Model cache cleared successfully")
     
     def force_reload(self):
@@ -0,0 +1,87 @@
+"""
+ONNX Runtime backend for text generation.
+
+The configured causal LM is exported to ONNX once, with past key/values so
+each new token only runs the last position, and cached on disk. Later loads
+skip the export. Generation still goes through a Hugging Face text-generation
+pipeline, so callers see the same interface as with PyTorch.
+
+Needs the optional `optimum[onnxruntime]` package.
+"""
+import logging
+import os
+import re
+import shutil
+import time
+import uuid
+
+from transformers import AutoTokenizer
+from transformers.pipelines import pipeline
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'nursetalk', 'onnx')
+
+
+def default_intra_op_threads(inference_workers=1):
+    """Splits the CPUs between the inference workers so their thread pools don't fight."""
+    return max(1, (os.cpu_count() or 1) // max(1, inference_workers))
+
+
+def export_path(model_name, cache_dir=DEFAULT_CACHE_DIR):
+    """Directory holding the exported model, one per model name."""
+    return os.path.join(cache_dir, re.sub(r'[^A-Za-z0-9._-]+', '--', model_name.strip('/')))
+
+
+def export_model(model_name, cache_dir=DEFAULT_CACHE_DIR, token=None):
+    """
+    Exports the model and its tokenizer unless a finished export is cached.
+    The export is written to a scratch directory and renamed into place, so a
+    crash or a second worker exporting at the same time never leaves a
+    half-written model behind.
+    """
+    from optimum.onnxruntime import ORTModelForCausalLM
+
+    target = export_path(model_name, cache_dir)
+    if os.path.isdir(target):
+        return target
+
+    os.makedirs(cache_dir, exist_ok=True)
+    scratch = f"{target}.tmp-{uuid.uuid4().hex}"
+    start = time.perf_counter()
+    logger.info("Exporting '%s' to ONNX in %s", model_name, target)
+    try:
+        model = ORTModelForCausalLM.from_pretrained(model_name, export=True, use_cache=True, token=token)
+        model.save_pretrained(scratch)
+        AutoTokenizer.from_pretrained(model_name, token=token).save_pretrained(scratch)
+        try:
+            os.rename(scratch, target)
+        except OSError:
+            if not os.path.isdir(target):
+                raise
+            # Another worker finished first; use its copy
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    logger.info("Exported '%s' to ONNX in %.1fs", model_name, time.perf_counter() - start)
+    return target
+
+
+def load_onnx_pipeline(model_name, cache_dir=DEFAULT_CACHE_DIR, token=None, intra_op_threads=None):
+    """Returns a text-generation pipeline running on ONNX Runtime."""
+    import onnxruntime
+    from optimum.onnxruntime import ORTModelForCausalLM
+
+    path = export_model(model_name, cache_dir, token)
+
+    options = onnxruntime.SessionOptions()
+    options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.execution_mode = onnxruntime.ExecutionMode.ORT_SEQUENTIAL
+    options.intra_op_num_threads = intra_op_threads or default_intra_op_threads()
+    # One generation step is a single chain of ops; no use for parallel branches
+    options.inter_op_num_threads = 1
+
+    model = ORTModelForCausalLM.from_pretrained(path, use_cache=True, session_options=options,
+                                                provider='CPUExecutionProvider')
+    tokenizer = AutoTokenizer.from_pretrained(path)
+    logger.info("ONNX Runtime session ready for '%s' (%s intra-op threads)", model_name, options.intra_op_num_threads)
+    return pipeline("text-generation", model=model, tokenizer=tokenizer, device=-1)
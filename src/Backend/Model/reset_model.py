@@ -3,7 +3,8 @@ import os
 from transformers import AutoTokenizer, AutoModelForCausalLM
 import logging
 
-logging.basicConfig(level=logging.INFO)
+from Backend.Pipeline.logs import configure_logging
+
 logger = logging.getLogger(__name__)
 
 def reset_model_cache():
@@ -24,8 +25,9 @@ def reset_model_cache():
         logger.info("Model downloaded and cached successfully")
         return True
     except Exception as e:
-        logger.error(f"Failed to reset model: {e}")
+        logger.error("Failed to reset model: %s", e)
         return False
 
 if __name__ == "__main__":
+    configure_logging(fmt='text')
     reset_model_cache()
\ No newline at end of file
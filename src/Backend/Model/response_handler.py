@@ -1,9 +1,81 @@
+import logging
 import re
 import random
 
+logger = logging.getLogger(__name__)
+
 def clean_response(text):
-    """Clean up the AI response by removing repetitive elements and tags"""
-    # ...existing clean_response code from flasky.py...
+    """
+    Cleans the raw AI model output by intelligently parsing multi-line
+    diagnosis and first-aid sections.
+    """
+    logger.debug("Cleaning raw response: %r", text[:200])
+
+    # 1. Initial cleanup
+    text = re.sub(r'\[.*?\]', '', text).strip()
+    text = text.replace("Answer:", "").strip()
+    lines = [line.strip() for line in text.split('\n') if line.strip()]
+
+    # 2. State-machine based parsing
+    diagnosis_lines = []
+    first_aid_lines = []
+    current_section = None
+
+    for line in lines:
+        # First, clean up any residual double spaces from the initial regex
+        line = re.sub(r'\s{2,}', ' ', line).strip()
+        if not line:
+            continue
+
+        if line.lower().startswith("diagnosis:"):
+            current_section = "diagnosis"
+            # Add the text after the keyword
+            diag_text = line.split(":", 1)[1].strip()
+            if diag_text:
+                diagnosis_lines.append(diag_text)
+            continue
+        elif line.lower().startswith("first aid:"):
+            current_section = "first_aid"
+            # Add the text after the keyword
+            aid_text = line.split(":", 1)[1].strip()
+            if aid_text:
+                first_aid_lines.append(aid_text)
+            continue
+        
+        # Append line to the current section if it's a continuation
+        if current_section == "diagnosis":
+            diagnosis_lines.append(line)
+        elif current_section == "first_aid":
+            first_aid_lines.append(line)
+        elif current_section is None:
+            # If we haven't found a section yet, assume it's part of the diagnosis
+            diagnosis_lines.append(line)
+
+    # 3. Process the collected lines
+    # Join multi-line diagnosis
+    if diagnosis_lines:
+        full_diagnosis = " ".join(diagnosis_lines)
+    else:
+        full_diagnosis = "No specific diagnosis provided. Please describe the symptoms."
+
+    # De-duplicate first aid steps
+    unique_steps = []
+    seen_steps = set()
+    for step in first_aid_lines:
+        if step and step.lower() not in seen_steps:
+            unique_steps.append(step)
+            seen_steps.add(step.lower())
+            
+    # 4. Assemble the final response
+    cleaned_text = f"*Diagnosis*:\n{full_diagnosis}"
+    
+    if unique_steps:
+        cleaned_text += "\n\n*First Aid Steps*:"
+        for step in unique_steps:
+            cleaned_text += f"\n• {step}"
+            
+    logger.debug("Cleaned response: %r", cleaned_text[:200])
+    return cleaned_text
 
 def add_conversational_elements(response):
     """Add conversational elements to make responses more natural"""
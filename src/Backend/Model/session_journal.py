@@ -0,0 +1,214 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class SessionJournal:
+    """
+    Write-behind persistence for the in-memory session store.
+
+    Request threads only put operations on a bounded queue; a background
+    thread appends them to a journal file and periodically compacts the live
+    sessions into a snapshot, after which the journal starts over. Each
+    operation carries a sequence number and the snapshot records the last one
+    it includes, so replaying a journal that outlived a crash mid-compaction
+    never applies an operation twice.
+
+    On startup the snapshot and journal are read in the background and kept
+    aside; a session is only handed back to the store the first time its
+    phone number is seen again, and only if it has not expired. Callers wait
+    for the restore with wait_restored() before take().
+    """
+
+    def __init__(self, directory, snapshot_interval=60, max_pending=10000, batch_size=500, restore_wait=5.0):
+        self.directory = directory
+        self.journal_path = os.path.join(directory, 'sessions.journal')
+        self.snapshot_path = os.path.join(directory, 'sessions.snapshot')
+        self.snapshot_interval = snapshot_interval
+        self.batch_size = batch_size
+        self.restore_wait = restore_wait
+        self._queue = queue.Queue(maxsize=max_pending)
+        # Latest state of every session, owned by the writer thread, used for compaction
+        self._mirror = {}
+        self._sequence = 0
+        self._restored = {}
+        self._restored_lock = threading.Lock()
+        self._restore_done = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self.written = 0
+        self.dropped = 0
+        self.snapshots = 0
+        self.replayed = 0
+        self.restored_sessions = 0
+        self.restore_seconds = None
+        self.restore_timeouts = 0
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name='session-journal', daemon=True)
+        self._thread.start()
+        return self
+
+    def record(self, op, phone_number, value=None, expires_at=None):
+        """Queues an operation for the journal. Never blocks; drops and counts when the queue is full."""
+        try:
+            self._queue.put_nowait((op, phone_number, value, expires_at))
+        except queue.Full:
+            self.dropped += 1
+
+    def wait_restored(self):
+        """Waits up to `restore_wait` seconds for the startup restore. Returns whether it has finished."""
+        if self._restore_done.is_set():
+            return True
+        if self._restore_done.wait(self.restore_wait):
+            return True
+        self.restore_timeouts += 1
+        return False
+
+    def take(self, phone_number):
+        """
+        Returns (state type, symptoms, wall-clock expiry) for a restored,
+        unexpired session, or None. Never blocks: before the restore has
+        finished there is nothing to take yet.
+        """
+        if not self._restore_done.is_set():
+            return None
+        with self._restored_lock:
+            entry = self._restored.pop(phone_number, None)
+        if entry is None or entry[2] <= time.time():
+            return None
+        return entry
+
+    def close(self):
+        """Writes everything still queued, compacts and stops the writer thread."""
+        if self._thread is None:
+            return
+        self._stopped.set()
+        self._thread.join(timeout=10)
+        self._thread = None
+
+    def _apply(self, entry):
+        seq, op, phone_number, value, expires_at = entry
+        if op == 'delete':
+            self._mirror.pop(phone_number, None)
+            return
+        session = self._mirror.setdefault(phone_number, [None, [], 0.0])
+        if op == 'append':
+            session[1].append(value)
+        elif op == 'type':
+            session[0] = value
+        elif op == 'reset':
+            session[0] = value
+            session[1] = []
+        if expires_at is not None:
+            session[2] = expires_at
+
+    def _restore(self):
+        start = time.perf_counter()
+        snapshot_sequence = 0
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, encoding='utf-8') as f:
+                snapshot_sequence = json.loads(f.readline())['sequence']
+                for line in f:
+                    phone_number, state_type, symptoms, expires_at = json.loads(line)
+                    self._mirror[phone_number] = [state_type, symptoms, expires_at]
+        self._sequence = snapshot_sequence
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break  # Torn final line from a crash
+                    if entry[0] > snapshot_sequence:
+                        self._apply(entry)
+                        self._sequence = entry[0]
+                        self.replayed += 1
+
+        now = time.time()
+        with self._restored_lock:
+            self._restored = {
+                phone: (state_type, list(symptoms), expires_at)
+                for phone, (state_type, symptoms, expires_at) in self._mirror.items()
+                if expires_at > now
+            }
+        self.restored_sessions = len(self._restored)
+        self.restore_seconds = time.perf_counter() - start
+        self._restore_done.set()
+        logger.info("Restored %d sessions in %.2fs (%d journal entries replayed)",
+                    self.restored_sessions, self.restore_seconds, self.replayed)
+
+    def _compact(self, journal):
+        now = time.time()
+        self._mirror = {phone: s for phone, s in self._mirror.items() if s[2] > now}
+        tmp_path = self.snapshot_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'sequence': self._sequence}) + '\n')
+            for phone_number, (state_type, symptoms, expires_at) in self._mirror.items():
+                f.write(json.dumps([phone_number, state_type, symptoms, expires_at]) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        journal.close()
+        self.snapshots += 1
+        return open(self.journal_path, 'w', encoding='utf-8')
+
+    def _run(self):
+        try:
+            self._restore()
+        except Exception as e:
+            logger.error("Session restore failed, starting empty: %s", e, exc_info=True)
+            self._restore_done.set()
+
+        journal = open(self.journal_path, 'a', encoding='utf-8')
+        next_snapshot = time.monotonic() + self.snapshot_interval
+        while True:
+            batch = []
+            try:
+                batch.append(self._queue.get(timeout=0.5))
+                while len(batch) < self.batch_size:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+
+            if batch:
+                lines = []
+                for op, phone_number, value, expires_at in batch:
+                    self._sequence += 1
+                    entry = [self._sequence, op, phone_number, value, expires_at]
+                    self._apply(entry)
+                    lines.append(json.dumps(entry))
+                journal.write('\n'.join(lines) + '\n')
+                journal.flush()
+                os.fsync(journal.fileno())
+                self.written += len(batch)
+
+            stopping = self._stopped.is_set() and self._queue.empty()
+            if stopping or time.monotonic() >= next_snapshot:
+                try:
+                    journal = self._compact(journal)
+                except Exception as e:
+                    logger.error("Session snapshot failed: %s", e, exc_info=True)
+                next_snapshot = time.monotonic() + self.snapshot_interval
+            if stopping:
+                journal.close()
+                return
+
+    def stats(self):
+        """Returns journal counters for the metrics endpoint."""
+        return {
+            'pending': self._queue.qsize(),
+            'written': self.written,
+            'dropped': self.dropped,
+            'snapshots': self.snapshots,
+            'replayed': self.replayed,
+            'restored_sessions': self.restored_sessions,
+            'restore_seconds': self.restore_seconds,
+            'restore_timeouts': self.restore_timeouts,
+        }
@@ -0,0 +1,356 @@
+from collections import OrderedDict
+import atexit
+import logging
+import math
+import sys
+import threading
+import time
+
+from decouple import config
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SESSION_TTL = 30 * 60  # Conversations expire after 30 minutes of inactivity
+
+
+class SessionStore:
+    """
+    Where conversation state lives. A session is a state type name and an
+    ordered list of symptoms; every write refreshes the session's time to live.
+    """
+
+    def __init__(self, ttl_seconds=DEFAULT_SESSION_TTL):
+        self.ttl_seconds = ttl_seconds
+
+    def load(self, phone_number):
+        """Returns (state type name or None, list of symptoms) for a phone number."""
+        raise NotImplementedError
+
+    def append_symptom(self, phone_number, symptom):
+        """Atomically appends a symptom to the session."""
+        raise NotImplementedError
+
+    def set_type(self, phone_number, state_type):
+        """Stores the session's state type name."""
+        raise NotImplementedError
+
+    def reset(self, phone_number, state_type):
+        """Clears the symptoms and sets the state type in one step."""
+        raise NotImplementedError
+
+    def touch(self, phone_number):
+        """Refreshes the session's time to live without changing it."""
+        raise NotImplementedError
+
+    def delete(self, phone_number):
+        """Removes the session entirely."""
+        raise NotImplementedError
+
+    def count(self):
+        """Number of live sessions."""
+        raise NotImplementedError
+
+    def stats(self):
+        """Returns gauges for the metrics endpoint."""
+        return {'sessions': self.count()}
+
+
+class _Session:
+    """One in-memory session. Slots keep the per-session footprint small."""
+    __slots__ = ('type', 'symptoms', 'expires_at', 'slot', 'size')
+
+    def __init__(self):
+        self.type = None
+        self.symptoms = []
+        self.expires_at = 0.0
+        self.slot = None
+        self.size = 0
+
+
+# Rough bytes per session beyond the phone number and symptoms: the slotted
+# object, its empty list, the OrderedDict node and the timer wheel set entry.
+_SESSION_OVERHEAD = sys.getsizeof(_Session()) + sys.getsizeof([]) + 150
+
+
+class InMemorySessionStore(SessionStore):
+    """
+    Process-local store with a hard cap on memory. Only correct with a single
+    worker process.
+
+    Expiry uses a hashed timer wheel: each session sits in the bucket for the
+    tick at which it expires, and advancing the clock only visits the buckets
+    whose tick has passed, so expiry costs O(1) amortized per session instead
+    of a scan over every session. When `max_sessions` is reached the least
+    recently used session is evicted.
+
+    With a SessionJournal attached, every change is also queued for
+    write-behind persistence, and sessions restored from a previous run are
+    picked up the first time their phone number is seen.
+    """
+
+    def __init__(self, ttl_seconds=DEFAULT_SESSION_TTL, max_sessions=100_000, tick_seconds=5, clock=time.monotonic,
+                 journal=None):
+        super().__init__(ttl_seconds)
+        self.journal = journal
+        self.max_sessions = max_sessions
+        self.tick_seconds = tick_seconds
+        self.clock = clock
+        self._sessions = OrderedDict()
+        # One bucket per tick, plus slack so a full TTL never wraps onto the current bucket
+        self._wheel = [set() for _ in range(int(math.ceil(ttl_seconds / tick_seconds)) + 2)]
+        self._current_tick = int(clock() // tick_seconds)
+        self._lock = threading.Lock()
+        self.memory_bytes = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def _await_restore(self):
+        # Outside the lock: a slow restore holds up this request, not every other one
+        if self.journal is not None:
+            self.journal.wait_restored()
+
+    def _record(self, op, phone_number, value=None):
+        if self.journal is not None:
+            self.journal.record(op, phone_number, value, time.time() + self.ttl_seconds)
+
+    def _remove(self, phone_number, session):
+        del self._sessions[phone_number]
+        self._wheel[session.slot].discard(phone_number)
+        self.memory_bytes -= session.size
+
+    def _advance(self, now):
+        target = int(now // self.tick_seconds)
+        if target <= self._current_tick:
+            return
+        ticks = range(self._current_tick + 1, target + 1)
+        if len(ticks) > len(self._wheel):
+            ticks = range(target - len(self._wheel) + 1, target + 1)
+        for tick in ticks:
+            bucket = self._wheel[tick % len(self._wheel)]
+            for phone_number in [p for p in bucket if self._sessions[p].expires_at <= now]:
+                self._remove(phone_number, self._sessions[phone_number])
+                self.expired += 1
+        self._current_tick = target
+
+    def _schedule(self, phone_number, session, expires_at):
+        slot = int(math.ceil(expires_at / self.tick_seconds)) % len(self._wheel)
+        if session.slot != slot:
+            if session.slot is not None:
+                self._wheel[session.slot].discard(phone_number)
+            self._wheel[slot].add(phone_number)
+            session.slot = slot
+        session.expires_at = expires_at
+
+    def _live(self, phone_number, create=False):
+        now = self.clock()
+        self._advance(now)
+        session = self._sessions.get(phone_number)
+        if session is not None:
+            self._sessions.move_to_end(phone_number)
+            self._schedule(phone_number, session, now + self.ttl_seconds)
+            return session
+
+        restored = self.journal.take(phone_number) if self.journal is not None else None
+        if restored is None and not create:
+            return None
+        session = self._sessions[phone_number] = _Session()
+        session.size = _SESSION_OVERHEAD + sys.getsizeof(phone_number)
+        if restored is not None:
+            session.type, session.symptoms, expires_at = restored
+            session.size += sum(sys.getsizeof(symptom) + 8 for symptom in session.symptoms)
+            # Keep the expiry the session had before the restart
+            self._schedule(phone_number, session, now + max(0.0, expires_at - time.time()))
+        else:
+            self._schedule(phone_number, session, now + self.ttl_seconds)
+        self.memory_bytes += session.size
+        while len(self._sessions) > self.max_sessions:
+            oldest, oldest_session = next(iter(self._sessions.items()))
+            self._remove(oldest, oldest_session)
+            self._record('delete', oldest)
+            self.evicted += 1
+        return session
+
+    def load(self, phone_number):
+        self._await_restore()
+        with self._lock:
+            session = self._live(phone_number)
+            if session is None:
+                return None, []
+            return session.type, list(session.symptoms)
+
+    def append_symptom(self, phone_number, symptom):
+        self._await_restore()
+        with self._lock:
+            session = self._live(phone_number, create=True)
+            session.symptoms.append(symptom)
+            added = sys.getsizeof(symptom) + 8
+            session.size += added
+            self.memory_bytes += added
+            self._record('append', phone_number, symptom)
+
+    def set_type(self, phone_number, state_type):
+        self._await_restore()
+        with self._lock:
+            self._live(phone_number, create=True).type = state_type
+            self._record('type', phone_number, state_type)
+
+    def reset(self, phone_number, state_type):
+        self._await_restore()
+        with self._lock:
+            session = self._live(phone_number, create=True)
+            session.type = state_type
+            freed = session.size - _SESSION_OVERHEAD - sys.getsizeof(phone_number)
+            session.symptoms = []
+            session.size -= freed
+            self.memory_bytes -= freed
+            self._record('reset', phone_number, state_type)
+
+    def touch(self, phone_number):
+        self._await_restore()
+        with self._lock:
+            if self._live(phone_number) is not None:
+                self._record('touch', phone_number)
+
+    def delete(self, phone_number):
+        with self._lock:
+            session = self._sessions.get(phone_number)
+            if session is not None:
+                self._remove(phone_number, session)
+            self._record('delete', phone_number)
+
+    def count(self):
+        with self._lock:
+            self._advance(self.clock())
+            return len(self._sessions)
+
+    def stats(self):
+        """Returns session count, estimated memory, eviction and journal counters."""
+        with self._lock:
+            self._advance(self.clock())
+            stats = {
+                'sessions': len(self._sessions),
+                'max_sessions': self.max_sessions,
+                'memory_bytes': self.memory_bytes,
+                'expired': self.expired,
+                'evicted': self.evicted,
+            }
+        if self.journal is not None:
+            stats.update({f'journal_{key}': value for key, value in self.journal.stats().items()})
+        return stats
+
+
+class RedisSessionStore(SessionStore):
+    """
+    Store shared by every worker and node through Redis. Each session is a
+    string key for the state type and a list key for the symptoms; Redis
+    expires both keys, so no process has to sweep stale sessions.
+
+    A sorted set of phone numbers scored by expiry time is updated in the
+    same pipeline as every write, so count() is two cheap commands instead
+    of a scan over the keyspace. Writes also trim expired entries from it.
+    """
+
+    def __init__(self, client, ttl_seconds=DEFAULT_SESSION_TTL, prefix='nursetalk:session:'):
+        super().__init__(ttl_seconds)
+        self.client = client
+        self.prefix = prefix
+        self.index_key = f"{prefix}index"
+
+    def _keys(self, phone_number):
+        base = f"{self.prefix}{phone_number}"
+        return f"{base}:type", f"{base}:symptoms"
+
+    def _index(self, pipe, phone_number):
+        now = time.time()
+        pipe.zadd(self.index_key, {phone_number: now + self.ttl_seconds})
+        pipe.zremrangebyscore(self.index_key, '-inf', now)
+
+    @staticmethod
+    def _decode(value):
+        return value.decode('utf-8') if isinstance(value, bytes) else value
+
+    def load(self, phone_number):
+        type_key, symptoms_key = self._keys(phone_number)
+        # One round trip for both keys
+        pipe = self.client.pipeline(transaction=False)
+        pipe.get(type_key)
+        pipe.lrange(symptoms_key, 0, -1)
+        state_type, symptoms = pipe.execute()
+        return self._decode(state_type), [self._decode(s) for s in symptoms]
+
+    def append_symptom(self, phone_number, symptom):
+        type_key, symptoms_key = self._keys(phone_number)
+        pipe = self.client.pipeline(transaction=True)
+        pipe.rpush(symptoms_key, symptom)
+        pipe.expire(symptoms_key, self.ttl_seconds)
+        pipe.expire(type_key, self.ttl_seconds)
+        self._index(pipe, phone_number)
+        pipe.execute()
+
+    def set_type(self, phone_number, state_type):
+        type_key, symptoms_key = self._keys(phone_number)
+        pipe = self.client.pipeline(transaction=True)
+        pipe.set(type_key, state_type, ex=self.ttl_seconds)
+        pipe.expire(symptoms_key, self.ttl_seconds)
+        self._index(pipe, phone_number)
+        pipe.execute()
+
+    def reset(self, phone_number, state_type):
+        type_key, symptoms_key = self._keys(phone_number)
+        pipe = self.client.pipeline(transaction=True)
+        pipe.delete(symptoms_key)
+        pipe.set(type_key, state_type, ex=self.ttl_seconds)
+        self._index(pipe, phone_number)
+        pipe.execute()
+
+    def touch(self, phone_number):
+        type_key, symptoms_key = self._keys(phone_number)
+        pipe = self.client.pipeline(transaction=False)
+        pipe.expire(type_key, self.ttl_seconds)
+        pipe.expire(symptoms_key, self.ttl_seconds)
+        # Only sessions that still exist: EXPIRE on a missing key is a no-op
+        pipe.zadd(self.index_key, {phone_number: time.time() + self.ttl_seconds}, xx=True)
+        pipe.execute()
+
+    def delete(self, phone_number):
+        pipe = self.client.pipeline(transaction=True)
+        pipe.delete(*self._keys(phone_number))
+        pipe.zrem(self.index_key, phone_number)
+        pipe.execute()
+
+    def count(self):
+        pipe = self.client.pipeline(transaction=True)
+        pipe.zremrangebyscore(self.index_key, '-inf', time.time())
+        pipe.zcard(self.index_key)
+        return pipe.execute()[1]
+
+
+def create_session_store():
+    """Builds the store selected by SESSION_STORE ('memory' or 'redis')."""
+    backend = config('SESSION_STORE', default='memory').lower()
+    ttl_seconds = config('SESSION_TTL_SECONDS', default=DEFAULT_SESSION_TTL, cast=int)
+    max_sessions = config('SESSION_MAX', default=100_000, cast=int)
+
+    if backend == 'redis':
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("SESSION_STORE=redis requires the 'redis' package")
+        url = config('REDIS_URL', default='redis://localhost:6379/0')
+        logger.info("Using Redis session store at %s", url)
+        return RedisSessionStore(redis.Redis.from_url(url), ttl_seconds=ttl_seconds)
+
+    if backend != 'memory':
+        raise ValueError(f"Unknown SESSION_STORE '{backend}'")
+
+    journal = None
+    journal_dir = config('SESSION_JOURNAL_DIR', default='')
+    if journal_dir:
+        from .session_journal import SessionJournal
+        journal = SessionJournal(
+            journal_dir,
+            snapshot_interval=config('SESSION_SNAPSHOT_INTERVAL', default=60, cast=int)
+        ).start()
+        atexit.register(journal.close)
+        logger.info("Persisting sessions to %s", journal_dir)
+    return InMemorySessionStore(ttl_seconds=ttl_seconds, max_sessions=max_sessions, journal=journal)
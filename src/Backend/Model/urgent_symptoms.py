@@ -0,0 +1,22 @@
+# Phrases that must skip the normal symptom collection flow.
+# Matched on whole words by Backend.Model.intent_matcher.
+URGENT_TERMS = (
+    'not breathing', 'stopped breathing', "can't breathe", 'cant breathe', 'cannot breathe',
+    'struggling to breathe', 'choking', 'turning blue', 'blue lips', 'lips are blue',
+    'seizure', 'seizures', 'seizing', 'convulsion', 'convulsions', 'having a fit',
+    'unconscious', 'unresponsive', 'passed out', 'fainted', "won't wake up", 'wont wake up',
+    'not waking up', 'severe bleeding', "bleeding won't stop", 'swallowed poison',
+    'poisoned', 'drowning', 'drowned', 'anaphylaxis', 'swollen throat', 'no pulse',
+)
+
+# Pre-approved reply sent before the model is consulted
+EMERGENCY_REPLY = (
+    "🚨 This may be an emergency. Call your local emergency number or go to the nearest "
+    "hospital NOW.\n\n"
+    "While you wait for help:\n"
+    "• Stay with the child and keep them on their side if they are not fully awake.\n"
+    "• Do not give food, drink or medicine by mouth.\n"
+    "• If the child is not breathing, start rescue breaths and chest compressions if you know how.\n"
+    "• During a seizure, clear the area, do not hold the child down and put nothing in their mouth.\n\n"
+    "I'm preparing more advice based on what you described."
+)
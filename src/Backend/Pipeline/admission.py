@@ -0,0 +1,93 @@
+from collections import Counter
+from contextlib import contextmanager
+from enum import Enum
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class DeliveryMode(Enum):
+    """How much audio work a diagnosis is allowed to do, ordered by cost."""
+    FULL = 0              # Text and audio sent together on the request thread.
+    DEFERRED_AUDIO = 1    # Text sent now, audio generated and sent in the background.
+    TEXT_ONLY = 2         # Audio skipped entirely.
+
+
+class AdmissionController:
+    """
+    Picks a DeliveryMode for each diagnosis from the number of diagnoses in
+    flight and the depth of the background queues.
+
+    Each mode has its own entry thresholds. The controller steps up as soon as
+    a threshold is reached, but only steps down once both signals have fallen
+    `hysteresis` below the thresholds of the current mode, so it does not flap
+    around a single boundary during a burst.
+    """
+
+    def __init__(self, defer_audio_in_flight=2, text_only_in_flight=4,
+                 defer_audio_queue=4, text_only_queue=8, hysteresis=1,
+                 queue_depth_fn=None):
+        self.thresholds = {
+            DeliveryMode.DEFERRED_AUDIO: (defer_audio_in_flight, defer_audio_queue),
+            DeliveryMode.TEXT_ONLY: (text_only_in_flight, text_only_queue),
+        }
+        self.hysteresis = hysteresis
+        self.queue_depth_fn = queue_depth_fn or (lambda: 0)
+        self.mode = DeliveryMode.FULL
+        self.in_flight = 0
+        self.admitted = Counter()
+        self.transitions = Counter()
+        self._lock = threading.Lock()
+
+    def _target_mode(self, in_flight, queue_depth):
+        target = DeliveryMode.FULL
+        for mode, (max_in_flight, max_queue) in self.thresholds.items():
+            if in_flight >= max_in_flight or queue_depth >= max_queue:
+                target = mode
+        return target
+
+    def _update_mode(self, in_flight, queue_depth):
+        target = self._target_mode(in_flight, queue_depth)
+        if target.value < self.mode.value:
+            # Only recover as far as the hysteresis band allows
+            sticky = self._target_mode(in_flight + self.hysteresis, queue_depth + self.hysteresis)
+            target = DeliveryMode(min(self.mode.value, max(target.value, sticky.value)))
+
+        if target != self.mode:
+            previous, self.mode = self.mode, target
+            self.transitions[f"{previous.name}->{target.name}"] += 1
+            log = logger.warning if target.value > previous.value else logger.info
+            log("Delivery mode changed %s -> %s (in_flight=%d, queue_depth=%d)",
+                previous.name, target.name, in_flight, queue_depth)
+        return self.mode
+
+    def admit(self):
+        """Returns the delivery mode to use for a diagnosis that is about to be sent."""
+        queue_depth = self.queue_depth_fn()
+        with self._lock:
+            mode = self._update_mode(self.in_flight, queue_depth)
+            self.admitted[mode.name] += 1
+            return mode
+
+    @contextmanager
+    def track(self):
+        """Counts a diagnosis as in flight for the duration of the block."""
+        with self._lock:
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def stats(self):
+        """Returns a snapshot of the controller's state and counters."""
+        with self._lock:
+            return {
+                'mode': self.mode.name,
+                'in_flight': self.in_flight,
+                'queue_depth': self.queue_depth_fn(),
+                'admitted': dict(self.admitted),
+                'transitions': dict(self.transitions),
+            }
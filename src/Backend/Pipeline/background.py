@@ -0,0 +1,60 @@
+import contextvars
+import logging
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundQueue:
+    """
+    A bounded job queue drained by a small pool of daemon worker threads.
+    Jobs run in a copy of the context they were submitted from.
+    """
+
+    def __init__(self, name, workers=1, max_size=32):
+        self.name = name
+        self._queue = queue.Queue(maxsize=max_size)
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self._threads = []
+        for i in range(workers):
+            thread = threading.Thread(target=self._run, name=f"{name}-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, fn, *args, **kwargs):
+        """Queues a job without blocking. Returns False if the queue is full."""
+        try:
+            self._queue.put_nowait((contextvars.copy_context(), fn, args, kwargs))
+            return True
+        except queue.Full:
+            self.rejected += 1
+            logger.warning("%s queue is full, job rejected", self.name)
+            return False
+
+    def depth(self):
+        """Number of jobs waiting to be picked up by a worker."""
+        return self._queue.qsize()
+
+    def _run(self):
+        while True:
+            context, fn, args, kwargs = self._queue.get()
+            try:
+                context.run(fn, *args, **kwargs)
+                self.completed += 1
+            except Exception as e:
+                self.failed += 1
+                logger.error("%s job failed: %s", self.name, e, exc_info=True)
+            finally:
+                self._queue.task_done()
+
+    def stats(self):
+        """Returns the queue depth and job counters."""
+        return {
+            'depth': self.depth(),
+            'completed': self.completed,
+            'failed': self.failed,
+            'rejected': self.rejected,
+        }
@@ -0,0 +1,243 @@
+import atexit
+from contextlib import contextmanager
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+LEASE_SUFFIX = '.lease'
+
+
+def _lease_file(path):
+    # One per process and file: another worker releasing its lease must not end ours
+    directory, name = os.path.split(path)
+    return os.path.join(directory, f".{name}.{os.getpid()}{LEASE_SUFFIX}")
+
+
+def _leased_name(lease_name):
+    """The file a lease file such as .reply.mp3.1234.lease protects (reply.mp3)."""
+    return lease_name[1:-len(LEASE_SUFFIX)].rsplit('.', 1)[0]
+
+
+class FileLeases:
+    """
+    Reference counts for files that are being read, so the janitor leaves
+    them alone. While a process holds a lease it also keeps an empty
+    .<name>.<pid>.lease file next to the file, which the janitors of other
+    gunicorn workers see when they scan the directory.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    def acquire(self, path):
+        """Leases a file and returns the function that releases it."""
+        path = os.path.abspath(path)
+        with self._lock:
+            count = self._counts.get(path, 0)
+            self._counts[path] = count + 1
+            if not count:
+                try:
+                    open(_lease_file(path), 'w').close()
+                except OSError as e:
+                    logger.warning("Could not create a lease file for %s: %s", path, e)
+
+        released = False
+
+        def release():
+            nonlocal released
+            if released:
+                return
+            released = True
+            with self._lock:
+                remaining = self._counts.pop(path) - 1
+                if remaining:
+                    self._counts[path] = remaining
+                else:
+                    try:
+                        os.remove(_lease_file(path))
+                    except OSError:
+                        pass
+        return release
+
+    @contextmanager
+    def hold(self, path):
+        release = self.acquire(path)
+        try:
+            yield
+        finally:
+            release()
+
+    def in_use(self, path):
+        with self._lock:
+            return path in self._counts
+
+
+# Shared by the audio routes, the webhook and the janitor
+file_leases = FileLeases()
+
+
+class Janitor:
+    """
+    Keeps generated audio and temp directories within a maximum file age and
+    a total byte budget. Each run lists every directory once with os.scandir,
+    deletes files older than `max_age_seconds`, then evicts the oldest
+    remaining files until the total fits in `max_bytes`.
+
+    Files younger than `min_age_seconds` (just generated, not yet fetched by
+    Twilio) and files with an active lease, in this process or (through its
+    lease file) in another one, are never deleted. Neither are dotfiles and
+    files without an extension, such as the placeholder that keeps
+    static/temp in git: everything the app generates has one. Lease files
+    left behind by a process that died are removed once they are older than
+    `max_age_seconds`, since no lease is held that long.
+    """
+
+    def __init__(self, directories, max_age_seconds=3600, max_bytes=500 * 1024 * 1024, min_age_seconds=120,
+                 interval=60, leases=file_leases, clock=time.time):
+        self.directories = list(directories)
+        self.max_age_seconds = max_age_seconds
+        self.max_bytes = max_bytes
+        self.min_age_seconds = min_age_seconds
+        self.interval = interval
+        self.leases = leases
+        self.clock = clock
+        self.runs = 0
+        self.expired = 0
+        self.evicted = 0
+        self.bytes_reclaimed = 0
+        self.skipped_in_use = 0
+        self.stale_leases = 0
+        self.errors = 0
+        self.files = 0
+        self.bytes = 0
+        self.last_run_seconds = None
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='janitor', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+        return self
+
+    def close(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                self.errors += 1
+                logger.error("Janitor run failed: %s", e)
+
+    def _scan(self, now):
+        """Returns (mtime, size, path) for the files to manage and the paths leased by any process."""
+        files = []
+        leased = set()
+        for directory in self.directories:
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.name.startswith('.'):
+                                if entry.name.endswith(LEASE_SUFFIX):
+                                    self._note_lease(entry, now, leased)
+                            elif '.' in entry.name and entry.is_file(follow_symlinks=False):
+                                stat = entry.stat(follow_symlinks=False)
+                                files.append((stat.st_mtime, stat.st_size, entry.path))
+                        except FileNotFoundError:
+                            continue
+            except FileNotFoundError:
+                continue
+        return files, leased
+
+    def _note_lease(self, entry, now, leased):
+        if now - entry.stat(follow_symlinks=False).st_mtime > self.max_age_seconds:
+            # Left behind by a process that died holding the lease
+            if self._delete(entry.path, 0):
+                self.stale_leases += 1
+            return
+        leased.add(os.path.join(os.path.dirname(entry.path), _leased_name(entry.name)))
+
+    def _in_use(self, path, leased):
+        return path in leased or self.leases.in_use(os.path.abspath(path))
+
+    def _delete(self, path, size):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            self.errors += 1
+            logger.error("Janitor could not remove %s: %s", path, e)
+            return False
+        self.bytes_reclaimed += size
+        return True
+
+    def run_once(self):
+        """One pass over all directories. Returns the number of files deleted."""
+        start = time.perf_counter()
+        now = self.clock()
+        files, leased = self._scan(now)
+        total = sum(size for _, size, _ in files)
+        deleted = 0
+
+        keep = []
+        for mtime, size, path in files:
+            age = now - mtime
+            if age > self.max_age_seconds and age > self.min_age_seconds:
+                if self._in_use(path, leased):
+                    self.skipped_in_use += 1
+                elif self._delete(path, size):
+                    self.expired += 1
+                    deleted += 1
+                    total -= size
+                    continue
+            keep.append((mtime, size, path))
+
+        if total > self.max_bytes:
+            keep.sort()
+            for mtime, size, path in keep:
+                if total <= self.max_bytes:
+                    break
+                if now - mtime < self.min_age_seconds:
+                    break  # everything after this is younger still
+                if self._in_use(path, leased):
+                    self.skipped_in_use += 1
+                    continue
+                if self._delete(path, size):
+                    self.evicted += 1
+                    deleted += 1
+                    total -= size
+            if total > self.max_bytes:
+                logger.warning("Audio and temp files use %d bytes, over the %d byte budget, "
+                               "but the rest are new or in use", total, self.max_bytes)
+
+        self.runs += 1
+        self.files = len(files) - deleted
+        self.bytes = total
+        self.last_run_seconds = round(time.perf_counter() - start, 4)
+        if deleted:
+            logger.info("Janitor removed %d files, %d bytes remain", deleted, total)
+        return deleted
+
+    def stats(self):
+        return {
+            'files': self.files,
+            'bytes': self.bytes,
+            'expired': self.expired,
+            'evicted': self.evicted,
+            'bytes_reclaimed': self.bytes_reclaimed,
+            'skipped_in_use': self.skipped_in_use,
+            'stale_leases': self.stale_leases,
+            'errors': self.errors,
+            'runs': self.runs,
+            'last_run_seconds': self.last_run_seconds,
+        }
@@ -0,0 +1,275 @@
+"""
+Process-wide logging setup.
+
+Log calls on the request path only filter the record and put it on a
+bounded queue; a listener thread formats and writes it. When the queue is
+full the record is dropped and counted rather than blocking the request.
+The message is interpolated when the record is queued (its arguments may
+change afterwards), JSON encoding and tracebacks are done by the listener.
+
+Records are JSON lines with the request ID and, when the request is
+traced, the trace ID. The request ID lives in a contextvar, so jobs run by
+PriorityScheduler and BackgroundQueue log under the request that queued
+them.
+
+Two filters keep high-volume messages in check:
+- Each call site (logger and message template) may write at most
+  LOG_RATE_LIMIT records per second below WARNING. The next record let
+  through carries the number suppressed in between.
+- Calls marked with `extra=SAMPLED` are kept for LOG_SAMPLE_RATE of
+  requests. The decision is made once per request, so a sampled request
+  keeps all of its lines.
+"""
+import atexit
+import contextvars
+from datetime import datetime, timezone
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from decouple import config
+
+from .tracing import current_trace_id
+
+request_id_var = contextvars.ContextVar('request_id', default=None)
+_request_sampled = contextvars.ContextVar('request_sampled', default=None)
+
+# Pass as `extra` on high-volume lines that only need to be seen for a sample of requests
+SAMPLED = {'sampled': True}
+
+# Attributes every LogRecord has; anything else came in through `extra`
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {
+    'message', 'asctime', 'request_id', 'trace_id', 'sampled', 'suppressed', 'taskName'}
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s'
+
+
+def new_request_id():
+    return uuid.uuid4().hex[:16]
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with `extra` fields as top-level keys."""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'request_id': getattr(record, 'request_id', None),
+            'pid': record.process,
+            'thread': record.threadName,
+        }
+        trace_id = getattr(record, 'trace_id', None)
+        if trace_id:
+            entry['trace_id'] = trace_id
+        suppressed = getattr(record, 'suppressed', 0)
+        if suppressed:
+            entry['suppressed'] = suppressed
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry['stack'] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps records marked SAMPLED for `rate` of requests; others always pass."""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+        self.sampled_out = 0
+
+    def filter(self, record):
+        if not getattr(record, 'sampled', False) or self.rate >= 1:
+            return True
+        keep = _request_sampled.get()
+        if keep is None:
+            # Outside a request: decide per record
+            keep = random.random() < self.rate
+        if not keep:
+            self.sampled_out += 1
+        return keep
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Token bucket per call site (logger name and message template) for records
+    below WARNING. Keys are kept in LRU order and capped at `max_keys`.
+    """
+
+    def __init__(self, per_second, max_keys=1024):
+        super().__init__()
+        self.per_second = per_second
+        self.max_keys = max_keys
+        self.limited = 0
+        # key -> [tokens, last refill, suppressed since last record let through]
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if self.per_second <= 0 or record.levelno >= logging.WARNING:
+            return True
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [self.per_second, now, 0]
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(self.per_second, bucket[0] + (now - bucket[1]) * self.per_second)
+                bucket[1] = now
+            if bucket[0] < 1:
+                bucket[2] += 1
+                self.limited += 1
+                return False
+            bucket[0] -= 1
+            record.suppressed, bucket[2] = bucket[2], 0
+        return True
+
+    def reset_after_fork(self):
+        self._lock = threading.Lock()
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Never blocks: a record that does not fit in the queue is dropped and counted."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Only what must be captured on the calling thread; formatting is left to the listener
+        record.request_id = request_id_var.get()
+        record.trace_id = current_trace_id()
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogPipeline:
+    """The queue handler installed on the root logger, its filters and the listener thread."""
+
+    def __init__(self, level, fmt, queue_size, rate_limit, sample_rate, stream=None):
+        self.queue_size = queue_size
+        self.output = logging.StreamHandler(stream or sys.stderr)
+        if fmt == 'text':
+            self.output.setFormatter(logging.Formatter(TEXT_FORMAT))
+        else:
+            self.output.setFormatter(JsonFormatter())
+        self.sampling = SamplingFilter(sample_rate)
+        self.rate_limit = RateLimitFilter(rate_limit)
+        self.handler = _QueueHandler(queue.Queue(maxsize=queue_size))
+        self.handler.addFilter(self.sampling)
+        self.handler.addFilter(self.rate_limit)
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(self.handler)
+        root.setLevel(level)
+        self._start()
+
+    def _start(self):
+        self.listener = logging.handlers.QueueListener(self.handler.queue, self.output, respect_handler_level=True)
+        self.listener.start()
+
+    def after_fork(self):
+        # The listener thread does not exist in the child, and the queue's
+        # lock may have been held at the time of the fork
+        self.handler.queue = queue.Queue(maxsize=self.queue_size)
+        self.rate_limit.reset_after_fork()
+        self._start()
+
+    def stop(self):
+        """Writes everything still queued and stops the listener thread."""
+        if self.listener._thread is not None:
+            self.listener.stop()
+
+    def stats(self):
+        return {
+            'queued': self.handler.queue.qsize(),
+            'dropped': self.handler.dropped,
+            'rate_limited': self.rate_limit.limited,
+            'sampled_out': self.sampling.sampled_out,
+        }
+
+
+_pipeline = None
+
+
+def configure_logging(level=None, fmt=None, stream=None):
+    """
+    Installs the queued handler on the root logger, replacing any other root
+    handlers. LOG_LEVEL, LOG_FORMAT (json or text), LOG_QUEUE_SIZE,
+    LOG_RATE_LIMIT and LOG_SAMPLE_RATE set the defaults. Calling it again
+    returns the existing setup.
+    """
+    global _pipeline
+    if _pipeline is None:
+        _pipeline = LogPipeline(
+            level=level or str(config('LOG_LEVEL', default='INFO')).upper(),
+            fmt=fmt or str(config('LOG_FORMAT', default='json')).lower(),
+            queue_size=config('LOG_QUEUE_SIZE', default=10000, cast=int),
+            rate_limit=config('LOG_RATE_LIMIT', default=20, cast=float),
+            sample_rate=config('LOG_SAMPLE_RATE', default=1.0, cast=float),
+            stream=stream
+        )
+        os.register_at_fork(after_in_child=lambda: _pipeline.after_fork())
+        atexit.register(lambda: _pipeline.stop())
+    return _pipeline
+
+
+def stats():
+    return _pipeline.stats() if _pipeline is not None else {}
+
+
+def init_request_ids(app):
+    """
+    Gives every request an ID, from the X-Request-ID header or a new one,
+    for its log records (and those of the jobs it queues), and returns it in
+    the X-Request-ID response header.
+    """
+    from flask import g, request
+
+    @app.before_request
+    def _start_request():
+        request_id = request.headers.get('X-Request-ID') or new_request_id()
+        g.log_context = (request_id_var.set(request_id), _request_sampled.set(
+            _pipeline is None or random.random() < _pipeline.sampling.rate))
+
+    @app.after_request
+    def _add_request_id(response):
+        request_id = request_id_var.get()
+        if request_id:
+            response.headers['X-Request-ID'] = request_id
+        return response
+
+    @app.teardown_request
+    def _end_request(exc):
+        tokens = g.pop('log_context', None)
+        if tokens is not None:
+            request_id_var.reset(tokens[0])
+            _request_sampled.reset(tokens[1])
@@ -0,0 +1,322 @@
+"""
+Process-wide metrics rendered in the Prometheus text exposition format.
+
+Counters, gauges and histograms keep one shard per thread: a thread only
+ever writes to its own shard, so recording needs no lock (the registry lock
+is taken once per thread and metric, when the shard is created and when
+the thread exits). A scrape adds the shards together. Component stats() dictionaries are exported as
+gauges through collectors.
+"""
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+import re
+import threading
+import time
+import weakref
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+
+_NAME_UNSAFE = re.compile(r'[^a-zA-Z0-9_]')
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _ThreadToken:
+    """Lives in a thread's local storage; its finalizer runs when the thread ends."""
+    __slots__ = ('__weakref__',)
+
+
+class _Sharded:
+    """
+    Base for metrics whose values live in per-thread shards. When a thread
+    exits, its shard is folded into `_retired`, so servers that start a
+    thread per request do not grow the shard list without bound.
+    """
+
+    def __init__(self, registry_lock):
+        self._lock = registry_lock
+        self._local = threading.local()
+        self._shards = []
+        self._retired = self._new_shard()
+
+    def _new_shard(self):
+        raise NotImplementedError
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = self._new_shard()
+            token = self._local.token = _ThreadToken()
+            with self._lock:
+                self._shards.append(shard)
+            weakref.finalize(token, self._retire, shard)
+        return shard
+
+    def _retire(self, shard):
+        with self._lock:
+            for i, value in enumerate(shard):
+                self._retired[i] += value
+            self._shards.remove(shard)
+
+    def _all_shards(self):
+        with self._lock:
+            return [list(self._retired)] + list(self._shards)
+
+
+class _CounterChild(_Sharded):
+    def _new_shard(self):
+        return [0.0]
+
+    def inc(self, amount=1.0):
+        self._shard()[0] += amount
+
+    def dec(self, amount=1.0):
+        self._shard()[0] -= amount
+
+    def value(self):
+        return sum(shard[0] for shard in self._all_shards())
+
+
+class _HistogramChild(_Sharded):
+    def __init__(self, registry_lock, buckets):
+        self.buckets = buckets
+        super().__init__(registry_lock)
+
+    def _new_shard(self):
+        # Per-bucket counts (last slot is +Inf), then the running sum
+        return [0] * (len(self.buckets) + 1) + [0.0]
+
+    def observe(self, value):
+        shard = self._shard()
+        shard[bisect_left(self.buckets, value)] += 1
+        shard[-1] += value
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def snapshot(self):
+        """Returns (cumulative bucket counts, count, sum)."""
+        shards = self._all_shards()
+        counts = [0] * (len(self.buckets) + 1)
+        total = 0.0
+        for shard in shards:
+            for i in range(len(counts)):
+                counts[i] += shard[i]
+            total += shard[-1]
+        cumulative, running = [], 0
+        for count in counts:
+            running += count
+            cumulative.append(running)
+        return cumulative, running, total
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, registry, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = registry._lock
+        self._children = {}
+        registry._metrics.append(self)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _items(self):
+        with self._lock:
+            return list(self._children.items())
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def _new_child(self):
+        return _CounterChild(self._lock)
+
+    def inc(self, amount=1.0):
+        self.labels().inc(amount)
+
+    def render(self):
+        for key, child in self._items():
+            yield f"{self.name}_total{_format_labels(zip(self.labelnames, key))} {_format_value(child.value())}"
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def dec(self, amount=1.0):
+        self.labels().dec(amount)
+
+    @contextmanager
+    def track_inprogress(self, **labels):
+        child = self.labels(**labels)
+        child.inc()
+        try:
+            yield
+        finally:
+            child.dec()
+
+    def render(self):
+        for key, child in self._items():
+            yield f"{self.name}{_format_labels(zip(self.labelnames, key))} {_format_value(child.value())}"
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, registry, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        super().__init__(registry, name, help_text, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self._lock, self.buckets)
+
+    def time(self, **labels):
+        """Context manager that observes the duration of its block."""
+        return self.labels(**labels).time()
+
+    def timed(self, **labels):
+        """Decorator form of time()."""
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.labels(**labels).time():
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def render(self):
+        for key, child in self._items():
+            labels = list(zip(self.labelnames, key))
+            cumulative, count, total = child.snapshot()
+            for bound, value in zip(self.buckets + (float('inf'),), cumulative):
+                yield f"{self.name}_bucket{_format_labels(labels + [('le', _format_value(float(bound)))])} {value}"
+            yield f"{self.name}_count{_format_labels(labels)} {count}"
+            yield f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}"
+
+
+def _flatten(name, value, labels, name_level=True):
+    """
+    Turns a stats() value into (metric name, labels, number) samples. Keys of
+    nested dicts alternate between extending the metric name and becoming a
+    `key` label, so {'admitted': {'FULL': 3}} becomes admitted{key="FULL"} 3.
+    """
+    if value is None:
+        return
+    if isinstance(value, bool):
+        yield name, labels, int(value)
+    elif isinstance(value, (int, float)):
+        yield name, labels, value
+    elif isinstance(value, str):
+        yield name, labels + [('value', value)], 1
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            if name_level:
+                yield from _flatten(f"{name}_{_NAME_UNSAFE.sub('_', str(key))}", item, labels, False)
+            else:
+                yield from _flatten(name, item, labels + [('key', key)], True)
+
+
+class MetricsRegistry:
+    def __init__(self, prefix='nursetalk'):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._metrics = []
+        self._collectors = {}
+
+    def counter(self, name, help_text, labelnames=()):
+        return Counter(self, f"{self.prefix}_{name}", help_text, labelnames)
+
+    def gauge(self, name, help_text, labelnames=()):
+        return Gauge(self, f"{self.prefix}_{name}", help_text, labelnames)
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return Histogram(self, f"{self.prefix}_{name}", help_text, labelnames, buckets)
+
+    def register_stats(self, component, stats_fn):
+        """Exports a component's stats() dict as gauges named <prefix>_<component>_<key>."""
+        self._collectors[component] = stats_fn
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+
+        for component, stats_fn in list(self._collectors.items()):
+            try:
+                stats = stats_fn()
+            except Exception as e:
+                lines.append(f"# {component} stats unavailable: {_escape(e)}")
+                continue
+            samples = {}
+            for name, labels, value in _flatten(f"{self.prefix}_{component}", stats, []):
+                samples.setdefault(name, []).append((labels, value))
+            for name, values in samples.items():
+                lines.append(f"# TYPE {name} gauge")
+                lines.extend(f"{name}{_format_labels(labels)} {_format_value(value)}" for labels, value in values)
+        return '\n'.join(lines) + '\n'
+
+
+# The registry and pipeline metrics shared by the whole process
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.histogram(
+    'stage_seconds', 'Time spent in each stage of handling a message.', ['stage'])
+REQUEST_SECONDS = registry.histogram(
+    'request_seconds', 'Time to handle an HTTP request.', ['endpoint'])
+IN_FLIGHT = registry.gauge(
+    'requests_in_flight', 'Requests currently being handled.', ['endpoint'])
+MESSAGES = registry.counter(
+    'messages', 'Incoming messages by detected kind.', ['kind'])
+
+
+def track_request(endpoint):
+    """Decorator for a view: in-flight gauge and latency histogram for `endpoint`."""
+    in_flight = IN_FLIGHT.labels(endpoint=endpoint)
+    latency = REQUEST_SECONDS.labels(endpoint=endpoint)
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            in_flight.inc()
+            try:
+                with latency.time():
+                    return view(*args, **kwargs)
+            finally:
+                in_flight.dec()
+        return wrapper
+    return decorator
@@ -0,0 +1,338 @@
+"""
+Statistical CPU profiler for the live process.
+
+A sampler thread reads every thread's Python stack with
+sys._current_frames() every `interval` seconds, so the profiled code runs
+unmodified and the cost is one stack walk per thread per sample. Threads
+that are blocked waiting (idle workers, a webhook waiting on the inference
+scheduler) are counted separately rather than as CPU time.
+
+Each sample is attributed to a category by walking its stack from the
+innermost frame outwards: time inside torch/transformers, pydub and the
+ffmpeg subprocess, HTTP clients and the database is kept apart from our
+own Python time in clean_response and intent matching.
+
+Optionally, tracemalloc runs for the session and the report lists the
+allocation sites that grew the most between its start and end snapshots.
+"""
+from collections import Counter
+from functools import wraps
+import html
+import logging
+import re
+import sys
+import threading
+import time
+import tracemalloc
+import zlib
+
+logger = logging.getLogger(__name__)
+
+# (file, function) of the innermost frame of a thread that is blocked, not running
+IDLE_FRAMES = {
+    ('threading.py', 'wait'),
+    ('threading.py', '_wait_for_tstate_lock'),
+    ('queue.py', 'get'),
+    ('selectors.py', 'select'),
+    ('socketserver.py', 'serve_forever'),
+    ('socket.py', 'accept'),
+}
+
+# Checked from the innermost frame outwards; the first match names the sample.
+# Each rule is (category, path fragments, function names).
+CATEGORIES = (
+    ('torch', ('/torch/', '/transformers/', '/tokenizers/', '/onnxruntime/'), ()),
+    ('pydub_ffmpeg', ('/pydub/', '/subprocess.py'), ()),
+    ('http', ('/requests/', '/urllib3/', '/http/client.py', '/ssl.py', '/socket.py', '/urllib/', '/twilio/',
+              '/gtts/', '/speech_recognition/'), ()),
+    ('database', ('/sqlalchemy/', '/sqlite3/', '/flask_sqlalchemy/'), ()),
+    ('intent_matching', ('/intent_matcher.py', '/conversation_patterns.py', '/urgent_symptoms.py'), ()),
+    ('clean_response', (), ('clean_response',)),
+)
+
+MAX_SECONDS = 300
+_THREAD_NUMBER = re.compile(r'-?\d+')
+_short_paths = {}
+
+
+def _short_path(filename):
+    short = _short_paths.get(filename)
+    if short is None:
+        normalized = filename.replace('\\', '/')
+        for marker in ('/site-packages/', '/src/', '/lib/python'):
+            if marker in normalized:
+                normalized = normalized.rsplit(marker, 1)[1]
+                break
+        short = _short_paths[filename] = normalized
+    return short
+
+
+def frame_label(code):
+    return f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})"
+
+
+def categorize(stack):
+    """Category of one sample; `stack` is a tuple of code objects, outermost first."""
+    for code in reversed(stack):
+        filename = code.co_filename.replace('\\', '/')
+        for category, paths, functions in CATEGORIES:
+            if code.co_name in functions or any(path in filename for path in paths):
+                return category
+    return 'other_python'
+
+
+def _is_idle(code):
+    return (code.co_filename.replace('\\', '/').rsplit('/', 1)[-1], code.co_name) in IDLE_FRAMES
+
+
+class ProfileSession:
+    """
+    One profiling run. It stops after `seconds`, after `max_requests`
+    webhook requests (if given), or when stop() is called, whichever is first.
+    """
+
+    def __init__(self, seconds=30, max_requests=None, interval=0.01, memory=False, memory_frames=8):
+        if not 0 < seconds <= MAX_SECONDS:
+            raise ValueError(f"seconds must be between 0 and {MAX_SECONDS}")
+        if not 0.001 <= interval <= 1:
+            raise ValueError("interval must be between 1 ms and 1 s")
+        if max_requests is not None and max_requests < 1:
+            raise ValueError("requests must be at least 1")
+        self.seconds = seconds
+        self.max_requests = max_requests
+        self.interval = interval
+        self.memory = memory
+        self.memory_frames = memory_frames
+        self.requests = 0
+        self.samples = 0
+        self.idle_samples = 0
+        self.sampling_seconds = 0.0
+        self.started_at = None
+        self.finished_at = None
+        self.memory_top = None
+        self.memory_peak_bytes = None
+        self._stacks = Counter()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self.finished_at is None
+
+    def start(self):
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+
+    def note_request(self):
+        self.requests += 1
+        if self.max_requests is not None and self.requests >= self.max_requests:
+            self._stopped.set()
+
+    def _sample(self, own_ident):
+        names = {thread.ident: _THREAD_NUMBER.sub('', thread.name) for thread in threading.enumerate()}
+        frames = sys._current_frames()
+        stacks = []
+        idle = 0
+        for ident, frame in frames.items():
+            if ident == own_ident:
+                continue
+            if _is_idle(frame.f_code):
+                idle += 1
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(frame.f_code)
+                frame = frame.f_back
+            stack.reverse()
+            stacks.append((names.get(ident, 'unknown'), tuple(stack)))
+        del frames, frame
+        with self._lock:
+            self.samples += len(stacks)
+            self.idle_samples += idle
+            self._stacks.update(stacks)
+
+    def _run(self):
+        own_ident = threading.get_ident()
+        started_tracemalloc = False
+        baseline = None
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start(self.memory_frames)
+            started_tracemalloc = True
+        if self.memory:
+            baseline = tracemalloc.take_snapshot()
+        deadline = time.monotonic() + self.seconds
+        try:
+            while not self._stopped.is_set() and time.monotonic() < deadline:
+                start = time.perf_counter()
+                self._sample(own_ident)
+                self.sampling_seconds += time.perf_counter() - start
+                self._stopped.wait(self.interval)
+        except Exception as e:
+            logger.error("Profiler stopped: %s", e, exc_info=True)
+        finally:
+            if self.memory:
+                self._record_memory(baseline)
+            if started_tracemalloc:
+                tracemalloc.stop()
+            self.finished_at = time.time()
+            logger.info("Profile finished: %d samples, %d webhook requests", self.samples, self.requests)
+
+    def _record_memory(self, baseline, limit=25):
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ))
+        self.memory_peak_bytes = tracemalloc.get_traced_memory()[1]
+        self.memory_top = [
+            {
+                'location': f"{_short_path(stat.traceback[0].filename)}:{stat.traceback[0].lineno}",
+                'size_diff_bytes': stat.size_diff,
+                'size_bytes': stat.size,
+                'count_diff': stat.count_diff,
+            }
+            for stat in snapshot.compare_to(baseline, 'lineno')[:limit]
+        ]
+
+    def stacks(self):
+        with self._lock:
+            return Counter(self._stacks)
+
+    def collapsed(self):
+        """Stacks in the collapsed format read by flamegraph.pl and speedscope: 'thread;outer;...;inner count'."""
+        lines = []
+        for (thread, stack), count in sorted(self.stacks().items(), key=lambda item: -item[1]):
+            lines.append(';'.join([thread] + [frame_label(code).replace(';', ':') for code in stack]) + f" {count}")
+        return '\n'.join(lines) + '\n'
+
+    def report(self, top=20):
+        stacks = self.stacks()
+        categories = Counter()
+        self_time = Counter()
+        for (_, stack), count in stacks.items():
+            categories[categorize(stack)] += count
+            self_time[frame_label(stack[-1])] += count
+        total = sum(stacks.values()) or 1
+        end = self.finished_at or time.time()
+        elapsed = end - self.started_at if self.started_at else 0
+        return {
+            'running': self.running,
+            'started_at': self.started_at,
+            'elapsed_seconds': round(elapsed, 2),
+            'interval_ms': self.interval * 1000,
+            'webhook_requests': self.requests,
+            'samples': self.samples,
+            'idle_samples': self.idle_samples,
+            'overhead_percent': round(100 * self.sampling_seconds / elapsed, 2) if elapsed else None,
+            'categories': {
+                name: {'samples': count, 'percent': round(100 * count / total, 1)}
+                for name, count in categories.most_common()
+            },
+            'top_functions': [
+                {'function': name, 'samples': count, 'percent': round(100 * count / total, 1)}
+                for name, count in self_time.most_common(top)
+            ],
+            'memory': None if not self.memory else {
+                'peak_bytes': self.memory_peak_bytes,
+                'top_allocations': self.memory_top,
+            },
+        }
+
+    def flamegraph(self, title='NurseTalk CPU profile'):
+        return flamegraph_svg(
+            {tuple([thread] + [frame_label(code) for code in stack]): count
+             for (thread, stack), count in self.stacks().items()},
+            title
+        )
+
+
+def flamegraph_svg(stacks, title='', width=1200, frame_height=16):
+    """Renders {tuple of frame labels, outermost first: count} as a flame graph SVG."""
+    root = {'count': 0, 'children': {}}
+    for stack, count in stacks.items():
+        root['count'] += count
+        node = root
+        for label in stack:
+            node = node['children'].setdefault(label, {'count': 0, 'children': {}})
+            node['count'] += count
+
+    def depth(node):
+        return 1 + max((depth(child) for child in node['children'].values()), default=0)
+
+    levels = depth(root)
+    total = root['count'] or 1
+    height = (levels + 2) * frame_height
+    scale = width / total
+    rects = []
+
+    def draw(label, node, x, level):
+        w = node['count'] * scale
+        if w < 0.5:
+            return
+        y = height - (level + 1) * frame_height
+        # Warm colours, stable per function
+        hue = zlib.crc32(label.encode('utf-8')) % 60
+        text = html.escape(label[:max(0, int(w / 7))])
+        tooltip = html.escape(f"{label} ({node['count']} samples, {100 * node['count'] / total:.1f}%)")
+        rects.append(
+            f'<g><title>{tooltip}</title><rect x="{x:.1f}" y="{y}" width="{w:.1f}" height="{frame_height - 1}" '
+            f'fill="hsl({hue},80%,60%)"/><text x="{x + 3:.1f}" y="{y + frame_height - 4}">{text}</text></g>'
+        )
+        for child_label, child in sorted(node['children'].items()):
+            draw(child_label, child, x, level + 1)
+            x += child['count'] * scale
+
+    draw('all', root, 0, 0)
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'font-family="monospace" font-size="11">'
+        f'<text x="4" y="{frame_height - 2}" font-size="13">{html.escape(title)} ({total} samples)</text>'
+        + ''.join(rects) + '</svg>\n'
+    )
+
+
+class Profiler:
+    """Holds the current (or last) profiling session; one session runs at a time."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.session = None
+
+    def start(self, **options):
+        with self._lock:
+            if self.session is not None and self.session.running:
+                raise RuntimeError("A profile is already running")
+            self.session = ProfileSession(**options).start()
+            return self.session
+
+    def stop(self):
+        session = self.session
+        if session is not None:
+            session.stop()
+        return session
+
+    def note_request(self):
+        session = self.session
+        if session is not None and session.running:
+            session.note_request()
+
+    def counts_requests(self, view):
+        """Decorator for the view whose requests a profile's `max_requests` counts."""
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                return view(*args, **kwargs)
+            finally:
+                self.note_request()
+        return wrapper
+
+
+# Shared by the admin endpoints and the webhook view
+profiler = Profiler()
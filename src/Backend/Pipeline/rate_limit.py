@@ -0,0 +1,235 @@
+"""
+Per-number rate limiting and a cap on concurrent diagnoses.
+
+Every incoming message takes a token from its sender's bucket. A bucket
+holds up to `burst` tokens and refills at `per_minute`, so a number can send
+a short burst and then keeps a steady rate. A message that finds the bucket
+empty is answered with a canned notice (at most once per `notice_seconds`)
+instead of reaching transcription or the model.
+
+A bucket that has refilled completely carries no information, so it is
+forgotten: the in-memory backend drops it, the Redis backend lets its key
+expire. The in-memory backend also never holds more than `max_keys`
+buckets, dropping the least recently used first.
+"""
+from collections import OrderedDict
+from enum import Enum
+import logging
+import math
+import threading
+import time
+
+from decouple import config
+
+logger = logging.getLogger(__name__)
+
+
+class Decision(Enum):
+    ALLOW = 0
+    THROTTLE = 1           # Over the limit: send the throttle notice
+    THROTTLE_SILENT = 2    # Over the limit, and the notice went out recently
+
+
+class RateLimiter:
+    """Token bucket per key, refilled continuously at `per_minute` up to `burst`."""
+
+    def __init__(self, per_minute, burst, notice_seconds=60):
+        self.rate = per_minute / 60
+        self.burst = burst
+        self.notice_seconds = notice_seconds
+        self.decisions = {decision.name: 0 for decision in Decision}
+
+    @property
+    def enabled(self):
+        return self.rate > 0
+
+    @property
+    def idle_seconds(self):
+        """How long until an unused bucket is full again and its notice window has passed."""
+        return max(self.burst / self.rate, self.notice_seconds)
+
+    def check(self, key):
+        """Takes a token from the key's bucket and says what to do with the message."""
+        if not self.enabled:
+            return Decision.ALLOW
+        decision = self._check(key)
+        self.decisions[decision.name] += 1
+        return decision
+
+    def _check(self, key):
+        raise NotImplementedError
+
+    def stats(self):
+        return {
+            'allowed': self.decisions['ALLOW'],
+            'throttled': self.decisions['THROTTLE'] + self.decisions['THROTTLE_SILENT'],
+            'notices': self.decisions['THROTTLE'],
+        }
+
+
+class _Bucket:
+    __slots__ = ('tokens', 'updated', 'notified')
+
+    def __init__(self, tokens, updated):
+        self.tokens = tokens
+        self.updated = updated
+        self.notified = None
+
+
+class InMemoryRateLimiter(RateLimiter):
+    """
+    Buckets in an LRU-ordered dict. Each check first forgets buckets idle
+    long enough to be full again, so the dict only holds numbers active in
+    the last `idle_seconds`, and at most `max_keys` of them.
+    """
+
+    def __init__(self, per_minute, burst, notice_seconds=60, max_keys=100_000, clock=time.monotonic):
+        super().__init__(per_minute, burst, notice_seconds)
+        self.max_keys = max_keys
+        self.clock = clock
+        self.evicted = 0
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _check(self, key):
+        now = self.clock()
+        with self._lock:
+            # Oldest first: stop at the first bucket that is still in use
+            while self._buckets:
+                oldest = next(iter(self._buckets.values()))
+                if now - oldest.updated < self.idle_seconds:
+                    break
+                self._buckets.popitem(last=False)
+
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = _Bucket(self.burst, now)
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+                    self.evicted += 1
+            else:
+                self._buckets.move_to_end(key)
+                bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated) * self.rate)
+                bucket.updated = now
+
+            if bucket.tokens >= 1:
+                bucket.tokens -= 1
+                return Decision.ALLOW
+            if bucket.notified is None or now - bucket.notified >= self.notice_seconds:
+                bucket.notified = now
+                return Decision.THROTTLE
+            return Decision.THROTTLE_SILENT
+
+    def stats(self):
+        with self._lock:
+            return dict(super().stats(), backend='memory', tracked=len(self._buckets), evicted=self.evicted)
+
+
+# Refill, take a token and decide on the notice in one round trip, atomically,
+# so concurrent workers cannot both spend the last token.
+# Returns 0 (allow), 1 (throttle with notice) or 2 (throttle silently).
+_CHECK_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local notice_seconds = tonumber(ARGV[4])
+local ttl_ms = tonumber(ARGV[5])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated', 'notified')
+local tokens = tonumber(state[1]) or burst
+local updated = tonumber(state[2]) or now
+local notified = tonumber(state[3])
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local result = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+elseif notified == nil or now - notified >= notice_seconds then
+  notified = now
+  result = 1
+else
+  result = 2
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+if notified then
+  redis.call('HSET', KEYS[1], 'notified', tostring(notified))
+end
+redis.call('PEXPIRE', KEYS[1], ttl_ms)
+return result
+"""
+
+
+class RedisRateLimiter(RateLimiter):
+    """
+    Buckets shared by all workers, one hash per number with a TTL of
+    `idle_seconds`. If Redis is unreachable, messages are allowed.
+    """
+
+    def __init__(self, client, per_minute, burst, notice_seconds=60, prefix='nursetalk:ratelimit:'):
+        super().__init__(per_minute, burst, notice_seconds)
+        self.client = client
+        self.prefix = prefix
+        self.errors = 0
+        self._script = client.register_script(_CHECK_SCRIPT)
+
+    def _check(self, key):
+        try:
+            result = self._script(
+                keys=[self.prefix + key],
+                args=[self.rate, self.burst, time.time(), self.notice_seconds, math.ceil(self.idle_seconds * 1000)]
+            )
+        except Exception as e:
+            self.errors += 1
+            logger.warning("Rate limit check failed, allowing the message: %s", e)
+            return Decision.ALLOW
+        return Decision(int(result))
+
+    def stats(self):
+        return dict(super().stats(), backend='redis', errors=self.errors)
+
+
+class ConcurrencyLimiter:
+    """Caps work in flight in this process; acquire() never blocks. A limit of 0 means no cap."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.in_flight = 0
+        self.peak = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, force=False):
+        """Takes a slot and returns True, or returns False when all slots are taken (unless `force`)."""
+        with self._lock:
+            if self.limit and self.in_flight >= self.limit and not force:
+                self.rejected += 1
+                return False
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+            return True
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def stats(self):
+        with self._lock:
+            return {'limit': self.limit, 'in_flight': self.in_flight, 'peak': self.peak, 'rejected': self.rejected}
+
+
+def create_rate_limiter():
+    """Builds the limiter selected by RATE_LIMIT_BACKEND ('memory' or 'redis')."""
+    per_minute = config('RATE_LIMIT_PER_MINUTE', default=6, cast=float)
+    burst = config('RATE_LIMIT_BURST', default=10, cast=int)
+    notice_seconds = config('RATE_LIMIT_NOTICE_SECONDS', default=60, cast=int)
+    backend = str(config('RATE_LIMIT_BACKEND', default='memory')).lower()
+    if backend == 'redis':
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis requires the 'redis' package")
+        url = config('REDIS_URL', default='redis://localhost:6379/0')
+        logger.info("Rate limiting through Redis at %s", url)
+        return RedisRateLimiter(redis.Redis.from_url(url), per_minute, burst, notice_seconds)
+    if backend != 'memory':
+        raise ValueError(f"Unknown RATE_LIMIT_BACKEND '{backend}'")
+    return InMemoryRateLimiter(per_minute, burst, notice_seconds,
+                               max_keys=config('RATE_LIMIT_MAX_KEYS', default=100_000, cast=int))
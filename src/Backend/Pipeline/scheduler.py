@@ -0,0 +1,114 @@
+from collections import deque
+from concurrent.futures import Future
+import contextvars
+from enum import IntEnum
+import itertools
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    """Scheduling classes for inference jobs. Lower values run first."""
+    URGENT = 0
+    NORMAL = 1
+
+
+class LatencyStats:
+    """Counts and recent samples of queue wait and total latency for one class."""
+
+    def __init__(self, window=1024):
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.wait_samples = deque(maxlen=window)
+        self.total_samples = deque(maxlen=window)
+
+    def record(self, wait, total):
+        self.count += 1
+        self.total_seconds += total
+        self.max_seconds = max(self.max_seconds, total)
+        self.wait_samples.append(wait)
+        self.total_samples.append(total)
+
+    @staticmethod
+    def _percentile(samples, pct):
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'mean_seconds': self.total_seconds / self.count if self.count else None,
+            'max_seconds': self.max_seconds,
+            'wait_p50_seconds': self._percentile(self.wait_samples, 50),
+            'wait_p95_seconds': self._percentile(self.wait_samples, 95),
+            'total_p50_seconds': self._percentile(self.total_samples, 50),
+            'total_p95_seconds': self._percentile(self.total_samples, 95),
+        }
+
+
+class PriorityScheduler:
+    """
+    Runs inference jobs on a fixed pool of worker threads, always picking the
+    highest-priority job that is waiting. Jobs of the same priority run in
+    submission order, each in a copy of the context it was submitted from
+    (so the request's trace span stays the parent). A job whose future was
+    cancelled while it waited (its caller gave up) is skipped.
+    """
+
+    def __init__(self, name='inference', workers=1):
+        self.name = name
+        self._queue = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self.latency = {priority: LatencyStats() for priority in Priority}
+        self.cancelled = 0
+        self._threads = []
+        for i in range(workers):
+            thread = threading.Thread(target=self._run, name=f"{name}-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, priority, fn, *args, **kwargs):
+        """Queues fn(*args, **kwargs) at the given priority and returns a Future for its result."""
+        future = Future()
+        context = contextvars.copy_context()
+        self._queue.put((priority, next(self._sequence), time.monotonic(), future, context, fn, args, kwargs))
+        return future
+
+    def depth(self):
+        """Number of jobs waiting for a worker."""
+        return self._queue.qsize()
+
+    def _run(self):
+        while True:
+            priority, _, queued_at, future, context, fn, args, kwargs = self._queue.get()
+            if not future.set_running_or_notify_cancel():
+                with self._lock:
+                    self.cancelled += 1
+                continue
+            started_at = time.monotonic()
+            try:
+                future.set_result(context.run(fn, *args, **kwargs))
+            except Exception as e:
+                logger.error("%s job failed: %s", self.name, e, exc_info=True)
+                future.set_exception(e)
+            finally:
+                finished_at = time.monotonic()
+                with self._lock:
+                    self.latency[priority].record(started_at - queued_at, finished_at - queued_at)
+
+    def stats(self):
+        """Returns queue depth and per-class latency statistics."""
+        with self._lock:
+            return {
+                'depth': self.depth(),
+                'cancelled': self.cancelled,
+                'classes': {priority.name: stats.snapshot() for priority, stats in self.latency.items()},
+            }
@@ -0,0 +1,444 @@
+"""
+Request-scoped tracing.
+
+A span times one operation and records its parent, so a slow diagnosis can
+be broken down into webhook, generation, TTS (gTTS, ffmpeg re-encode) and
+Twilio calls, including retry waits. The current span lives in a
+contextvar; PriorityScheduler and BackgroundQueue run each job in the
+context it was submitted from, so work on worker threads joins the
+request's trace.
+
+The sampling decision is made once per trace, at its root span. With
+tracing off, span() returns a shared no-op object and traced() calls the
+function directly, so instrumented code pays one attribute check.
+
+Finished spans are queued and written by a background thread, either as
+JSON lines or as OTLP/JSON posted to a collector. `collect` below is a
+small stand-in collector and `show` prints the slowest traces as trees:
+
+    python -m Backend.Pipeline.tracing collect --port 4318 --output traces.jsonl
+    python -m Backend.Pipeline.tracing show traces.jsonl --top 5
+"""
+import argparse
+import atexit
+import contextvars
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import logging
+import queue
+import random
+import threading
+import time
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+
+class _NoopSpan:
+    """Returned when a span is not recorded. Also marks the context of an unsampled trace."""
+    __slots__ = ()
+    trace_id = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set_attribute(self, key, value):
+        pass
+
+    def add_event(self, name, **attributes):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class _UnsampledRoot:
+    """Root of a trace that lost the sampling draw: its children become no-ops too."""
+    __slots__ = ('_token',)
+
+    def __enter__(self):
+        self._token = _current_span.set(NOOP_SPAN)
+        return NOOP_SPAN
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_span.reset(self._token)
+        return False
+
+
+class Span:
+    __slots__ = ('tracer', 'name', 'trace_id', 'span_id', 'parent_id', 'attributes', 'events',
+                 'start_ns', 'end_ns', 'error', 'thread', '_token')
+
+    def __init__(self, tracer, name, parent, attributes):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = parent.trace_id if parent is not None else f"{random.getrandbits(128):032x}"
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent.span_id if parent is not None else None
+        self.attributes = attributes
+        self.events = []
+        self.error = None
+        self.end_ns = None
+
+    def __enter__(self):
+        self.thread = threading.current_thread().name
+        self._token = _current_span.set(self)
+        self.start_ns = time.time_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end_ns = time.time_ns()
+        if exc is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        _current_span.reset(self._token)
+        self.tracer._finish(self)
+        return False
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def add_event(self, name, **attributes):
+        self.events.append({'name': name, 'time_ns': time.time_ns(), 'attributes': attributes})
+
+    def to_dict(self):
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start_ns': self.start_ns,
+            'end_ns': self.end_ns,
+            'duration_ms': round((self.end_ns - self.start_ns) / 1e6, 3),
+            'thread': self.thread,
+            'attributes': self.attributes,
+            'events': self.events,
+            'error': self.error,
+        }
+
+
+class Tracer:
+    def __init__(self):
+        self.sample_rate = 0.0
+        self.exporter = None
+        self.enabled = False
+        self.started = 0
+        self.sampled = 0
+
+    def configure(self, sample_rate, exporter):
+        """Turns tracing on for `sample_rate` (0-1) of traces, exported through `exporter`."""
+        self.sample_rate = sample_rate
+        self.exporter = exporter
+        self.enabled = sample_rate > 0 and exporter is not None
+
+    def span(self, name, **attributes):
+        """Context manager for a span, a child of the current one if there is one."""
+        parent = _current_span.get()
+        if parent is None:
+            if not self.enabled:
+                return NOOP_SPAN
+            self.started += 1
+            if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+                return _UnsampledRoot()
+            self.sampled += 1
+        elif parent is NOOP_SPAN:
+            return NOOP_SPAN
+        return Span(self, name, parent, attributes)
+
+    def traced(self, name=None):
+        """Decorator that runs the function in a span named `name` (default: its qualified name)."""
+        def decorator(fn):
+            span_name = name or fn.__qualname__
+
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                with self.span(span_name):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    @staticmethod
+    def current_span():
+        return _current_span.get() or NOOP_SPAN
+
+    def _finish(self, span):
+        if self.exporter is not None:
+            self.exporter.submit(span)
+
+    def stats(self):
+        stats = {'sample_rate': self.sample_rate, 'traces_started': self.started, 'traces_sampled': self.sampled}
+        if self.exporter is not None:
+            stats.update(self.exporter.stats())
+        return stats
+
+
+# The process-wide tracer; off until configure() is called
+tracer = Tracer()
+
+
+def current_trace_id():
+    """Trace ID of the span active in this context, or None when the request is not traced."""
+    span = _current_span.get()
+    return span.trace_id if span is not None else None
+
+
+class SpanExporter:
+    """
+    Buffers finished spans and writes them in batches from a background
+    thread. When the buffer is full, spans are dropped rather than slowing
+    the request down.
+    """
+
+    def __init__(self, batch_size=256, flush_interval=2.0, max_pending=10000):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._stopped = threading.Event()
+        self.exported = 0
+        self.dropped = 0
+        self.failed = 0
+        self._thread = threading.Thread(target=self._run, name='span-exporter', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, span):
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        """Exports everything still buffered and stops the exporter thread."""
+        if not self._stopped.is_set():
+            self._stopped.set()
+            self._thread.join(timeout=10)
+
+    def export(self, spans):
+        raise NotImplementedError
+
+    def _run(self):
+        while True:
+            stopping = self._stopped.is_set()
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    if stopping or remaining <= 0:
+                        batch.append(self._queue.get_nowait())
+                    else:
+                        batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            if batch:
+                try:
+                    self.export(batch)
+                    self.exported += len(batch)
+                except Exception as e:
+                    self.failed += len(batch)
+                    logger.error("Failed to export %d spans: %s", len(batch), e)
+            elif stopping:
+                return
+
+    def stats(self):
+        return {
+            'spans_exported': self.exported,
+            'spans_dropped': self.dropped,
+            'spans_failed': self.failed,
+            'spans_pending': self._queue.qsize(),
+        }
+
+
+class JsonLinesExporter(SpanExporter):
+    """Appends one JSON object per span to a local file."""
+
+    def __init__(self, path, **kwargs):
+        self.path = path
+        super().__init__(**kwargs)
+
+    def export(self, spans):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(''.join(json.dumps(span.to_dict(), default=str) + '\n' for span in spans))
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+def _otlp_attributes(attributes):
+    return [{'key': key, 'value': _otlp_value(value)} for key, value in attributes.items()]
+
+
+def encode_otlp(spans, service_name):
+    """Encodes spans as an OTLP/JSON ExportTraceServiceRequest."""
+    encoded = []
+    for span in spans:
+        item = {
+            'traceId': span.trace_id,
+            'spanId': span.span_id,
+            'name': span.name,
+            'kind': 1,  # SPAN_KIND_INTERNAL
+            'startTimeUnixNano': str(span.start_ns),
+            'endTimeUnixNano': str(span.end_ns),
+            'attributes': _otlp_attributes(dict(span.attributes, **{'thread.name': span.thread})),
+            'events': [
+                {'name': event['name'], 'timeUnixNano': str(event['time_ns']),
+                 'attributes': _otlp_attributes(event['attributes'])}
+                for event in span.events
+            ],
+            # STATUS_CODE_ERROR = 2, STATUS_CODE_UNSET = 0
+            'status': {'code': 2, 'message': span.error} if span.error else {'code': 0},
+        }
+        if span.parent_id:
+            item['parentSpanId'] = span.parent_id
+        encoded.append(item)
+    return {
+        'resourceSpans': [{
+            'resource': {'attributes': _otlp_attributes({'service.name': service_name})},
+            'scopeSpans': [{'scope': {'name': __name__}, 'spans': encoded}],
+        }]
+    }
+
+
+class OTLPExporter(SpanExporter):
+    """Posts spans as OTLP/JSON to a collector's /v1/traces endpoint."""
+
+    def __init__(self, endpoint, service_name='nursetalk', timeout=5, **kwargs):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.timeout = timeout
+        self.session = requests.Session()
+        super().__init__(**kwargs)
+
+    def export(self, spans):
+        response = self.session.post(self.endpoint, json=encode_otlp(spans, self.service_name), timeout=self.timeout)
+        response.raise_for_status()
+
+
+def create_span_exporter(kind, path='traces.jsonl', endpoint='http://localhost:4318/v1/traces'):
+    """Builds the exporter selected by TRACE_EXPORTER ('jsonl' or 'otlp')."""
+    if kind == 'jsonl':
+        return JsonLinesExporter(path)
+    if kind == 'otlp':
+        return OTLPExporter(endpoint)
+    raise ValueError(f"Unknown TRACE_EXPORTER '{kind}'")
+
+
+def _decode_otlp(payload):
+    """Turns an OTLP/JSON request back into the JSON-lines span format."""
+    for resource_spans in payload.get('resourceSpans', []):
+        for scope_spans in resource_spans.get('scopeSpans', []):
+            for span in scope_spans.get('spans', []):
+                attributes = {item['key']: next(iter(item['value'].values())) for item in span.get('attributes', [])}
+                start, end = int(span['startTimeUnixNano']), int(span['endTimeUnixNano'])
+                status = span.get('status', {})
+                yield {
+                    'trace_id': span['traceId'],
+                    'span_id': span['spanId'],
+                    'parent_id': span.get('parentSpanId'),
+                    'name': span['name'],
+                    'start_ns': start,
+                    'end_ns': end,
+                    'duration_ms': round((end - start) / 1e6, 3),
+                    'thread': attributes.pop('thread.name', None),
+                    'attributes': attributes,
+                    'events': span.get('events', []),
+                    'error': status.get('message') if status.get('code') == 2 else None,
+                }
+
+
+def collect(port, output):
+    """A stand-in OTLP/HTTP collector that appends received spans to a JSON-lines file."""
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if self.path != '/v1/traces':
+                self.send_error(404)
+                return
+            payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            lines = ''.join(json.dumps(span) + '\n' for span in _decode_otlp(payload))
+            with lock, open(output, 'a', encoding='utf-8') as f:
+                f.write(lines)
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.end_headers()
+            self.wfile.write(b'{}')
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('', port), Handler)
+    print(f"Collecting OTLP/JSON spans on :{port}/v1/traces into {output}")
+    server.serve_forever()
+
+
+def show(path, top=5, trace_id=None):
+    """Prints the slowest traces in a JSON-lines file as indented span trees."""
+    traces = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            span = json.loads(line)
+            traces.setdefault(span['trace_id'], []).append(span)
+
+    def extent(spans):
+        return (max(s['end_ns'] for s in spans) - min(s['start_ns'] for s in spans)) / 1e6
+
+    selected = [trace_id] if trace_id else sorted(traces, key=lambda t: extent(traces[t]), reverse=True)[:top]
+    for tid in selected:
+        spans = traces[tid]
+        children = {}
+        for span in spans:
+            children.setdefault(span['parent_id'], []).append(span)
+        known = {span['span_id'] for span in spans}
+        roots = [span for span in spans if span['parent_id'] not in known]
+        origin = min(span['start_ns'] for span in spans)
+        print(f"trace {tid}  {extent(spans):.1f} ms")
+
+        def walk(span, depth):
+            offset = (span['start_ns'] - origin) / 1e6
+            error = f"  ERROR {span['error']}" if span['error'] else ''
+            print(f"  {'  ' * depth}{span['name']:<{40 - 2 * depth}} +{offset:>9.1f} ms {span['duration_ms']:>10.1f} ms"
+                  f"  [{span['thread']}]{error}")
+            for child in sorted(children.get(span['span_id'], []), key=lambda s: s['start_ns']):
+                walk(child, depth + 1)
+
+        for root in sorted(roots, key=lambda s: s['start_ns']):
+            walk(root, 0)
+        print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Trace collector stand-in and viewer")
+    commands = parser.add_subparsers(dest='command', required=True)
+    collect_parser = commands.add_parser('collect', help="Receive OTLP/JSON spans over HTTP")
+    collect_parser.add_argument('--port', type=int, default=4318)
+    collect_parser.add_argument('--output', default='traces.jsonl')
+    show_parser = commands.add_parser('show', help="Print the slowest traces from a JSON-lines file")
+    show_parser.add_argument('path')
+    show_parser.add_argument('--top', type=int, default=5)
+    show_parser.add_argument('--trace', help="Print only this trace id")
+    args = parser.parse_args()
+
+    if args.command == 'collect':
+        collect(args.port, args.output)
+    else:
+        show(args.path, args.top, args.trace)
+
+
+if __name__ == '__main__':
+    main()
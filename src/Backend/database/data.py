@@ -1,33 +1,51 @@
-from flask import Flask
 from flask_sqlalchemy import SQLAlchemy as sql
+from sqlalchemy import and_, event, or_, text
+from sqlalchemy.schema import CreateIndex, CreateTable
 
 from datetime import datetime
+import base64
 import logging
 
 
-app = Flask(__name__)
-
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///interactions.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-
-db = sql(app)
+# One SQLAlchemy instance for the whole application; the engine is created by
+# init_database() from the Flask app's configuration.
+db = sql()
 logger = logging.getLogger(__name__)
 
+# Connection settings applied to every SQLite connection. WAL lets readers run
+# alongside the writer, and synchronous=NORMAL is durable across application
+# crashes in WAL mode while skipping an fsync per commit.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'foreign_keys': 'ON',
+    'cache_size': -16000,  # 16 MB page cache per connection
+}
+
 
 class Conversation(db.Model):
     __tablename__ = 'conversation'
 
     id = db.Column(db.Integer, primary_key=True)
-    phone_number = db.Column(db.String(20), nullable=False, index=True)
+    phone_number = db.Column(db.String(20), nullable=False)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     user_input = db.Column(db.Text, nullable=False)
     bot_response = db.Column(db.Text, nullable=False)
     response_time = db.Column(db.Float, nullable=True)  # Response generation time in seconds
     status = db.Column(db.String(20), default='sent', nullable=False)
 
+    # History is always read newest-first for one phone number. Ids are never
+    # reused on SQLite, even after archiving deletes the newest rows: the
+    # rollups and retention track progress by id.
+    __table_args__ = (
+        db.Index('ix_conversation_phone_timestamp', phone_number, timestamp.desc()),
+        {'sqlite_autoincrement': True},
+    )
+
     def __repr__(self):
         return f'<Conversation {self.id}: {self.phone_number}>'
-    
+
 
     def to_dict(self):
         return {
@@ -39,18 +57,89 @@ class Conversation(db.Model):
             'response_time': self.response_time,
             'status': self.status
         }
-    
+
+
+def _apply_sqlite_pragmas(pragmas):
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+    return on_connect
+
+
+def _migrate_to_autoincrement(engine):
+    """
+    Rebuilds a conversation table created without AUTOINCREMENT, keeping every
+    row and id, and starts new ids past both the highest live id and the
+    rollup watermark (archived rows are at or below it). One script, so a
+    failure leaves the old table in place.
+    """
+    with engine.connect() as connection:
+        schema = connection.execute(
+            text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'conversation'")
+        ).scalar()
+        has_watermark = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'rollup_watermark'")
+        ).first() is not None
+    if schema is None or 'AUTOINCREMENT' in schema.upper():
+        return
+
+    table = Conversation.__table__
+    columns = ', '.join(column.name for column in table.columns)
+    watermark = ("(SELECT last_id FROM rollup_watermark WHERE name = 'conversation')" if has_watermark else 'NULL')
+    script = ['BEGIN', 'ALTER TABLE conversation RENAME TO conversation_before_autoincrement']
+    script += [f'DROP INDEX IF EXISTS {index.name}' for index in table.indexes]
+    script.append(str(CreateTable(table).compile(engine)))
+    script += [str(CreateIndex(index).compile(engine)) for index in table.indexes]
+    script += [
+        f'INSERT INTO conversation ({columns}) SELECT {columns} FROM conversation_before_autoincrement',
+        "DELETE FROM sqlite_sequence WHERE name = 'conversation'",
+        f"INSERT INTO sqlite_sequence (name, seq) VALUES ('conversation', "
+        f"MAX(COALESCE((SELECT MAX(id) FROM conversation), 0), COALESCE({watermark}, 0)))",
+        # Takes the search triggers with it; create_search_index() puts them back on the new table
+        'DROP TABLE conversation_before_autoincrement',
+        'COMMIT',
+    ]
+    raw = engine.raw_connection()
+    try:
+        raw.cursor().executescript(';\n'.join(script) + ';')
+    finally:
+        raw.close()
+    logger.info("Rebuilt the conversation table with AUTOINCREMENT ids")
+
 
 def init_database(app):
     """Initialize database with Flask app"""
+    app.config.setdefault('SQLALCHEMY_DATABASE_URI', 'sqlite:///nurse_talk.db')
+    is_sqlite = app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite')
+    if is_sqlite:
+        pragmas = app.config.setdefault('SQLITE_PRAGMAS', SQLITE_PRAGMAS)
+        busy_timeout = pragmas.get('busy_timeout', 5000) / 1000
+        app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {
+            'pool_size': app.config.get('DB_POOL_SIZE', 5),
+            'max_overflow': app.config.get('DB_MAX_OVERFLOW', 10),
+            'pool_timeout': 30,
+            'connect_args': {'timeout': busy_timeout},
+        })
     db.init_app(app)
-    
+
     with app.app_context():
         try:
+            if is_sqlite:
+                event.listen(db.engine, 'connect', _apply_sqlite_pragmas(app.config['SQLITE_PRAGMAS']))
             db.create_all()
+            if is_sqlite:
+                _migrate_to_autoincrement(db.engine)
+            # create_all skips tables that already exist, so add new indexes explicitly
+            for index in Conversation.__table__.indexes:
+                index.create(db.engine, checkfirst=True)
+            if is_sqlite and app.config.setdefault('SEARCH_INDEX', True):
+                from .search import create_search_index
+                create_search_index(db.engine)
             logger.info("Database tables created successfully")
         except Exception as e:
-            logger.error(f"Failed to create database tables: {str(e)}")
+            logger.error("Failed to create database tables: %s", e)
             raise
 
 
@@ -64,26 +153,59 @@ def save_conversation(phone_number, user_input, bot_response, response_time=None
             response_time=response_time,
             status=status
         )
-        
+
         db.session.add(conversation)
         db.session.commit()
-        logger.info(f"Conversation saved for {phone_number}")
+        logger.info("Conversation saved for %s", phone_number)
         return conversation
-        
+
     except Exception as e:
-        logger.error(f"Database error: {str(e)}")
+        logger.error("Database error: %s", e)
         db.session.rollback()
         raise
 
 
-def get_conversation_history(phone_number, limit=10):
-    """Get recent conversation history for context"""
+def encode_cursor(conversation):
+    """Opaque keyset cursor pointing just past a conversation row."""
+    raw = f"{conversation['timestamp']}|{conversation['id']}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """Returns the (timestamp, id) position encoded by encode_cursor()."""
     try:
-        conversations = Conversation.query.filter_by(
-            phone_number=phone_number
-        ).order_by(Conversation.timestamp.desc()).limit(limit).all()
-        
-        return [conv.to_dict() for conv in conversations]
+        timestamp, row_id = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split('|')
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def get_conversation_history(phone_number, limit=10, before=None, include_archived=False):
+    """
+    Get recent conversation history for context, newest first.
+    Pass `before` as a (timestamp, id) position to continue after a previous page.
+    With include_archived, pages that run past the live table continue into
+    the retention archive.
+    """
+    try:
+        query = Conversation.query.filter(Conversation.phone_number == phone_number)
+        if before is not None:
+            timestamp, row_id = before
+            query = query.filter(or_(
+                Conversation.timestamp < timestamp,
+                and_(Conversation.timestamp == timestamp, Conversation.id < row_id)
+            ))
+        conversations = query.order_by(
+            Conversation.timestamp.desc(), Conversation.id.desc()
+        ).limit(limit).all()
+        history = [conv.to_dict() for conv in conversations]
+
+        if include_archived and len(history) < limit:
+            from .retention import read_archived_history
+            with db.engine.connect() as connection:
+                archived = read_archived_history(connection, phone_number, limit, before)
+            history = sorted(history + archived, key=lambda c: (c['timestamp'], c['id']), reverse=True)[:limit]
+        return history
     except Exception as e:
-        logger.error(f"Error fetching conversation history: {str(e)}")
+        logger.error("Error fetching conversation history: %s", e)
         return []
@@ -0,0 +1,115 @@
+"""
+Streaming export of the conversation table as NDJSON or CSV, optionally
+gzip-compressed. Rows are read through a server-side cursor in batches and
+encoded batch by batch, so memory use does not depend on the table size.
+
+    python -m Backend.database.export --format csv --gzip --start 2025-01-01 -o conversations.csv.gz
+"""
+import argparse
+import csv
+from datetime import datetime
+import io
+import json
+import sys
+import zlib
+
+from sqlalchemy import create_engine, select
+
+from .data import Conversation
+
+EXPORT_COLUMNS = ('id', 'phone_number', 'timestamp', 'user_input', 'bot_response', 'response_time', 'status')
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+def iter_batches(connection, phone_number=None, start=None, end=None, batch_size=2000):
+    """Yields lists of row tuples in id order, filtered by phone number and timestamp range."""
+    table = Conversation.__table__
+    query = select(*(table.c[name] for name in EXPORT_COLUMNS)).order_by(table.c.id)
+    if phone_number:
+        query = query.where(table.c.phone_number == phone_number)
+    if start:
+        query = query.where(table.c.timestamp >= start)
+    if end:
+        query = query.where(table.c.timestamp < end)
+    result = connection.execution_options(stream_results=True, yield_per=batch_size).execute(query)
+    for partition in result.partitions():
+        yield partition
+
+
+def _encode_ndjson(batches):
+    dumps = json.dumps
+    for rows in batches:
+        yield ''.join(
+            dumps(dict(zip(EXPORT_COLUMNS, (r[0], r[1], r[2].isoformat(), r[3], r[4], r[5], r[6])))) + '\n'
+            for r in rows
+        ).encode('utf-8')
+
+
+def _encode_csv(batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for rows in batches:
+        writer.writerows((r[0], r[1], r[2].isoformat(), r[3], r[4], r[5], r[6]) for r in rows)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def gzip_chunks(chunks, level=6):
+    """Compresses a stream of byte chunks into a single gzip member."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_conversations(connection, fmt='ndjson', compress=False, **filters):
+    """Yields the encoded export as byte chunks."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format '{fmt}'. Choose one of: {', '.join(FORMATS)}")
+    encode = _encode_ndjson if fmt == 'ndjson' else _encode_csv
+    chunks = encode(iter_batches(connection, **filters))
+    return gzip_chunks(chunks) if compress else chunks
+
+
+def parse_date(value):
+    """Parses an ISO date or datetime query value, or returns None when empty."""
+    return datetime.fromisoformat(value) if value else None
+
+
+def main(argv=None):
+    from decouple import config
+
+    parser = argparse.ArgumentParser(description="Export conversation history as NDJSON or CSV.")
+    parser.add_argument('--database-url', default=config('DATABASE_URL', default='sqlite:///nurse_talk.db'))
+    parser.add_argument('--format', choices=sorted(FORMATS), default='ndjson')
+    parser.add_argument('--phone-number')
+    parser.add_argument('--start', type=parse_date, help="Inclusive ISO date or datetime")
+    parser.add_argument('--end', type=parse_date, help="Exclusive ISO date or datetime")
+    parser.add_argument('--gzip', action='store_true')
+    parser.add_argument('-o', '--output', help="Output file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    engine = create_engine(args.database_url)
+    out = open(args.output, 'wb') if args.output else sys.stdout.buffer
+    try:
+        with engine.connect() as connection:
+            for chunk in export_conversations(connection, args.format, args.gzip, phone_number=args.phone_number,
+                                              start=args.start, end=args.end):
+                out.write(chunk)
+    finally:
+        if args.output:
+            out.close()
+        engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+Leases in the database, for background jobs that must run in one process at
+a time across gunicorn workers and servers sharing the database.
+
+A lease is a row per job name with its holder and an expiry. Taking it is
+a conditional update (free, expired, or already ours) or, the first time,
+an insert; the database serializes both, so only one process gets it. A
+holder that dies simply lets the lease expire.
+"""
+from datetime import datetime, timedelta
+import os
+import socket
+
+from sqlalchemy.exc import IntegrityError
+
+from .data import db
+
+
+class JobLease(db.Model):
+    __tablename__ = 'job_lease'
+
+    name = db.Column(db.String(40), primary_key=True)
+    holder = db.Column(db.String(100), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+
+def create_lease_table(engine):
+    db.metadata.create_all(engine, tables=[JobLease.__table__])
+
+
+def _holder():
+    # Computed per call: a forked worker must not share its parent's identity
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def acquire_lease(engine, name, ttl_seconds):
+    """Takes or renews the lease `name` for `ttl_seconds`. Returns False if another process holds it."""
+    table = JobLease.__table__
+    holder = _holder()
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=ttl_seconds)
+    with engine.begin() as connection:
+        taken = connection.execute(
+            table.update()
+            .where((table.c.name == name) & ((table.c.expires_at < now) | (table.c.holder == holder)))
+            .values(holder=holder, expires_at=expires_at)
+        )
+        if taken.rowcount == 1:
+            return True
+    try:
+        with engine.begin() as connection:
+            connection.execute(table.insert().values(name=name, holder=holder, expires_at=expires_at))
+        return True
+    except IntegrityError:
+        return False  # held by another process
+
+
+def release_lease(engine, name):
+    """Gives up the lease `name` if this process holds it."""
+    table = JobLease.__table__
+    with engine.begin() as connection:
+        connection.execute(table.delete().where((table.c.name == name) & (table.c.holder == _holder())))
@@ -0,0 +1,362 @@
+"""
+Hot/cold tiering for the conversation table.
+
+Rows older than the retention age are appended to compressed, date
+partitioned JSONL files (ARCHIVE_DIR/YYYY/MM/conversations-YYYY-MM-DD.jsonl.zst,
+or .jsonl.gz when the zstandard package is not installed) and then deleted
+from the live table in batches. conversation_archive_index records which
+day files hold rows for each phone number, so archived history can still be
+read back on demand.
+
+Only rows already folded into the rollups are archived, so /stats keeps
+covering them. A run holds the 'retention' lease in the database, so with
+several workers or servers only one of them archives at a time. Each batch
+is written to its files and fsynced before its rows are deleted; if the
+process dies in between, the next run appends the same rows again and
+readers drop the duplicates by id.
+
+    python -m Backend.database.retention --max-age-days 90 --report
+"""
+import argparse
+import atexit
+from datetime import datetime, timedelta
+import gzip
+import io
+import json
+import logging
+import os
+import statistics
+import threading
+import time
+
+from sqlalchemy import bindparam, create_engine, func, select, text
+
+from .data import db, Conversation
+from .locks import acquire_lease, release_lease
+from .rollups import RollupGap, RollupWatermark, WATERMARK_NAME, apply_rollups, create_rollup_tables
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+SUFFIXES = {'zstd': '.jsonl.zst', 'gzip': '.jsonl.gz'}
+LEASE_NAME = 'retention'
+ARCHIVE_COLUMNS = ('id', 'phone_number', 'timestamp', 'user_input', 'bot_response', 'response_time', 'status')
+
+
+class ArchivePartition(db.Model):
+    __tablename__ = 'conversation_archive_partition'
+
+    day = db.Column(db.Date, primary_key=True)
+    path = db.Column(db.String(500), primary_key=True)
+    row_count = db.Column(db.Integer, nullable=False, default=0)
+    bytes = db.Column(db.Integer, nullable=False, default=0)
+
+
+class ConversationArchive(db.Model):
+    """Which archived days hold rows for a phone number."""
+    __tablename__ = 'conversation_archive_index'
+    __table_args__ = {'sqlite_with_rowid': False}
+
+    phone_number = db.Column(db.String(20), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+
+
+def create_retention_tables(engine):
+    create_rollup_tables(engine)
+    db.metadata.create_all(engine, tables=[ArchivePartition.__table__, ConversationArchive.__table__])
+
+
+def default_codec():
+    return 'zstd' if zstandard is not None else 'gzip'
+
+
+def partition_path(directory, day, codec):
+    return os.path.join(os.path.abspath(directory), f"{day:%Y}", f"{day:%m}",
+                        f"conversations-{day:%Y-%m-%d}{SUFFIXES[codec]}")
+
+
+def _compress(data, codec):
+    if codec == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("The zstd archive codec requires the 'zstandard' package")
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return gzip.compress(data, compresslevel=6)
+
+
+def _append(path, data):
+    """Appends one compressed member/frame; both formats read concatenated members as one stream."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'ab') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def iter_archive(path):
+    """Yields the archived rows of one partition file as dicts."""
+    if path.endswith(SUFFIXES['zstd']):
+        if zstandard is None:
+            raise RuntimeError(f"Reading {path} requires the 'zstandard' package")
+        raw = open(path, 'rb')
+        stream = io.TextIOWrapper(
+            zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True, closefd=True),
+            encoding='utf-8'
+        )
+    else:
+        stream = gzip.open(path, 'rt', encoding='utf-8')
+    with stream:
+        for line in stream:
+            yield json.loads(line)
+
+
+def _record_partition(connection, day, path, rows, size):
+    table = ArchivePartition.__table__
+    key = (table.c.day == day) & (table.c.path == path)
+    updated = connection.execute(
+        table.update().where(key).values(row_count=table.c.row_count + rows, bytes=table.c.bytes + size)
+    )
+    if updated.rowcount == 0:
+        connection.execute(table.insert().values(day=day, path=path, row_count=rows, bytes=size))
+
+
+def _index_phones(connection, day, phones):
+    table = ConversationArchive.__table__
+    phones = list(phones)
+    known = set()
+    for i in range(0, len(phones), 500):
+        known.update(connection.execute(
+            select(table.c.phone_number).where((table.c.day == day) & table.c.phone_number.in_(phones[i:i + 500]))
+        ).scalars())
+    new = [{'phone_number': phone, 'day': day} for phone in phones if phone not in known]
+    if new:
+        connection.execute(table.insert(), new)
+
+
+def archive_conversations(engine, directory, older_than, batch_size=5000, codec=None, lease_seconds=600):
+    """
+    Moves conversation rows with a timestamp before `older_than` into the
+    archive, one batch per transaction. Returns (rows archived, bytes written),
+    or (0, 0) when another process holds the retention lease.
+    """
+    create_retention_tables(engine)
+    if not acquire_lease(engine, LEASE_NAME, lease_seconds):
+        logger.info("Another process is archiving; skipping this run")
+        return 0, 0
+    try:
+        return _archive_batches(engine, directory, older_than, batch_size, codec or default_codec(), lease_seconds)
+    finally:
+        release_lease(engine, LEASE_NAME)
+
+
+def _archive_batches(engine, directory, older_than, batch_size, codec, lease_seconds):
+    conversations = Conversation.__table__
+    apply_rollups(engine)
+    with engine.connect() as connection:
+        rolled_up_to = connection.execute(
+            select(RollupWatermark.last_id).where(RollupWatermark.name == WATERMARK_NAME)
+        ).scalar() or 0
+
+    archived = written = 0
+    last_id = 0
+    while True:
+        # Renewed before each batch; files are only appended while it is held
+        if archived and not acquire_lease(engine, LEASE_NAME, lease_seconds):
+            raise RuntimeError("Retention lease lost to another process")
+        with engine.connect() as connection:
+            rows = connection.execute(
+                select(*(conversations.c[name] for name in ARCHIVE_COLUMNS))
+                .where((conversations.c.timestamp < older_than) & (conversations.c.id > last_id)
+                       & (conversations.c.id <= rolled_up_to)
+                       & conversations.c.id.not_in(select(RollupGap.id)))
+                .order_by(conversations.c.id)
+                .limit(batch_size)
+            ).all()
+        if not rows:
+            break
+
+        days = {}
+        for row in rows:
+            days.setdefault(row.timestamp.date(), []).append(row)
+        sizes = {}
+        for day, day_rows in days.items():
+            data = ''.join(
+                json.dumps(dict(zip(ARCHIVE_COLUMNS, (r[0], r[1], r[2].isoformat(), r[3], r[4], r[5], r[6])))) + '\n'
+                for r in day_rows
+            ).encode('utf-8')
+            compressed = _compress(data, codec)
+            _append(partition_path(directory, day, codec), compressed)
+            sizes[day] = len(compressed)
+            written += len(compressed)
+
+        ids = [row.id for row in rows]
+        with engine.begin() as connection:
+            for day, day_rows in days.items():
+                _record_partition(connection, day, partition_path(directory, day, codec), len(day_rows), sizes[day])
+                _index_phones(connection, day, {row.phone_number for row in day_rows})
+            for i in range(0, len(ids), 500):
+                connection.execute(conversations.delete().where(conversations.c.id.in_(ids[i:i + 500])))
+
+        archived += len(rows)
+        last_id = ids[-1]
+        logger.info("Archived %d conversation rows up to id %d", len(rows), last_id)
+    return archived, written
+
+
+def read_archived_history(connection, phone_number, limit=10, before=None):
+    """
+    Archived conversations for a phone number, newest first, in the same
+    shape as Conversation.to_dict(). `before` is a (timestamp, id) position.
+    """
+    index = ConversationArchive.__table__
+    partitions = ArchivePartition.__table__
+    query = (select(index.c.day, partitions.c.path)
+             .join(partitions, partitions.c.day == index.c.day)
+             .where(index.c.phone_number == phone_number))
+    if before is not None:
+        query = query.where(index.c.day <= before[0].date())
+    partitions = connection.execute(query.order_by(index.c.day.desc())).all()
+
+    found = {}
+    current_day = None
+    for day, path in partitions:
+        # Day files are visited newest first, so once a full page has been
+        # found, older days cannot contribute to it
+        if len(found) >= limit and day != current_day:
+            break
+        current_day = day
+        if not os.path.exists(path):
+            logger.error("Archive partition %s is missing", path)
+            continue
+        for row in iter_archive(path):
+            if row['phone_number'] != phone_number:
+                continue
+            if before is not None and (datetime.fromisoformat(row['timestamp']), row['id']) >= before:
+                continue
+            found[row['id']] = row
+    rows = sorted(found.values(), key=lambda r: (r['timestamp'], r['id']), reverse=True)
+    return rows[:limit]
+
+
+class RetentionJob:
+    """Archives rows older than `max_age_days` every `interval` seconds from a background thread."""
+
+    def __init__(self, app, directory, max_age_days, interval=86400, batch_size=5000):
+        self.app = app
+        self.directory = directory
+        self.max_age_days = max_age_days
+        self.interval = interval
+        self.batch_size = batch_size
+        self.runs = 0
+        self.failed = 0
+        self.archived = 0
+        self.bytes_written = 0
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='retention', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def run_once(self):
+        older_than = datetime.utcnow() - timedelta(days=self.max_age_days)
+        try:
+            with self.app.app_context():
+                rows, written = archive_conversations(db.engine, self.directory, older_than, self.batch_size)
+            self.archived += rows
+            self.bytes_written += written
+            self.runs += 1
+        except Exception as e:
+            self.failed += 1
+            logger.error("Retention run failed: %s", e)
+
+    def close(self):
+        self._stopped.set()
+        self._thread.join(timeout=10)
+
+    def _run(self):
+        # First pass shortly after startup, then once per interval
+        if not self._stopped.wait(60):
+            self.run_once()
+        while not self._stopped.wait(self.interval):
+            self.run_once()
+
+    def stats(self):
+        return {
+            'runs': self.runs,
+            'failed': self.failed,
+            'archived': self.archived,
+            'bytes_written': self.bytes_written,
+        }
+
+
+def measure(engine, phone_numbers, repeat=20):
+    """Live row count, SQLite file size and history query latency, for before/after reports."""
+    conversations = Conversation.__table__
+    report = {}
+    with engine.connect() as connection:
+        report['rows'] = connection.execute(select(func.count()).select_from(conversations)).scalar()
+        if engine.dialect.name == 'sqlite':
+            page_size = connection.execute(text("PRAGMA page_size")).scalar()
+            pages = connection.execute(text("PRAGMA page_count")).scalar()
+            free = connection.execute(text("PRAGMA freelist_count")).scalar()
+            report['file_mb'] = round(pages * page_size / 2**20, 1)
+            report['used_mb'] = round((pages - free) * page_size / 2**20, 1)
+
+        history = (select(conversations)
+                   .where(conversations.c.phone_number == bindparam('phone'))
+                   .order_by(conversations.c.timestamp.desc(), conversations.c.id.desc())
+                   .limit(10))
+        samples = []
+        for _ in range(repeat):
+            for phone in phone_numbers:
+                start = time.perf_counter()
+                connection.execute(history, {'phone': phone}).all()
+                samples.append(time.perf_counter() - start)
+    if samples:
+        report['history_ms_p50'] = round(statistics.median(samples) * 1000, 3)
+        report['history_ms_p95'] = round(statistics.quantiles(samples, n=20)[-1] * 1000, 3)
+    return report
+
+
+def main(argv=None):
+    from decouple import config
+
+    parser = argparse.ArgumentParser(description="Archive old conversation rows to compressed day files.")
+    parser.add_argument('--database-url', default=config('DATABASE_URL', default='sqlite:///nurse_talk.db'))
+    parser.add_argument('--archive-dir', default=config('ARCHIVE_DIR', default='archive'))
+    parser.add_argument('--max-age-days', type=int, default=config('RETENTION_DAYS', default=90, cast=int))
+    parser.add_argument('--codec', choices=sorted(SUFFIXES), default=None)
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--vacuum', action='store_true', help="Reclaim the freed pages afterwards (SQLite)")
+    parser.add_argument('--report', action='store_true', help="Print table size and query latency before and after")
+    args = parser.parse_args(argv)
+
+    engine = create_engine(args.database_url)
+    try:
+        phones = []
+        if args.report:
+            with engine.connect() as connection:
+                phones = connection.execute(
+                    select(Conversation.phone_number).distinct().limit(20)
+                ).scalars().all()
+            print(f"before: {measure(engine, phones)}")
+
+        older_than = datetime.utcnow() - timedelta(days=args.max_age_days)
+        start = time.perf_counter()
+        rows, written = archive_conversations(engine, args.archive_dir, older_than, args.batch_size, args.codec)
+        print(f"archived {rows} rows older than {older_than:%Y-%m-%d} "
+              f"into {written / 2**20:.1f} MB in {time.perf_counter() - start:.1f}s")
+
+        if args.vacuum and engine.dialect.name == 'sqlite':
+            with engine.connect() as connection:
+                connection.execute(text("VACUUM"))
+        if args.report:
+            print(f"after:  {measure(engine, phones)}")
+    finally:
+        engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
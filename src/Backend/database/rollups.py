@@ -0,0 +1,415 @@
+"""
+Incremental per-hour and per-day rollups of the conversation log.
+
+Each run reads only the conversation rows past the stored watermark (the
+highest id already aggregated) and folds them into one rollup row per
+(period, bucket, status).
+
+With several writers (Postgres), a row can commit after a row with a higher
+id has already been rolled up. Ids the watermark skipped over are kept in
+rollup_gap and checked again on every run, until their row shows up or
+GAP_SECONDS have passed (an id used by a rolled-back insert never will).
+On SQLite, ids come from AUTOINCREMENT with one writer at a time, so gaps
+do not occur. A rollup row keeps the message count and a
+log-spaced histogram of response times, so latency quantiles and error
+rates for any range come from a few dozen small rows instead of a scan of
+the conversation table.
+
+    python -m Backend.database.rollups            # catch up once
+    python -m Backend.database.rollups --period day --start 2025-01-01
+"""
+import argparse
+import atexit
+from bisect import bisect_left
+from datetime import datetime, timedelta
+import json
+import logging
+import threading
+import time
+
+from sqlalchemy import bindparam, create_engine, select
+from sqlalchemy.exc import IntegrityError
+
+from .data import db, Conversation
+from .locks import acquire_lease, create_lease_table, release_lease
+
+logger = logging.getLogger(__name__)
+
+PERIODS = ('hour', 'day')
+WATERMARK_NAME = 'conversation'
+LEASE_NAME = 'rollups'
+# How long a skipped id may still commit, and the widest jump recorded as gaps
+GAP_SECONDS = 3600
+MAX_GAP_IDS = 1000
+# Canned replies to throttled or turned-away users are deliberate, not failures
+SUCCESS_STATUSES = ('sent', 'throttled', 'busy')
+
+# Upper bounds, in seconds, of the latency histogram buckets: 25% apart from
+# 50 ms to about 6 minutes, plus an overflow bucket. Quantiles read from the
+# histogram are interpolated inside one bucket, so they are never off by more
+# than the bucket width (25%) and usually by a few percent.
+LATENCY_BOUNDS = tuple(round(0.05 * 1.25 ** i, 4) for i in range(41))
+
+
+class ConversationRollup(db.Model):
+    __tablename__ = 'conversation_rollup'
+
+    period = db.Column(db.String(8), primary_key=True)
+    bucket_start = db.Column(db.DateTime, primary_key=True)
+    status = db.Column(db.String(20), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    latency_count = db.Column(db.Integer, nullable=False, default=0)
+    latency_sum = db.Column(db.Float, nullable=False, default=0.0)
+    latency_max = db.Column(db.Float, nullable=True)
+    histogram = db.Column(db.Text, nullable=False)  # JSON list of bucket counts
+
+
+class RollupWatermark(db.Model):
+    __tablename__ = 'rollup_watermark'
+
+    name = db.Column(db.String(40), primary_key=True)
+    last_id = db.Column(db.Integer, nullable=False, default=0)
+
+
+class RollupGap(db.Model):
+    """An id below the watermark whose row had not committed when the watermark passed it."""
+    __tablename__ = 'rollup_gap'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    seen_at = db.Column(db.DateTime, nullable=False)
+
+
+def create_rollup_tables(engine):
+    db.metadata.create_all(engine, tables=[ConversationRollup.__table__, RollupWatermark.__table__,
+                                           RollupGap.__table__])
+    create_lease_table(engine)
+
+
+def bucket_start(timestamp, period):
+    if period == 'hour':
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _empty_aggregate():
+    return {'count': 0, 'latency_count': 0, 'latency_sum': 0.0, 'latency_max': None,
+            'histogram': [0] * (len(LATENCY_BOUNDS) + 1)}
+
+
+def _merge(into, other):
+    into['count'] += other['count']
+    into['latency_count'] += other['latency_count']
+    into['latency_sum'] += other['latency_sum']
+    if other['latency_max'] is not None:
+        into['latency_max'] = max(into['latency_max'] or 0.0, other['latency_max'])
+    into['histogram'] = [a + b for a, b in zip(into['histogram'], other['histogram'])]
+
+
+def _ensure_watermark(engine):
+    table = RollupWatermark.__table__
+    with engine.begin() as connection:
+        if connection.execute(select(table.c.last_id).where(table.c.name == WATERMARK_NAME)).first():
+            return
+    try:
+        with engine.begin() as connection:
+            connection.execute(table.insert().values(name=WATERMARK_NAME, last_id=0))
+    except IntegrityError:
+        pass  # another process created it first
+
+
+def _store_aggregates(connection, aggregates):
+    """Adds batch aggregates to the rollup table with one read per period and bulk writes."""
+    rollups = ConversationRollup.__table__
+    existing = {}
+    for period in PERIODS:
+        starts = [key[1] for key in aggregates if key[0] == period]
+        rows = connection.execute(select(rollups).where(
+            (rollups.c.period == period) & rollups.c.bucket_start.between(min(starts), max(starts))
+        )).mappings()
+        for row in rows:
+            existing[(row['period'], row['bucket_start'], row['status'])] = row
+
+    inserts, updates = [], []
+    for (period, start, status), aggregate in aggregates.items():
+        row = existing.get((period, start, status))
+        if row is not None:
+            merged = dict(row, histogram=json.loads(row['histogram']))
+            _merge(merged, aggregate)
+            aggregate = merged
+        values = {
+            'count': aggregate['count'],
+            'latency_count': aggregate['latency_count'],
+            'latency_sum': aggregate['latency_sum'],
+            'latency_max': aggregate['latency_max'],
+            'histogram': json.dumps(aggregate['histogram']),
+        }
+        if row is None:
+            inserts.append(dict(values, period=period, bucket_start=start, status=status))
+        else:
+            updates.append(dict(values, key_period=period, key_start=start, key_status=status))
+
+    if inserts:
+        connection.execute(rollups.insert(), inserts)
+    if updates:
+        connection.execute(
+            rollups.update()
+            .where((rollups.c.period == bindparam('key_period')) & (rollups.c.bucket_start == bindparam('key_start'))
+                   & (rollups.c.status == bindparam('key_status'))),
+            updates
+        )
+
+
+def apply_rollups(engine, batch_size=5000, lease_seconds=300):
+    """
+    Folds conversation rows past the watermark into the rollup table, one
+    transaction per batch. Returns the number of rows aggregated.
+
+    Every worker runs the job, but only the holder of the 'rollups' lease
+    does the work; the others return 0. The watermark also moves with a
+    compare-and-set in the same transaction as the rollup rows, so even two
+    runs at once could never count a row twice.
+    """
+    _ensure_watermark(engine)
+    if not acquire_lease(engine, LEASE_NAME, lease_seconds):
+        return 0
+    try:
+        return _apply_gaps(engine) + _apply_batches(engine, batch_size, lease_seconds)
+    finally:
+        release_lease(engine, LEASE_NAME)
+
+
+def _aggregate(rows):
+    """Rollup aggregates of (id, timestamp, response_time, status) rows, keyed by (period, bucket, status)."""
+    aggregates = {}
+    for _, timestamp, response_time, status in rows:
+        for period in PERIODS:
+            key = (period, bucket_start(timestamp, period), status)
+            aggregate = aggregates.get(key)
+            if aggregate is None:
+                aggregate = aggregates[key] = _empty_aggregate()
+            aggregate['count'] += 1
+            if response_time is not None:
+                aggregate['latency_count'] += 1
+                aggregate['latency_sum'] += response_time
+                aggregate['latency_max'] = max(aggregate['latency_max'] or 0.0, response_time)
+                aggregate['histogram'][bisect_left(LATENCY_BOUNDS, response_time)] += 1
+    return aggregates
+
+
+def _gaps(previous_id, ids):
+    """Ids missing between the watermark and the ids of a batch; larger jumps are not tracked."""
+    missing = []
+    for row_id in ids:
+        if 1 < row_id - previous_id <= MAX_GAP_IDS + 1:
+            missing.extend(range(previous_id + 1, row_id))
+        previous_id = row_id
+    return missing
+
+
+def _apply_gaps(engine):
+    """Folds in rows that committed after the watermark passed their id, and forgets expired gaps."""
+    conversations = Conversation.__table__
+    gaps = RollupGap.__table__
+    with engine.begin() as connection:
+        rows = connection.execute(
+            select(conversations.c.id, conversations.c.timestamp,
+                   conversations.c.response_time, conversations.c.status)
+            .where(conversations.c.id.in_(select(gaps.c.id)))
+        ).all()
+        if rows:
+            _store_aggregates(connection, _aggregate(rows))
+            connection.execute(gaps.delete().where(gaps.c.id.in_([row[0] for row in rows])))
+            logger.info("Rolled up %d rows that committed late", len(rows))
+        connection.execute(gaps.delete().where(gaps.c.seen_at < datetime.utcnow() - timedelta(seconds=GAP_SECONDS)))
+    return len(rows)
+
+
+def _apply_batches(engine, batch_size, lease_seconds):
+    conversations = Conversation.__table__
+    watermarks = RollupWatermark.__table__
+    gaps = RollupGap.__table__
+    processed = 0
+
+    while True:
+        if processed and not acquire_lease(engine, LEASE_NAME, lease_seconds):
+            raise RuntimeError("Rollup lease lost to another process")
+        with engine.begin() as connection:
+            last_id = connection.execute(
+                select(watermarks.c.last_id).where(watermarks.c.name == WATERMARK_NAME)
+            ).scalar_one()
+            rows = connection.execute(
+                select(conversations.c.id, conversations.c.timestamp,
+                       conversations.c.response_time, conversations.c.status)
+                .where(conversations.c.id > last_id)
+                .order_by(conversations.c.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                return processed
+
+            _store_aggregates(connection, _aggregate(rows))
+            missing = _gaps(last_id, [row[0] for row in rows])
+            if missing:
+                now = datetime.utcnow()
+                connection.execute(gaps.insert(), [{'id': row_id, 'seen_at': now} for row_id in missing])
+
+            moved = connection.execute(
+                watermarks.update()
+                .where((watermarks.c.name == WATERMARK_NAME) & (watermarks.c.last_id == last_id))
+                .values(last_id=rows[-1][0])
+            )
+            if moved.rowcount != 1:
+                raise RuntimeError("Rollup watermark moved concurrently, batch discarded")
+        processed += len(rows)
+
+
+def histogram_quantile(histogram, q, maximum=None):
+    """Estimates the q-quantile by interpolating inside the histogram bucket that contains it."""
+    total = sum(histogram)
+    if not total:
+        return None
+    rank = q * total
+    seen = 0
+    for index, count in enumerate(histogram):
+        if count and seen + count >= rank:
+            lower = LATENCY_BOUNDS[index - 1] if index else 0.0
+            upper = LATENCY_BOUNDS[index] if index < len(LATENCY_BOUNDS) else (maximum or lower)
+            if maximum is not None:
+                upper = min(upper, maximum)
+            return round(lower + (upper - lower) * (rank - seen) / count, 4)
+        seen += count
+    return maximum
+
+
+def _summary(aggregate, by_status):
+    errors = sum(count for status, count in by_status.items() if status not in SUCCESS_STATUSES)
+    histogram = aggregate['histogram']
+    maximum = aggregate['latency_max']
+    return {
+        'count': aggregate['count'],
+        'errors': errors,
+        'error_rate': round(errors / aggregate['count'], 4) if aggregate['count'] else 0.0,
+        'by_status': by_status,
+        'latency': {
+            'count': aggregate['latency_count'],
+            'mean': round(aggregate['latency_sum'] / aggregate['latency_count'], 4) if aggregate['latency_count'] else None,
+            'p50': histogram_quantile(histogram, 0.5, maximum),
+            'p95': histogram_quantile(histogram, 0.95, maximum),
+            'p99': histogram_quantile(histogram, 0.99, maximum),
+            'max': maximum,
+        },
+    }
+
+
+def query_rollups(connection, period='hour', start=None, end=None):
+    """
+    Returns per-bucket summaries for [start, end) plus a total over the range.
+    Defaults to the last 24 hours for hourly rollups and the last 30 days for daily ones.
+    """
+    if period not in PERIODS:
+        raise ValueError(f"Unsupported period '{period}'. Choose one of: {', '.join(PERIODS)}")
+    if start is None:
+        span = timedelta(hours=24) if period == 'hour' else timedelta(days=30)
+        start = bucket_start(datetime.utcnow() - span, period)
+    rollups = ConversationRollup.__table__
+    query = select(rollups).where((rollups.c.period == period) & (rollups.c.bucket_start >= start))
+    if end is not None:
+        query = query.where(rollups.c.bucket_start < end)
+
+    buckets = {}
+    total, total_by_status = _empty_aggregate(), {}
+    for row in connection.execute(query.order_by(rollups.c.bucket_start)).mappings():
+        aggregate = dict(row, histogram=json.loads(row['histogram']))
+        merged, by_status = buckets.setdefault(row['bucket_start'], (_empty_aggregate(), {}))
+        _merge(merged, aggregate)
+        by_status[row['status']] = by_status.get(row['status'], 0) + row['count']
+        _merge(total, aggregate)
+        total_by_status[row['status']] = total_by_status.get(row['status'], 0) + row['count']
+
+    return {
+        'period': period,
+        'start': start.isoformat(),
+        'end': end.isoformat() if end else None,
+        'total': _summary(total, total_by_status),
+        'buckets': [
+            dict(bucket=bucket.isoformat(), **_summary(aggregate, by_status))
+            for bucket, (aggregate, by_status) in buckets.items()
+        ],
+    }
+
+
+class RollupJob:
+    """Runs apply_rollups() every `interval` seconds from a background thread."""
+
+    def __init__(self, app, interval=60, batch_size=5000):
+        self.app = app
+        self.interval = interval
+        self.batch_size = batch_size
+        self.runs = 0
+        self.failed = 0
+        self.processed = 0
+        self.last_run_seconds = None
+        self._stopped = threading.Event()
+        with app.app_context():
+            create_rollup_tables(db.engine)
+        self._thread = threading.Thread(target=self._run, name='rollups', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def run_once(self):
+        start = time.perf_counter()
+        try:
+            with self.app.app_context():
+                processed = apply_rollups(db.engine, self.batch_size)
+            self.processed += processed
+            self.runs += 1
+            if processed:
+                logger.info("Rolled up %d conversation rows", processed)
+        except Exception as e:
+            self.failed += 1
+            logger.error("Rollup run failed: %s", e)
+        self.last_run_seconds = round(time.perf_counter() - start, 4)
+
+    def close(self):
+        self._stopped.set()
+        self._thread.join(timeout=10)
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.run_once()
+
+    def stats(self):
+        return {
+            'runs': self.runs,
+            'failed': self.failed,
+            'processed': self.processed,
+            'last_run_seconds': self.last_run_seconds,
+        }
+
+
+def main(argv=None):
+    from decouple import config
+
+    from .export import parse_date
+
+    parser = argparse.ArgumentParser(description="Update the conversation rollups and print a summary.")
+    parser.add_argument('--database-url', default=config('DATABASE_URL', default='sqlite:///nurse_talk.db'))
+    parser.add_argument('--period', choices=PERIODS, default='hour')
+    parser.add_argument('--start', type=parse_date)
+    parser.add_argument('--end', type=parse_date)
+    parser.add_argument('--batch-size', type=int, default=5000)
+    args = parser.parse_args(argv)
+
+    engine = create_engine(args.database_url)
+    try:
+        create_rollup_tables(engine)
+        processed = apply_rollups(engine, args.batch_size)
+        with engine.connect() as connection:
+            summary = query_rollups(connection, args.period, args.start, args.end)
+        print(json.dumps(dict(summary, processed=processed), indent=2))
+    finally:
+        engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
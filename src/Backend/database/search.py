@@ -0,0 +1,118 @@
+"""
+Full-text search over the conversation log.
+
+On SQLite the conversation table is indexed by an FTS5 external-content
+table, conversation_fts, which triggers keep in step with every insert,
+update and delete (including the batched log writer and retention deletes),
+so the text itself is stored only once. Results are ranked with bm25,
+weighting the user's own words above the bot's reply.
+"""
+from datetime import datetime
+import logging
+import re
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = 'conversation_fts'
+# bm25 column weights: user_input, bot_response
+USER_INPUT_WEIGHT = 2.0
+BOT_RESPONSE_WEIGHT = 1.0
+
+_SCHEMA = (
+    f"""CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        user_input, bot_response,
+        content='conversation', content_rowid='id',
+        tokenize='porter unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS conversation_fts_insert AFTER INSERT ON conversation BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, user_input, bot_response)
+        VALUES (new.id, new.user_input, new.bot_response);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS conversation_fts_delete AFTER DELETE ON conversation BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, user_input, bot_response)
+        VALUES ('delete', old.id, old.user_input, old.bot_response);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS conversation_fts_update AFTER UPDATE OF user_input, bot_response ON conversation BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, user_input, bot_response)
+        VALUES ('delete', old.id, old.user_input, old.bot_response);
+        INSERT INTO {FTS_TABLE}(rowid, user_input, bot_response)
+        VALUES (new.id, new.user_input, new.bot_response);
+    END""",
+)
+
+_TERM = re.compile(r"\w+\*?", re.UNICODE)
+
+
+def create_search_index(engine):
+    """Creates the FTS5 table and its triggers, indexing existing rows the first time."""
+    with engine.begin() as connection:
+        exists = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {'name': FTS_TABLE}
+        ).first()
+        if exists:
+            for statement in _SCHEMA[1:]:
+                connection.execute(text(statement))
+            return
+        for statement in _SCHEMA:
+            connection.execute(text(statement))
+        logger.info("Building the conversation search index")
+        connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+
+def build_match_query(query, match='all'):
+    """
+    Turns free text into a safe FTS5 query: every word is quoted so FTS5
+    operators typed by a reviewer are searched literally, and a trailing *
+    keeps its prefix meaning (e.g. convuls* matches convulsion and convulsing).
+    """
+    terms = []
+    for term in _TERM.findall(query):
+        prefix = term.endswith('*')
+        word = term.rstrip('*')
+        if word:
+            terms.append(f'"{word}"' + ('*' if prefix else ''))
+    if not terms:
+        raise ValueError("Search query has no words")
+    return (' OR ' if match == 'any' else ' AND ').join(terms)
+
+
+def search_conversations(connection, query, phone_number=None, limit=20, offset=0, match='all'):
+    """
+    Returns one page of matching conversations, best match first, each with
+    a snippet of the matching text and its bm25 score (lower is better).
+    """
+    params = {
+        'match': build_match_query(query, match),
+        'ranking': f"bm25({USER_INPUT_WEIGHT}, {BOT_RESPONSE_WEIGHT})",
+        'phone_number': phone_number,
+        'limit': limit,
+        'offset': offset,
+    }
+    # Ordering by FTS5's own rank column lets the virtual table do the
+    # sorting, so snippet() runs only for the rows on this page rather than
+    # for every match
+    rows = connection.execute(text(f"""
+        SELECT c.id, c.phone_number, c.timestamp, c.status,
+               snippet({FTS_TABLE}, -1, '[', ']', '...', 16) AS snippet,
+               {FTS_TABLE}.rank AS score
+        FROM {FTS_TABLE}
+        JOIN conversation AS c ON c.id = {FTS_TABLE}.rowid
+        WHERE {FTS_TABLE} MATCH :match
+          AND {FTS_TABLE}.rank MATCH :ranking
+          AND (:phone_number IS NULL OR c.phone_number = :phone_number)
+        ORDER BY {FTS_TABLE}.rank
+        LIMIT :limit OFFSET :offset
+    """), params).mappings().all()
+    return [
+        {
+            'id': row['id'],
+            'phone_number': row['phone_number'],
+            'timestamp': datetime.fromisoformat(row['timestamp']).isoformat(),
+            'status': row['status'],
+            'snippet': row['snippet'],
+            'score': round(row['score'], 4),
+        }
+        for row in rows
+    ]
@@ -0,0 +1,110 @@
+from datetime import datetime
+import atexit
+import logging
+import queue
+import threading
+import time
+
+from .data import db, Conversation
+
+logger = logging.getLogger(__name__)
+
+
+class ConversationLogWriter:
+    """
+    Buffers conversation records and writes them from a background thread
+    as multi-row INSERTs, one transaction per batch. A batch is flushed when
+    it reaches `batch_size` rows or when `flush_interval` seconds have passed
+    since its first row.
+
+    The buffer is bounded: when it is full, log() waits up to `put_timeout`
+    seconds for room and then drops the record, so a slow database can never
+    stall the webhook for long or grow memory without limit.
+    """
+
+    def __init__(self, app, batch_size=100, flush_interval=2.0, max_pending=5000, put_timeout=0.05):
+        self.app = app
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._stopped = threading.Event()
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+        self._thread = threading.Thread(target=self._run, name='conversation-log', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def log(self, phone_number, user_input, bot_response, response_time=None, status='sent'):
+        """Queues one conversation row. Returns False if it had to be dropped."""
+        row = {
+            'phone_number': phone_number,
+            'timestamp': datetime.utcnow(),
+            'user_input': user_input or '',
+            'bot_response': bot_response or '',
+            'response_time': response_time,
+            'status': status,
+        }
+        try:
+            self._queue.put(row, timeout=self.put_timeout)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            logger.warning("Conversation log buffer full, dropped row for %s", phone_number)
+            return False
+
+    def close(self):
+        """Flushes everything still buffered and stops the writer thread."""
+        if not self._stopped.is_set():
+            self._stopped.set()
+            self._thread.join(timeout=10)
+
+    def _write(self, rows):
+        try:
+            with self.app.app_context():
+                with db.engine.begin() as connection:
+                    connection.execute(Conversation.__table__.insert().values(rows))
+            self.written += len(rows)
+            self.batches += 1
+        except Exception as e:
+            self.failed += len(rows)
+            logger.error("Failed to write %d conversation rows: %s", len(rows), e)
+
+    def _run(self):
+        while True:
+            stopping = self._stopped.is_set()
+            batch = []
+            deadline = None
+            while len(batch) < self.batch_size:
+                timeout = 0.5 if deadline is None else deadline - time.monotonic()
+                if stopping or timeout <= 0:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                    continue
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    if deadline is not None or self._stopped.is_set():
+                        break
+                    continue
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+
+            if batch:
+                self._write(batch)
+            elif stopping:
+                return
+
+    def stats(self):
+        """Returns buffer depth and write counters."""
+        return {
+            'pending': self._queue.qsize(),
+            'written': self.written,
+            'dropped': self.dropped,
+            'failed': self.failed,
+            'batches': self.batches,
+        }
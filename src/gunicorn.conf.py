@@ -0,0 +1,43 @@
+"""
+Gunicorn settings, picked up automatically when gunicorn runs from src/:
+
+    gunicorn
+
+The master imports the app and loads the model once (preload), then forks the
+workers, which share its memory copy-on-write. Each worker starts its own
+threads, clients and connection pools in post_fork. Set GUNICORN_PRELOAD=0
+to have every worker import and load everything itself.
+
+Conversation state is only shared between workers with SESSION_STORE=redis,
+so without it the default is a single worker.
+"""
+import gc
+import os
+
+# Not `from decouple import config`: gunicorn would read it as its own `config` setting
+import decouple
+
+preload_app = decouple.config('GUNICORN_PRELOAD', default=True, cast=bool)
+wsgi_app = f"Backend.FlaskAPI.flasky:create_app(preload={preload_app})"
+bind = decouple.config('GUNICORN_BIND', default='0.0.0.0:5000')
+_shared_sessions = str(decouple.config('SESSION_STORE', default='memory')).lower() == 'redis'
+workers = decouple.config('WEB_CONCURRENCY', default=4 if _shared_sessions else 1, cast=int)
+# Workers that load the app themselves (no preload) size their thread pools from it
+os.environ.setdefault('WEB_CONCURRENCY', str(workers))
+worker_class = 'gthread'
+threads = decouple.config('GUNICORN_THREADS', default=8, cast=int)
+# Generation can take minutes on CPU; the inference scheduler enforces its own timeout
+timeout = decouple.config('GUNICORN_TIMEOUT', default=180, cast=int)
+
+
+def when_ready(server):
+    # Objects allocated before fork are never collected in the master; freezing
+    # them keeps the workers' collector from touching (and so copying) their pages
+    if preload_app:
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    if preload_app:
+        from Backend.FlaskAPI import flasky
+        flasky.start_worker(workers=server.cfg.workers)
@@ -0,0 +1,11 @@
+"""
+Load-testing harness: local stand-ins for Twilio, media URLs and the speech
+services, and a driver that replays WhatsApp conversations against the app.
+
+    python -m loadtest mocks --port 8099
+    python -m loadtest run --target http://localhost:5000 --mocks http://localhost:8099 --rate 2 --duration 120
+    python -m loadtest compare baseline.json results.json
+
+Start the app with TWILIO_API_BASE_URL and SPEECH_SERVICE_URL pointing at
+the mocks (see the README).
+"""
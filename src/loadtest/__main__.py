@@ -0,0 +1,65 @@
+import argparse
+import json
+import logging
+
+from .driver import LoadTest, compare, print_summary, write_results
+from .mocks import serve_forever
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m loadtest', description="NurseTalk load-testing harness")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    mocks = commands.add_parser('mocks', help="Serve the Twilio, media and speech stand-ins")
+    mocks.add_argument('--host', default='127.0.0.1')
+    mocks.add_argument('--port', type=int, default=8099)
+    mocks.add_argument('--twilio-ms', type=float, default=120, help="Messages API latency")
+    mocks.add_argument('--media-ms', type=float, default=80, help="Voice note download latency")
+    mocks.add_argument('--tts-ms', type=float, default=400, help="Speech synthesis latency")
+    mocks.add_argument('--stt-ms', type=float, default=600, help="Speech recognition latency")
+    mocks.add_argument('--error-rate', type=float, default=0.0, help="Share of Messages API calls answered with 429")
+    mocks.add_argument('--seed', type=int)
+
+    run = commands.add_parser('run', help="Replay conversations against the webhook")
+    run.add_argument('--target', default='http://localhost:5000', help="Base URL of the app")
+    run.add_argument('--mocks', default='http://127.0.0.1:8099', help="Base URL of the mock services")
+    run.add_argument('--rate', type=float, default=1.0, help="New conversations per second")
+    run.add_argument('--duration', type=float, default=60, help="Seconds to keep starting conversations")
+    run.add_argument('--conversations', type=int, help="Stop after starting this many conversations")
+    run.add_argument('--voice-ratio', type=float, default=0.3, help="Share of symptom messages sent as voice notes")
+    run.add_argument('--urgent-ratio', type=float, default=0.02, help="Share of conversations reporting urgent symptoms")
+    run.add_argument('--think-time', type=float, default=1.0, help="Mean seconds between a user's messages")
+    run.add_argument('--concurrency', type=int, default=64, help="Maximum conversations in progress")
+    run.add_argument('--timeout', type=float, default=180, help="Webhook request timeout")
+    run.add_argument('--seed', type=int)
+    run.add_argument('--output', default='loadtest-results.json')
+
+    diff = commands.add_parser('compare', help="Compare two results files")
+    diff.add_argument('baseline')
+    diff.add_argument('candidate')
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    if args.command == 'mocks':
+        serve_forever(args.host, args.port, twilio_ms=args.twilio_ms, media_ms=args.media_ms, tts_ms=args.tts_ms,
+                      stt_ms=args.stt_ms, error_rate=args.error_rate, seed=args.seed)
+    elif args.command == 'run':
+        test = LoadTest(args.target, args.mocks, rate=args.rate, duration=args.duration,
+                        conversations=args.conversations, voice_ratio=args.voice_ratio,
+                        urgent_ratio=args.urgent_ratio, think_time=args.think_time, concurrency=args.concurrency,
+                        timeout=args.timeout, seed=args.seed)
+        results = test.run()
+        write_results(results, args.output)
+        print_summary(results)
+        print(f"Results written to {args.output}")
+    else:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        with open(args.candidate, encoding='utf-8') as f:
+            candidate = json.load(f)
+        compare(baseline, candidate)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,353 @@
+"""
+Replays WhatsApp conversations against the webhook and reports what happened.
+
+Conversations arrive as a Poisson process at `rate` per second (an open
+workload: arrivals do not wait for earlier conversations to finish). Each
+conversation runs its turns in order with a think time between them: an
+optional greeting, one to three symptom messages (some as voice notes
+served by the mocks), then "no" to ask for the diagnosis. A small share
+report urgent symptoms instead.
+
+Results include throughput, error rates, webhook latency percentiles per
+kind of turn, per-stage latency from the app's /metrics (the difference
+between scrapes taken before and after the run), and the mocks' counters.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import json
+import logging
+import math
+import random
+import re
+import subprocess
+import threading
+import time
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+GREETINGS = ("hi", "hello", "good morning", "hey there")
+SYMPTOMS = (
+    "my son has a fever of 39 degrees",
+    "she has been coughing for three days",
+    "he has a red rash on his chest",
+    "my daughter is vomiting and has diarrhea",
+    "he complains of a headache and a stiff neck",
+    "she has a runny nose and is not eating",
+    "my baby has an ear ache and keeps crying",
+)
+FINISHERS = ("no", "that's all", "nothing else", "no that is all")
+URGENT = ("my child is having a seizure", "he is not breathing properly", "she swallowed bleach")
+
+_STAGE_LINE = re.compile(r'^nursetalk_stage_seconds_(bucket|count|sum)\{stage="([^"]+)"(?:,le="([^"]+)")?\} (\S+)$')
+
+
+def build_conversation(rng, voice_ratio, urgent_ratio, media_base_url):
+    """Returns the turns of one conversation as (turn kind, form fields) pairs."""
+    def message(text):
+        if rng.random() < voice_ratio:
+            seconds = rng.choice((2, 4, 8))
+            return 'voice', {
+                'Body': '',
+                'NumMedia': '1',
+                'MediaUrl0': f"{media_base_url}/media/note-{seconds}s.wav",
+                'MediaContentType0': 'audio/ogg',
+            }
+        return 'text', {'Body': text, 'NumMedia': '0'}
+
+    if rng.random() < urgent_ratio:
+        return [('urgent', {'Body': rng.choice(URGENT), 'NumMedia': '0'})]
+    turns = []
+    if rng.random() < 0.5:
+        turns.append(('greeting', {'Body': rng.choice(GREETINGS), 'NumMedia': '0'}))
+    for _ in range(rng.randint(1, 3)):
+        kind, fields = message(rng.choice(SYMPTOMS))
+        turns.append((f"symptom_{kind}", fields))
+    turns.append(('diagnosis', {'Body': rng.choice(FINISHERS), 'NumMedia': '0'}))
+    return turns
+
+
+def twilio_fields(phone, fields, account_sid='ACloadtest', to_number='+14155238886'):
+    """Completes a turn with the fields Twilio sends on every inbound WhatsApp message."""
+    sid = f"SM{random.getrandbits(128):032x}"
+    return dict({
+        'SmsMessageSid': sid,
+        'MessageSid': sid,
+        'SmsSid': sid,
+        'AccountSid': account_sid,
+        'MessagingServiceSid': '',
+        'From': f"whatsapp:{phone}",
+        'To': f"whatsapp:{to_number}",
+        'WaId': phone.lstrip('+'),
+        'ProfileName': 'Load Test',
+        'SmsStatus': 'received',
+        'NumSegments': '1',
+        'ReferralNumMedia': '0',
+        'ApiVersion': '2010-04-01',
+    }, **fields)
+
+
+def percentiles(values):
+    if not values:
+        return None
+    ordered = sorted(values)
+
+    def pct(p):
+        return round(ordered[min(len(ordered) - 1, int(math.ceil(len(ordered) * p / 100)) - 1)], 1)
+    return {
+        'count': len(ordered),
+        'mean': round(sum(ordered) / len(ordered), 1),
+        'p50': pct(50), 'p90': pct(90), 'p95': pct(95), 'p99': pct(99),
+        'max': round(ordered[-1], 1),
+    }
+
+
+def scrape_stages(session, target):
+    """Parses nursetalk_stage_seconds from /metrics into {stage: {'buckets': {le: n}, 'count': n, 'sum': s}}."""
+    try:
+        response = session.get(f"{target}/metrics", timeout=10)
+        response.raise_for_status()
+    except requests.RequestException as e:
+        logger.warning("Could not scrape %s/metrics: %s", target, e)
+        return None
+    stages = {}
+    for line in response.text.splitlines():
+        match = _STAGE_LINE.match(line)
+        if not match:
+            continue
+        kind, stage, le, value = match.groups()
+        stage_data = stages.setdefault(stage, {'buckets': {}, 'count': 0, 'sum': 0.0})
+        if kind == 'bucket':
+            stage_data['buckets'][float(le)] = float(value)
+        else:
+            stage_data[kind] = float(value)
+    return stages
+
+
+def _bucket_quantile(buckets, count, q):
+    """Estimates a quantile from cumulative histogram buckets, interpolating inside the bucket."""
+    rank = q * count
+    previous_bound, previous_count = 0.0, 0.0
+    for bound in sorted(buckets):
+        cumulative = buckets[bound]
+        if cumulative >= rank:
+            if math.isinf(bound):
+                return previous_bound
+            in_bucket = cumulative - previous_count
+            fraction = (rank - previous_count) / in_bucket if in_bucket else 0
+            return previous_bound + (bound - previous_bound) * fraction
+        previous_bound, previous_count = bound, cumulative
+    return previous_bound
+
+
+def stage_deltas(before, after):
+    """Per-stage count, mean and estimated percentiles (ms) for the observations made during the run."""
+    if after is None:
+        return None
+    before = before or {}
+    stages = {}
+    for stage, data in sorted(after.items()):
+        base = before.get(stage, {'buckets': {}, 'count': 0, 'sum': 0.0})
+        count = data['count'] - base['count']
+        if count <= 0:
+            continue
+        buckets = {bound: value - base['buckets'].get(bound, 0) for bound, value in data['buckets'].items()}
+        stages[stage] = {
+            'count': int(count),
+            'mean_ms': round(1000 * (data['sum'] - base['sum']) / count, 1),
+            **{f"p{int(q * 100)}_ms": round(1000 * _bucket_quantile(buckets, count, q), 1) for q in (0.5, 0.95, 0.99)},
+        }
+    return stages
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+class LoadTest:
+    def __init__(self, target, mocks, rate=1.0, duration=60, conversations=None, voice_ratio=0.3,
+                 urgent_ratio=0.02, think_time=1.0, concurrency=64, timeout=180, seed=None):
+        self.target = target.rstrip('/')
+        self.mocks = mocks.rstrip('/')
+        self.rate = rate
+        self.duration = duration
+        self.max_conversations = conversations
+        self.voice_ratio = voice_ratio
+        self.urgent_ratio = urgent_ratio
+        self.think_time = think_time
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.results = []
+        self.conversations_started = 0
+        self.conversations_completed = 0
+
+    def _session(self):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def _post(self, kind, fields):
+        start = time.perf_counter()
+        status, error = None, None
+        try:
+            response = self._session().post(f"{self.target}/webhook", data=fields, timeout=self.timeout)
+            status = response.status_code
+        except requests.RequestException as e:
+            error = type(e).__name__
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self.results.append((kind, status, error, elapsed_ms))
+        return status == 200
+
+    def _converse(self, index, turns, think_rng):
+        phone = f"+1555{index:07d}"
+        completed = True
+        for turn, (kind, fields) in enumerate(turns):
+            if turn:
+                time.sleep(think_rng.expovariate(1 / self.think_time) if self.think_time else 0)
+            if not self._post(kind, twilio_fields(phone, fields)):
+                completed = False
+                break
+        if completed:
+            with self._lock:
+                self.conversations_completed += 1
+
+    def run(self):
+        session = requests.Session()
+        try:
+            session.post(f"{self.mocks}/_reset", timeout=10)
+        except requests.RequestException as e:
+            raise RuntimeError(f"Mock services are not reachable at {self.mocks}: {e}")
+        stages_before = scrape_stages(session, self.target)
+
+        started_at = datetime.now(timezone.utc)
+        start = time.monotonic()
+        deadline = start + self.duration
+        next_arrival = start
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='conversation') as pool:
+            while time.monotonic() < deadline:
+                if self.max_conversations is not None and self.conversations_started >= self.max_conversations:
+                    break
+                time.sleep(max(0.0, next_arrival - time.monotonic()))
+                turns = build_conversation(self.rng, self.voice_ratio, self.urgent_ratio, self.mocks)
+                pool.submit(self._converse, self.conversations_started, turns, random.Random(self.rng.random()))
+                self.conversations_started += 1
+                next_arrival += self.rng.expovariate(self.rate)
+            arrivals_done = time.monotonic()
+        elapsed = time.monotonic() - start
+
+        stages_after = scrape_stages(session, self.target)
+        try:
+            mock_stats = session.get(f"{self.mocks}/_stats", timeout=10).json()
+        except (requests.RequestException, ValueError):
+            mock_stats = None
+        return self.summarize(started_at, elapsed, arrivals_done - start, stages_before, stages_after, mock_stats)
+
+    def summarize(self, started_at, elapsed, arrival_seconds, stages_before, stages_after, mock_stats):
+        by_status = {}
+        by_kind = {}
+        errors = 0
+        for kind, status, error, elapsed_ms in self.results:
+            key = str(status) if status is not None else error
+            by_status[key] = by_status.get(key, 0) + 1
+            by_kind.setdefault(kind, []).append(elapsed_ms)
+            if status != 200:
+                errors += 1
+        total = len(self.results)
+        return {
+            'started_at': started_at.isoformat(),
+            'git_revision': git_revision(),
+            'config': {
+                'target': self.target,
+                'rate_per_second': self.rate,
+                'duration_seconds': self.duration,
+                'conversations': self.max_conversations,
+                'voice_ratio': self.voice_ratio,
+                'urgent_ratio': self.urgent_ratio,
+                'think_time_seconds': self.think_time,
+                'concurrency': self.concurrency,
+                'seed': self.seed,
+            },
+            'elapsed_seconds': round(elapsed, 2),
+            'arrival_seconds': round(arrival_seconds, 2),
+            'conversations': {
+                'started': self.conversations_started,
+                'completed': self.conversations_completed,
+                'per_second': round(self.conversations_completed / elapsed, 3) if elapsed else None,
+            },
+            'requests': {
+                'total': total,
+                'errors': errors,
+                'error_rate': round(errors / total, 4) if total else None,
+                'per_second': round(total / elapsed, 3) if elapsed else None,
+                'by_status': by_status,
+            },
+            'latency_ms': dict(
+                {'all': percentiles([r[3] for r in self.results])},
+                **{kind: percentiles(values) for kind, values in sorted(by_kind.items())}
+            ),
+            'stages': stage_deltas(stages_before, stages_after),
+            'mocks': mock_stats,
+        }
+
+
+def print_summary(results):
+    requests_ = results['requests']
+    conversations = results['conversations']
+    print(f"{conversations['completed']}/{conversations['started']} conversations completed in "
+          f"{results['elapsed_seconds']}s; {requests_['total']} requests ({requests_['per_second']}/s), "
+          f"error rate {requests_['error_rate']}")
+    print(f"{'webhook':24} {'count':>7} {'mean':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}  (ms)")
+    for kind, stats in results['latency_ms'].items():
+        if stats:
+            print(f"  {kind:22} {stats['count']:>7} {stats['mean']:>9} {stats['p50']:>9} {stats['p95']:>9} "
+                  f"{stats['p99']:>9} {stats['max']:>9}")
+    if results['stages']:
+        print(f"{'stage':24} {'count':>7} {'mean':>9} {'p50':>9} {'p95':>9} {'p99':>9}")
+        for stage, stats in results['stages'].items():
+            print(f"  {stage:22} {stats['count']:>7} {stats['mean_ms']:>9} {stats['p50_ms']:>9} "
+                  f"{stats['p95_ms']:>9} {stats['p99_ms']:>9}")
+
+
+def _lookup(results, path):
+    value = results
+    for key in path:
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return value
+
+
+def compare(baseline, candidate):
+    """Prints headline metrics of two result files side by side."""
+    rows = [('requests/s', ('requests', 'per_second')), ('error rate', ('requests', 'error_rate'))]
+    for kind in ('all', 'diagnosis', 'symptom_voice'):
+        for pct in ('p50', 'p95', 'p99'):
+            rows.append((f"{kind} {pct} ms", ('latency_ms', kind, pct)))
+    stages = sorted(set(_lookup(baseline, ('stages',)) or {}) | set(_lookup(candidate, ('stages',)) or {}))
+    for stage in stages:
+        rows.append((f"{stage} p95 ms", ('stages', stage, 'p95_ms')))
+
+    print(f"{'metric':28} {'baseline':>12} {'candidate':>12} {'change':>9}")
+    for label, path in rows:
+        old, new = _lookup(baseline, path), _lookup(candidate, path)
+        if old is None and new is None:
+            continue
+        change = f"{100 * (new - old) / old:+.1f}%" if old and new is not None else ''
+        print(f"{label:28} {str(old):>12} {str(new):>12} {change:>9}")
+
+
+def write_results(results, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+        f.write('\n')
@@ -0,0 +1,213 @@
+"""
+One HTTP server standing in for everything the app calls out to:
+
+- POST /2010-04-01/Accounts/<sid>/Messages.json: the Twilio Messages API.
+  It records the message and answers like Twilio, with an optional error rate.
+- GET /media/<name>.wav: incoming voice notes, as short WAV files.
+- POST /tts: speech synthesis. Returns silent MP3 whose length grows with the text.
+- POST /stt: speech recognition. Returns a symptom sentence.
+- GET /_stats: request counts and latency per service. POST /_reset clears them.
+
+Each service sleeps for its configured latency (with +-25% jitter) so the app
+sees realistic waits without any network traffic leaving the machine.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import io
+import json
+import logging
+import random
+import re
+import threading
+import time
+from urllib.parse import parse_qs
+import uuid
+import wave
+
+logger = logging.getLogger(__name__)
+
+# Symptom sentences returned by the mock recognizer
+TRANSCRIPTS = (
+    "my daughter has a high fever and is very tired",
+    "he has been coughing all night",
+    "she has a rash on her arms and legs",
+    "my baby keeps vomiting after feeding",
+    "he has diarrhea and a stomach ache",
+    "she has a runny nose and a sore throat",
+)
+
+# A silent MPEG-1 Layer III frame: 128 kbit/s, 44.1 kHz, mono, 417 bytes,
+# zero side information. Each frame holds 26 ms of audio.
+_MP3_FRAME = bytes([0xFF, 0xFB, 0x90, 0xC0]) + bytes(413)
+_MESSAGES_PATH = re.compile(r'^/2010-04-01/Accounts/([^/]+)/Messages\.json$')
+
+
+def silent_mp3(seconds):
+    return _MP3_FRAME * max(1, int(seconds / 0.026))
+
+
+def voice_note(seconds, rate=16000):
+    """A mono 16-bit WAV of quiet noise, about the size of a real voice note."""
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(bytes(random.getrandbits(8) & 0x0F for _ in range(int(seconds * rate) * 2)))
+    return buffer.getvalue()
+
+
+class MockStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clear()
+
+    def _clear(self):
+        self.counts = {}
+        self.errors = {}
+        self.seconds = {}
+        self.messages = {'text': 0, 'media': 0}
+        self.recipients = set()
+
+    def reset(self):
+        with self._lock:
+            self._clear()
+
+    def record(self, service, seconds, error=False):
+        with self._lock:
+            self.counts[service] = self.counts.get(service, 0) + 1
+            self.seconds[service] = self.seconds.get(service, 0.0) + seconds
+            if error:
+                self.errors[service] = self.errors.get(service, 0) + 1
+
+    def record_message(self, to, has_media):
+        with self._lock:
+            self.messages['media' if has_media else 'text'] += 1
+            self.recipients.add(to)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'requests': dict(self.counts),
+                'errors': dict(self.errors),
+                'mean_latency_ms': {
+                    service: round(1000 * self.seconds[service] / count, 1)
+                    for service, count in self.counts.items()
+                },
+                'messages': dict(self.messages),
+                'recipients': len(self.recipients),
+            }
+
+
+class MockServices:
+    def __init__(self, twilio_ms=120, media_ms=80, tts_ms=400, stt_ms=600, error_rate=0.0, seed=None):
+        self.latency = {'twilio': twilio_ms, 'media': media_ms, 'tts': tts_ms, 'stt': stt_ms}
+        self.error_rate = error_rate
+        self.stats = MockStats()
+        self.random = random.Random(seed)
+        # A few voice notes of different lengths, generated once
+        self.voice_notes = {seconds: voice_note(seconds) for seconds in (2, 4, 8)}
+
+    def wait(self, service):
+        delay = self.latency[service] / 1000
+        if delay:
+            time.sleep(delay * self.random.uniform(0.75, 1.25))
+
+    def handler(self):
+        services = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _send(self, status, body, content_type='application/json'):
+                if isinstance(body, (dict, list)):
+                    body = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _body(self):
+                return self.rfile.read(int(self.headers.get('Content-Length', 0)))
+
+            def do_GET(self):
+                if self.path == '/_stats':
+                    self._send(200, services.stats.snapshot())
+                elif self.path.startswith('/media/'):
+                    start = time.perf_counter()
+                    services.wait('media')
+                    match = re.search(r'(\d+)s', self.path)
+                    seconds = int(match.group(1)) if match and int(match.group(1)) in services.voice_notes else 4
+                    self._send(200, services.voice_notes[seconds], 'audio/wav')
+                    services.stats.record('media', time.perf_counter() - start)
+                else:
+                    self._send(404, {'message': 'Not found'})
+
+            def do_POST(self):
+                start = time.perf_counter()
+                body = self._body()
+                match = _MESSAGES_PATH.match(self.path)
+                if match:
+                    self._messages(match.group(1), body, start)
+                elif self.path == '/tts':
+                    services.wait('tts')
+                    text = json.loads(body or b'{}').get('text', '')
+                    # Roughly 15 characters of speech per second
+                    self._send(200, silent_mp3(max(1.0, len(text) / 15)), 'audio/mpeg')
+                    services.stats.record('tts', time.perf_counter() - start)
+                elif self.path == '/stt':
+                    services.wait('stt')
+                    self._send(200, {'text': services.random.choice(TRANSCRIPTS)})
+                    services.stats.record('stt', time.perf_counter() - start)
+                elif self.path == '/_reset':
+                    services.stats.reset()
+                    self._send(200, {})
+                else:
+                    self._send(404, {'message': 'Not found'})
+
+            def _messages(self, account_sid, body, start):
+                services.wait('twilio')
+                form = parse_qs(body.decode('utf-8'))
+                if services.error_rate and services.random.random() < services.error_rate:
+                    self._send(429, {'code': 20429, 'message': 'Too Many Requests (mock)', 'status': 429})
+                    services.stats.record('twilio', time.perf_counter() - start, error=True)
+                    return
+                to = form.get('To', [''])[0]
+                media = form.get('MediaUrl', [])
+                services.stats.record_message(to, bool(media))
+                now = time.strftime('%a, %d %b %Y %H:%M:%S +0000', time.gmtime())
+                self._send(201, {
+                    'sid': f"SM{uuid.uuid4().hex}",
+                    'account_sid': account_sid,
+                    'to': to,
+                    'from': form.get('From', [''])[0],
+                    'body': form.get('Body', [''])[0],
+                    'num_media': str(len(media)),
+                    'status': 'queued',
+                    'direction': 'outbound-api',
+                    'date_created': now,
+                    'date_updated': now,
+                    'api_version': '2010-04-01',
+                })
+                services.stats.record('twilio', time.perf_counter() - start)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def serve(self, host='127.0.0.1', port=8099):
+        server = ThreadingHTTPServer((host, port), self.handler())
+        server.daemon_threads = True
+        return server
+
+
+def serve_forever(host, port, **options):
+    server = MockServices(**options).serve(host, port)
+    print(f"Mock Twilio, media and speech services on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
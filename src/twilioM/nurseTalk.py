@@ -1,12 +1,37 @@
 import logging
 import re
+import threading
 from time import sleep
+from urllib.parse import urlsplit
 from decouple import config
 from twilio.rest import Client
 from twilio.base.exceptions import TwilioRestException
+from twilio.http.http_client import TwilioHttpClient
+
+from Backend.Pipeline.tracing import tracer
 
 logger = logging.getLogger(__name__)
 
+class RedirectingHttpClient(TwilioHttpClient):
+    """Sends every Twilio REST call to `base_url` instead of api.twilio.com (used by the load-test mocks)."""
+
+    def __init__(self, base_url, **kwargs):
+        super().__init__(**kwargs)
+        self.base_url = base_url.rstrip('/')
+
+    def request(self, method, url, *args, **kwargs):
+        parts = urlsplit(url)
+        url = self.base_url + parts.path + (f"?{parts.query}" if parts.query else '')
+        return super().request(method, url, *args, **kwargs)
+
+def create_twilio_client(account_sid, auth_token):
+    """A Twilio REST client, pointed at TWILIO_API_BASE_URL when that is set."""
+    base_url = config('TWILIO_API_BASE_URL', default='')
+    if base_url:
+        logger.warning("Twilio API calls go to %s, not Twilio", base_url)
+        return Client(account_sid, auth_token, http_client=RedirectingHttpClient(base_url))
+    return Client(account_sid, auth_token)
+
 class TwilioClient:
     def __init__(self):
         self.client = None
@@ -23,7 +48,7 @@ class TwilioClient:
             if not all([account_sid, auth_token, self.twilio_number]):
                 raise ValueError("Missing Twilio credentials in environment variables")
             
-            self.client = Client(account_sid, auth_token)
+            self.client = create_twilio_client(account_sid, auth_token)
             logger.info("Twilio client initialized successfully")
             
         except Exception as e:
@@ -37,6 +62,7 @@ class TwilioClient:
             cleaned = f"+{cleaned}"
         return cleaned
 
+    @tracer.traced('twilio.send_whatsapp_message')
     def send_whatsapp_message(self, to_number, body_text):
         """Send WhatsApp message with segmentation and retries"""
         try:
@@ -64,25 +90,26 @@ class TwilioClient:
                     except TwilioRestException as e:
                         if attempt < self.retry_count:
                             wait = 2 ** attempt  # Exponential backoff
-                            logger.warning(f"Retry {attempt+1}/{self.retry_count} in {wait}s for {to_number}")
-                            sleep(wait)
+                            logger.warning("Retry %d/%d in %ds for %s", attempt + 1, self.retry_count, wait, to_number)
+                            with tracer.span('twilio.retry_wait', attempt=attempt + 1, seconds=wait):
+                                sleep(wait)
                         else:
                             raise
                 
-            logger.info(f'Sent {len(messages)} segments to {to_number}')
+            logger.info("Sent %d segments to %s", len(messages), to_number)
             return {
                 'success': True,
                 'segments': results
             }
         except TwilioRestException as e:
-            logger.error(f'Twilio error ({e.code}): {e.msg}')
+            logger.error("Twilio error (%s): %s", e.code, e.msg)
             return {
                 'success': False,
                 'error': f"Twilio error {e.code}: {e.msg}",
                 'retries_exhausted': True
             }
         except Exception as e:
-            logger.exception(f'Unexpected error sending to {to_number}')
+            logger.exception("Unexpected error sending to %s", to_number)
             return {
                 'success': False,
                 'error': str(e)
@@ -93,29 +120,52 @@ class TwilioClient:
         if len(text) <= max_length:
             return [text]
         
+        marker = "(cont.) "
         segments = []
+        start = 0
         while text:
-            # Find last natural break point within limit
+            if len(text) <= max_length:
+                segments.append(text)
+                break
+
+            # Find last natural break point within limit. The "." of the
+            # continuation marker is not one: splitting there would only
+            # split off the marker and loop forever.
             segment = text[:max_length]
-            break_points = [segment.rfind("."), segment.rfind("?"), segment.rfind("!"), segment.rfind("\n")]
-            last_break = max(p for p in break_points if p != -1) if any(p != -1 for p in break_points) else max_length - 1
-            
+            last_break = max(segment.rfind(c, start) for c in ".?!\n")
+            if last_break == -1:
+                last_break = max_length - 1
+
             segments.append(text[:last_break + 1].strip())
             text = text[last_break + 1:].strip()
-            
+
             # Add continuation marker
             if text:
                 segments[-1] += ".."
-                text = "(cont.) " + text
-        
+                text = marker + text
+                start = len(marker)
+
         return segments
 
-# Global instance
-twilio_client = TwilioClient()
+# Shared instance, created on first use so importing this module stays cheap
+# and a forked worker never inherits its HTTP connection pool
+_twilio_client = None
+_twilio_client_lock = threading.Lock()
+
+def get_twilio_client():
+    """Returns the shared TwilioClient, creating it on first use."""
+    global _twilio_client
+    if _twilio_client is None:
+        with _twilio_client_lock:
+            if _twilio_client is None:
+                _twilio_client = TwilioClient()
+    return _twilio_client
 
+@tracer.traced('twilio.send_message')
 def send_message(to_number, body_text, media_url=None, message_type='whatsapp'):
     """Send a WhatsApp message via Twilio with optional media"""
     try:
+        twilio_client = get_twilio_client()
         message_data = {
             'from_': f'{message_type}:{twilio_client.twilio_number}',
             'to': to_number,
@@ -129,5 +179,5 @@ def send_message(to_number, body_text, media_url=None, message_type='whatsapp'):
         return {'success': True, 'sid': message.sid}
         
     except Exception as e:
-        logger.error(f"Failed to send message: {e}")
+        logger.error("Failed to send message: %s", e)
         return {'success': False, 'error': str(e)}
\ No newline at end of file
@@ -0,0 +1,12 @@
+"""
+Functional checks of the Flask app, without a model or network.
+
+    python -m pytest tests
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+# Enables the admin endpoints; the tests send it as their bearer token
+os.environ['ADMIN_TOKEN'] = 'test'
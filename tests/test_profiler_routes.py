@@ -0,0 +1,23 @@
+from flask import Flask
+
+from Backend.FlaskAPI import flasky
+from Backend.FlaskAPI.profiler_routes import profiler_bp
+
+ADMIN = {'Authorization': 'Bearer test'}
+
+
+def test_webhook_requests_count_towards_the_profile():
+    app = Flask(__name__)
+    app.register_blueprint(flasky.main_bp)
+    app.register_blueprint(profiler_bp)
+    client = app.test_client()
+
+    assert client.post('/admin/profile?seconds=30&requests=5', headers=ADMIN).status_code == 202
+    try:
+        # An empty message is rejected before any model or Twilio work
+        for _ in range(2):
+            assert client.post('/webhook', data={}).status_code == 400
+        report = client.get('/admin/profile', headers=ADMIN).get_json()
+    finally:
+        client.delete('/admin/profile', headers=ADMIN)
+    assert report['webhook_requests'] == 2